@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Srovnání backendů skládání dvojstran (xobject vs. splice)
+Měří čas merge, velikost výstupu, počty operátorů a čas vykreslení
+(vykreslení přes MuPDF slouží jako náhrada za čas zpracování v RIPu)
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+from indesign_like_pdf_merger import InDesignLikePDFMerger, MERGE_BACKENDS
+from pdf_content import document_operators, form_xrefs
+
+
+def count_forms(doc) -> int:
+    """Počet Form XObjectů v dokumentu"""
+    return len(form_xrefs(doc))
+
+
+def benchmark_pair(merger: InDesignLikePDFMerger, left_pdf: Path, right_pdf: Path,
+                   work_dir: Path, dpi: int, repeat: int) -> dict:
+    """Změří oba backendy na jednom páru stránek"""
+    results = {}
+    for backend in MERGE_BACKENDS:
+        output_path = work_dir / f"{backend}.pdf"
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            if not merger.create_side_by_side_pdf_with_rotation(left_pdf, right_pdf, output_path,
+                                                                 backend=backend):
+                raise RuntimeError(f"Merge backendem {backend} selhal")
+        merge_time = (time.perf_counter() - start) / repeat
+
+        with fitz.open(str(output_path)) as doc:
+            operators = document_operators(doc)
+            forms = count_forms(doc)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                doc[0].get_pixmap(dpi=dpi, colorspace=fitz.csCMYK)
+            render_time = (time.perf_counter() - start) / repeat
+
+        results[backend] = {
+            'merge_time': merge_time,
+            'render_time': render_time,
+            'size': output_path.stat().st_size,
+            'operators': sum(operators.values()),
+            'forms': forms,
+            'do': operators['Do'],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Srovnání backendů skládání dvojstran")
+    parser.add_argument("left", type=Path, help="Levá stránka (PDF)")
+    parser.add_argument("right", type=Path, help="Pravá stránka (PDF)")
+    parser.add_argument("--dpi", type=int, default=150, help="Rozlišení vykreslení (náhrada za RIP)")
+    parser.add_argument("--repeat", type=int, default=3, help="Počet opakování měření")
+    args = parser.parse_args()
+
+    # Logy merge by přehlušily výsledky
+    logging.getLogger('indesign_like_pdf_merger').setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        merger = InDesignLikePDFMerger(files_dir=tmp)
+        results = benchmark_pair(merger, args.left, args.right, Path(tmp), args.dpi, args.repeat)
+
+    print(f"{'backend':10s} {'merge [ms]':>11s} {'render [ms]':>12s} {'velikost [kB]':>14s} "
+          f"{'operátorů':>10s} {'formulářů':>10s} {'Do':>5s}")
+    for backend, stats in results.items():
+        print(f"{backend:10s} {stats['merge_time'] * 1000:11.1f} {stats['render_time'] * 1000:12.1f} "
+              f"{stats['size'] / 1024:14.1f} {stats['operators']:10d} {stats['forms']:10d} {stats['do']:5d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Společné pomůcky testů - malá jednostránková PDF strana
+
+Testy ji importují přímo (from conftest import write_page), aby šly spustit i bez pytestu.
+"""
+
+from pathlib import Path
+
+import fitz
+
+
+def write_page(path: Path, text: str = "Titulek", color=None, embed_font: bool = False,
+               width: float = 200, height: float = 300) -> Path:
+    """
+    Uloží jednostránkové PDF s textem.
+
+    Args:
+        color: Barva textu (1 = šedá, 3 = RGB, 4 = CMYK složky; None = výchozí černá)
+        embed_font: Vložit font do PDF (preflight vyžaduje vložené fonty)
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    if embed_font:
+        page.insert_font(fontname='F0', fontbuffer=fitz.Font('helv').buffer)
+        page.insert_text((20, 50), text, fontname='F0', fontsize=12, color=color)
+    else:
+        page.insert_text((20, 50), text, fontsize=12, color=color)
+    doc.save(str(path))
+    doc.close()
+    return Path(path)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diskový rozpočet pro pracovní složky (uploady, výstupy, cache)
+Před spuštěním úlohy uvolní místo vyklizením nejdéle nepoužitých souborů (LRU)
+a úlohu pustí jen tehdy, když se její odhadovaný výstup na disk vejde
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DiskQuota:
+    """Rozpočet místa na disku - globální i pro jednotlivé pracovní složky"""
+
+    def __init__(self, global_budget: int = 0, min_free: int = 0, min_age: float = 300):
+        """
+        Args:
+            global_budget: Maximální součet všech pracovních složek v bajtech (0 = bez limitu)
+            min_free: Kolik bajtů musí na svazku vždy zůstat volných
+            min_age: Soubory použité před méně než min_age sekundami se nevyklízejí (běžící úlohy, stahování)
+        """
+        self.global_budget = global_budget
+        self.min_free = min_free
+        self.min_age = min_age
+        self.workspaces = {}
+        self._reserved = {}
+        self._lock = threading.Lock()
+
+    def add_workspace(self, name: str, folder: Path, patterns: Iterable[str] = ('*',),
+                      budget: int = 0, evictable: bool = False):
+        """
+        Zaregistruje pracovní složku.
+
+        Args:
+            name: Název složky v rozpočtu ('uploads', 'outputs', 'cache'...)
+            folder: Cesta ke složce
+            patterns: Glob vzory souborů, které se do rozpočtu počítají
+            budget: Limit složky v bajtech (0 = bez limitu)
+            evictable: Smí se soubory ze složky vyklízet (výstupy, cache)
+        """
+        self.workspaces[name] = {
+            'folder': Path(folder),
+            'patterns': tuple(patterns),
+            'budget': budget,
+            'evictable': evictable
+        }
+        self._reserved.setdefault(name, 0)
+
+    def _files(self, name: str) -> List[Tuple[Path, os.stat_result]]:
+        workspace = self.workspaces[name]
+        files = []
+        if not workspace['folder'].exists():
+            return files
+        for pattern in workspace['patterns']:
+            for path in workspace['folder'].glob(pattern):
+                try:
+                    files.append((path, path.stat()))
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def usage(self) -> Dict[str, int]:
+        """Obsazené místo po složkách (v bajtech, včetně rezervací běžících úloh)"""
+        return {
+            name: sum(st.st_size for _, st in self._files(name)) + self._reserved[name]
+            for name in self.workspaces
+        }
+
+    @staticmethod
+    def touch(path: Path):
+        """Označí soubor jako právě použitý (atime) - mtime zůstává kvůli retenci"""
+        try:
+            st = Path(path).stat()
+            os.utime(path, (time.time(), st.st_mtime))
+        except FileNotFoundError:
+            pass
+
+    def _deficits(self, usage: Dict[str, int], workspace: str, need: int) -> Dict[str, int]:
+        """Kolik bajtů chybí - klíč je složka, nebo '*' pro globální limit a volné místo"""
+        deficits = {}
+
+        budget = self.workspaces[workspace]['budget']
+        if budget and usage[workspace] + need > budget:
+            deficits[workspace] = usage[workspace] + need - budget
+
+        global_deficit = 0
+        if self.global_budget:
+            global_deficit = max(global_deficit, sum(usage.values()) + need - self.global_budget)
+        free = shutil.disk_usage(self.workspaces[workspace]['folder']).free
+        pending = sum(self._reserved.values())
+        global_deficit = max(global_deficit, need + pending + self.min_free - free)
+        if global_deficit > 0:
+            deficits['*'] = global_deficit
+
+        return deficits
+
+    def _candidates(self, now: float) -> List[Tuple[float, str, Path, int]]:
+        """Vyklízitelné soubory seřazené od nejdéle nepoužitého"""
+        candidates = []
+        for name, workspace in self.workspaces.items():
+            if not workspace['evictable']:
+                continue
+            for path, st in self._files(name):
+                last_used = max(st.st_atime, st.st_mtime)
+                # Ochrana platí i pro starý soubor, který se právě stahuje (touch() mění jen atime)
+                if now - last_used < self.min_age:
+                    continue
+                candidates.append((last_used, name, path, st.st_size))
+        candidates.sort(key=lambda c: c[0])
+        return candidates
+
+    def admit(self, estimated_bytes: int, workspace: str = 'outputs') -> Tuple[bool, str]:
+        """
+        Rozhodne o spuštění úlohy a případně uvolní místo (LRU).
+
+        Při úspěchu si odhad zarezervuje - po doběhnutí úlohy je třeba zavolat release().
+
+        Returns:
+            (povoleno, zpráva)
+        """
+        with self._lock:
+            now = time.time()
+            usage = self.usage()
+            candidates = self._candidates(now)
+            evicted_files = 0
+            evicted_bytes = 0
+
+            deficits = self._deficits(usage, workspace, estimated_bytes)
+            while deficits:
+                # Pro limit složky musíme vyklízet z ní, jinak z čehokoliv vyklízitelného
+                victim = None
+                for candidate in candidates:
+                    if '*' in deficits or candidate[1] in deficits:
+                        victim = candidate
+                        break
+                if victim is None:
+                    break
+
+                candidates.remove(victim)
+                _, name, path, size = victim
+                try:
+                    path.unlink()
+                    usage[name] -= size
+                    evicted_files += 1
+                    evicted_bytes += size
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.warning(f"Kvóta: nelze vyklidit {path}: {e}")
+                    continue
+
+                deficits = self._deficits(usage, workspace, estimated_bytes)
+
+            if evicted_files:
+                logger.info(f"💽 Kvóta: vyklizeno {evicted_files} souborů "
+                            f"({evicted_bytes / (1024 * 1024):.1f} MB) podle LRU")
+
+            if deficits:
+                missing = max(deficits.values()) / (1024 * 1024)
+                message = (f"Nedostatek místa na disku: úloha potřebuje "
+                           f"{estimated_bytes / (1024 * 1024):.1f} MB, chybí {missing:.1f} MB")
+                logger.warning(f"💽 {message}")
+                return False, message
+
+            self._reserved[workspace] += estimated_bytes
+            return True, 'OK'
+
+    def release(self, estimated_bytes: int, workspace: str = 'outputs'):
+        """Uvolní rezervaci úlohy (po jejím doběhnutí jsou soubory už na disku)"""
+        with self._lock:
+            self._reserved[workspace] = max(0, self._reserved[workspace] - estimated_bytes)
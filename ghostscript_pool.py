@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool trvale běžících Ghostscript procesů pro konverzi výstupů na PDF/X-1a:2001
+Start gs a načtení fontové mapy trvá u malé dvojstrany déle než samotná konverze -
+worker proto běží po celou dobu života poolu a úlohy dostává jako PostScript na stdin
+(interaktivní smyčka gs - provádí každý příkaz hned, jak dorazí celý řádek).
+Soubory se převádějí souběžně (jeden na worker), každý s vlastním časovým limitem
+"""
+
+import itertools
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# pdfwrite pro PDF/X-1a:2001 - jednodušší přístup BEZ PDFX_def.ps, barvy zůstávají (CMYK)
+PDFX_ARGS = [
+    '-sDEVICE=pdfwrite',
+    '-dCompatibilityLevel=1.3',
+    '-dPDFSETTINGS=/prepress',
+    '-sColorConversionStrategy=LeaveColorUnchanged',
+    '-dEmbedAllFonts=true',
+    '-dSubsetFonts=false',
+    '-dAutoFilterColorImages=false',
+    '-dAutoFilterGrayImages=false',
+    '-dColorImageFilter=/FlateEncode',
+    '-dGrayImageFilter=/FlateEncode',
+]
+
+# Časový limit konverze jednoho souboru (s)
+GS_TIMEOUT = 60
+
+# Značka konce úlohy na stdout workeru: "GSPOOL <číslo úlohy> OK|FAIL"
+_DONE_MARK = 'GSPOOL'
+
+
+def _ps_string(value) -> str:
+    """Text jako PostScript řetězec (závorky a zpětná lomítka escapované)"""
+    text = str(value).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f"({text})"
+
+
+def _is_pdf(path: Path) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(5) == b'%PDF-'
+    except OSError:
+        return False
+
+
+class _Worker:
+    """Jeden běžící gs - pdfwrite zařízení zůstává otevřené, mezi úlohami píše do prázdného souboru"""
+
+    def __init__(self, gs_path: str, args: List[str], folders: List[Path], work_dir: Path):
+        fd, idle = tempfile.mkstemp(prefix='idle_', suffix='.pdf', dir=work_dir)
+        os.close(fd)
+        self.idle_path = Path(idle)
+
+        # -dSAFER: soubory mimo povolené složky gs neotevře (ani pro zápis)
+        permits = []
+        for folder in [work_dir, *folders]:
+            pattern = f"{Path(folder).resolve()}{os.sep}*"
+            permits += [f'--permit-file-read={pattern}', f'--permit-file-write={pattern}']
+
+        # Bez "-": gs by stdin četl jako soubor po blocích a úlohu provedl až po naplnění bufferu
+        command = [gs_path, '-q', '-dNOPAUSE', '-dNOPROMPT', '-dSAFER', *permits, *args,
+                   f'-sOutputFile={self.idle_path}']
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, text=True, bufsize=1)
+        self.jobs = 0
+
+        # Výstup čte samostatné vlákno - čekání na značku konce pak může mít časový limit
+        self.lines = queue.Queue()
+        threading.Thread(target=self._read_output, daemon=True).start()
+
+    def _read_output(self) -> None:
+        for line in self.process.stdout:
+            self.lines.put(line.rstrip('\n'))
+        self.lines.put(None)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, job_id: int, source: Path, target: Path, timeout: float) -> tuple:
+        """
+        Převede source do target.
+
+        Returns:
+            (True/False podle gs, řádky výstupu gs)
+
+        Raises:
+            TimeoutError: gs nedokončil úlohu v limitu
+            RuntimeError: gs během úlohy skončil
+        """
+        # Přepnutí OutputFile uzavře předchozí výstup - po úloze přepneme zpět na prázdný soubor,
+        # aby byl target dopsaný hned, ne až při další úloze. Odmítnuté přepnutí na target
+        # (-dSAFER) je uvnitř stopped, jinak by se úloha "povedla" do prázdného souboru
+        program = (f"{{ << /OutputFile {_ps_string(target)} >> setpagedevice {_ps_string(source)} run }} stopped\n"
+                   f"{{ << /OutputFile {_ps_string(self.idle_path)} >> setpagedevice }} stopped or\n"
+                   f"{{ (\\n{_DONE_MARK} {job_id} FAIL\\n) }} {{ (\\n{_DONE_MARK} {job_id} OK\\n) }} ifelse "
+                   f"print flush clear cleardictstack\n")
+        self.process.stdin.write(program)
+        self.process.stdin.flush()
+        self.jobs += 1
+
+        output = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                line = self.lines.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                raise TimeoutError(f"Ghostscript nedokončil konverzi do {timeout:.0f} s")
+            if line is None:
+                raise RuntimeError(f"Ghostscript skončil (exit {self.process.wait()})")
+            if line.startswith(f"{_DONE_MARK} {job_id} "):
+                return line.endswith(' OK'), output
+            if line.strip():
+                output.append(line)
+
+    def stop(self, timeout: float = 5) -> None:
+        """Ukončí gs (quit dopíše a zavře prázdný výstup), zaseknutý proces zabije"""
+        try:
+            if self.alive():
+                self.process.stdin.write("quit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        finally:
+            self.kill()
+
+    def kill(self) -> None:
+        if self.alive():
+            self.process.kill()
+            self.process.wait()
+        try:
+            self.idle_path.unlink()
+        except OSError:
+            pass
+
+
+class GhostscriptPool:
+    """
+    Pool Ghostscript workerů - konverze souborů na PDF/X-1a souběžně a bez startu gs pro každý soubor.
+
+    Workery se spouští líně (nejvýše `workers` najednou). Worker, který překročí časový limit
+    nebo spadne, se zabije a další úloha si spustí nový.
+    """
+
+    def __init__(self, gs_path: str, workers: Optional[int] = None, timeout: float = GS_TIMEOUT,
+                 folders: Iterable[Path] = (), args: List[str] = None):
+        """
+        Args:
+            gs_path: Cesta ke gs
+            workers: Počet souběžných gs procesů (None = počet CPU)
+            timeout: Časový limit konverze jednoho souboru (s)
+            folders: Složky s převáděnými soubory - jen do nich smí gs (-dSAFER) číst a zapisovat
+            args: Parametry pdfwrite (výchozí PDFX_ARGS)
+        """
+        self.gs_path = gs_path
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.folders = [Path(folder) for folder in folders]
+        self.args = list(args or PDFX_ARGS)
+        self._work_dir = Path(tempfile.mkdtemp(prefix='gspool_'))
+        self._idle = queue.LifoQueue()
+        self._job_ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='gspool')
+
+    def submit(self, pdf_path: Path) -> Future:
+        """Zařadí konverzi souboru (na místě) - Future vrací výsledek jako convert()"""
+        return self._executor.submit(self.convert, Path(pdf_path))
+
+    def convert_many(self, paths: Iterable[Path]) -> List[dict]:
+        """Převede soubory souběžně - výsledky ve stejném pořadí"""
+        return [future.result() for future in [self.submit(path) for path in paths]]
+
+    def convert(self, pdf_path: Path) -> dict:
+        """
+        Převede PDF na PDF/X-1a:2001 na místě (přes dočasný soubor vedle něj).
+
+        Returns:
+            {'file', 'success', 'seconds', 'error'} - při neúspěchu zůstává původní soubor
+        """
+        pdf_path = Path(pdf_path).resolve()
+        temp_output = pdf_path.parent / f"{pdf_path.stem}_temp_pdfx.pdf"
+        result = {'file': pdf_path.name, 'success': False, 'seconds': 0.0, 'error': None}
+        start = time.monotonic()
+
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            worker = None
+        try:
+            if worker is None or not worker.alive():
+                worker = _Worker(self.gs_path, self.args, self.folders, self._work_dir)
+
+            job_id = next(self._job_ids)
+            ok, output = worker.run(job_id, pdf_path, temp_output, self.timeout)
+            if ok and _is_pdf(temp_output):
+                temp_output.replace(pdf_path)
+                result['success'] = True
+            else:
+                result['error'] = '\n'.join(output[-5:]) or 'Ghostscript nevytvořil platné PDF'
+        except Exception as e:
+            # Zaseknutý nebo spadlý gs - nahradí ho další úloha
+            result['error'] = str(e)
+            if worker is not None:
+                worker.kill()
+                worker = None
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+            if temp_output.exists():
+                temp_output.unlink()
+
+        result['seconds'] = round(time.monotonic() - start, 2)
+        if result['success']:
+            logger.info(f"  ✅ Ghostscript PDF/X-1a: {pdf_path.name} ({result['seconds']} s)")
+        else:
+            logger.warning(f"  ⚠️  Ghostscript konverze {pdf_path.name} selhala: {result['error']}")
+        return result
+
+    def close(self) -> None:
+        """Počká na rozběhnuté konverze a ukončí všechny workery"""
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
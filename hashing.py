@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hash obsahu vstupních souborů
+Společný pro cache normalizovaných stran a reprodukovatelný výstup merge
+"""
+
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Velikost bloku pro čtení souboru při hashování
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def file_digest(*paths) -> str:
+    """SHA-256 obsahu vstupních souborů (v daném pořadí)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DigestCache:
+    """
+    Hashe souborů podle (cesta, velikost, mtime) - nezměněný soubor se nečte znovu.
+
+    Vícestránkové vydání, ze kterého úloha skládá desítky dvojstran, se tak hashuje jednou.
+    """
+
+    def __init__(self):
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def digest(self, path: Path) -> str:
+        """SHA-256 obsahu souboru (z cache, pokud se od posledního hashování nezměnil)"""
+        path = Path(path)
+        st = path.stat()
+        key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                self._digests[key] = digest
+        return digest
@@ -10,11 +10,16 @@ import os
 import sys
 import argparse
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Sequence, Union
 import logging
 import math
 import subprocess
 import shutil
+import threading
+import hashlib
+import re
+import uuid
+from datetime import datetime, timezone
 
 try:
     from PyPDF2 import PdfReader, PdfWriter
@@ -28,6 +33,12 @@ try:
     from PIL import Image
     import io
     import fitz  # PyMuPDF pro lepší práci s PDF
+    from pdf_postprocess import CMYK_PROFILE_PATH, convert_to_cmyk, downsample_images, normalize_content
+    from pdf_content import (parse_content, serialize_content, rename_resources, graphics_state_balance,
+                             page_box, format_number, get_resources, merge_resources, resources_to_pdf,
+                             set_page_content)
+    from ghostscript_pool import PDFX_ARGS, GS_TIMEOUT
+    from hashing import DigestCache
 except ImportError as e:
     print(f"Chybí požadované knihovny: {e}")
     print("Nainstalujte je pomocí: pip install PyPDF2 reportlab Pillow PyMuPDF")
@@ -37,6 +48,67 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Profily ukládání výstupu - rychlost vs. velikost
+SAVE_PROFILES = {
+    # Tisk (výchozí): plná deduplikace objektového grafu a vyčištění content streamů
+    'print': {'garbage': 4, 'deflate': True, 'clean': True},
+    # Rychlý: jen zahození nepoužitých objektů, bez sanitizace streamů (náhledy, pozdní re-exporty)
+    'fast': {'garbage': 1, 'deflate': True, 'clean': False},
+}
+DEFAULT_SAVE_PROFILE = 'print'
+
+# Doplňkové volby ukládání pro kompaktní výstup (volba optimize):
+# deduplikace shodných zdrojů + komprese všech streamů včetně obrázků a fontů.
+# Objektové a xref streamy (use_objstms) záměrně ne - jsou až z PDF 1.5,
+# PDF/X-1a:2001 vychází z PDF 1.3 a preflight by je odmítl.
+COMPACT_SAVE_OPTIONS = {'garbage': 4, 'deflate': True, 'deflate_images': True, 'deflate_fonts': True}
+
+# Způsoby skládání dvojstrany:
+# 'xobject' - každá stránka jako Form XObject (show_pdf_page), osvědčená výchozí cesta
+# 'splice'  - content streamy stránek přímo v obsahu dvojstrany, o úroveň formulářů méně pro RIP
+MERGE_BACKENDS = ('xobject', 'splice')
+DEFAULT_MERGE_BACKEND = 'xobject'
+
+# Razítko mutace: kód mutace drobně v levém dolním rohu dvojstrany, 100 % černá (CMYK)
+MUTATION_SLUG_FONT_SIZE = 6
+MUTATION_SLUG_MARGIN = 4
+MUTATION_SLUG_COLOR = (0, 0, 0, 1)
+
+
+# Reprodukovatelný výstup: datum vydání z názvu strany PRYYMMDD... (PR251030 = 30. 10. 2025)
+_EDITION_DATE_RE = re.compile(r'^[A-Za-z]{2}(\d{2})(\d{2})(\d{2})')
+# Když datum nejde zjistit: nejstarší datum, které umí i ZIP
+REPRODUCIBLE_FALLBACK_DATE = datetime(1980, 1, 1, tzinfo=timezone.utc)
+
+
+def reproducible_timestamp(paths) -> datetime:
+    """
+    Čas pro reprodukovatelný výstup - nikdy ne aktuální čas.
+    
+    Pořadí: proměnná SOURCE_DATE_EPOCH, datum vydání z názvu strany, 1. 1. 1980.
+    """
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        return datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+    
+    for path in paths:
+        match = _EDITION_DATE_RE.match(Path(path).name)
+        if match:
+            year, month, day = (int(part) for part in match.groups())
+            try:
+                return datetime(2000 + year, month, day, tzinfo=timezone.utc)
+            except ValueError:
+                continue
+    
+    return REPRODUCIBLE_FALLBACK_DATE
+
+
+def get_save_options(save_profile: str = DEFAULT_SAVE_PROFILE) -> dict:
+    """Vrátí parametry pro fitz.Document.save() podle názvu profilu"""
+    if save_profile not in SAVE_PROFILES:
+        raise ValueError(f"Neznámý profil ukládání: {save_profile}. Podporované: {list(SAVE_PROFILES.keys())}")
+    return dict(SAVE_PROFILES[save_profile])
+
 
 class InDesignLikePDFMerger:
     """Třída pro spojování PDF souborů podobně jako InDesign"""
@@ -46,6 +118,15 @@ class InDesignLikePDFMerger:
         self.output_dir = Path("output")
         self.output_dir.mkdir(exist_ok=True)
         self.ghostscript_path = self._find_ghostscript()
+        # Razítka mutací (malá PDF) sdílená mezi dvojstranami - podle kódu mutace
+        self._overlay_cache = {}
+        self._overlay_lock = threading.Lock()
+        # Hashe vstupů pro reprodukovatelný výstup - soubor vydání se nečte znovu pro každou dvojstranu
+        self._source_digests = DigestCache()
+        # Cache normalizovaných vstupů (page_cache.PageCache) - None = otevírat originály
+        self.page_cache = None
+        # Pool trvalých Ghostscript workerů (ghostscript_pool.GhostscriptPool) - None = gs pro každý soubor
+        self.ghostscript_pool = None
         
     def get_pdf_files(self) -> list:
         """Získá seznam všech PDF souborů ve složce files"""
@@ -69,7 +150,7 @@ class InDesignLikePDFMerger:
             return None
     
     def create_side_by_side_pdf_indesign_like(self, left_pdf: Path, right_pdf: Path, output_path: Path, 
-                                             rotation: int = -90) -> bool:
+                                             rotation: int = -90, save_profile: str = DEFAULT_SAVE_PROFILE) -> bool:
         """
         Vytvoří PDF s dvěma stránkami vedle sebe podobně jako InDesign
         
@@ -78,6 +159,7 @@ class InDesignLikePDFMerger:
             right_pdf: Cesta k pravému PDF (liché číslo)
             output_path: Cesta pro výstupní PDF
             rotation: Úhel rotace (90 nebo -90 stupňů)
+            save_profile: Profil ukládání ("print" nebo "fast")
         """
         try:
             # Načtení PDF souborů pomocí PyMuPDF
@@ -135,11 +217,8 @@ class InDesignLikePDFMerger:
             left_doc.close()
             right_doc.close()
             
-            # Uložení s optimalizací
-            new_doc.save(str(output_path), 
-                        garbage=4,      # Odstraní nepoužívané objekty
-                        deflate=True,   # Komprese
-                        clean=True)     # Vyčištění
+            # Uložení podle zvoleného profilu
+            new_doc.save(str(output_path), **get_save_options(save_profile))
             
             new_doc.close()
             
@@ -232,7 +311,13 @@ class InDesignLikePDFMerger:
             return False
 
     def create_side_by_side_pdf_with_rotation(self, left_pdf: Path, right_pdf: Path, output_path: Path, 
-                                             rotation: int = -90) -> bool:
+                                             rotation: int = -90, save_profile: str = DEFAULT_SAVE_PROFILE,
+                                             optimize: bool = False, linearize: bool = False,
+                                             image_dpi: Optional[int] = None, backend: str = DEFAULT_MERGE_BACKEND,
+                                             normalize: bool = False, stats: Optional[dict] = None,
+                                             mutation_slug: Optional[str] = None, deterministic: bool = False,
+                                             left_index: int = 0, right_index: int = 0, documents=None,
+                                             cmyk: bool = False) -> bool:
         """
         Vytvoří PDF s dvěma stránkami vedle sebe s dynamickou rotací
         Používá InDesign-like přístup s přímým kopírováním PDF objektů
@@ -242,89 +327,485 @@ class InDesignLikePDFMerger:
             right_pdf: Cesta k pravému PDF
             output_path: Cesta pro výstupní PDF
             rotation: Rotace stránky (-90 nebo +90 stupňů)
+            save_profile: Profil ukládání ("print" = plná optimalizace, "fast" = rychlé uložení)
+            optimize: Kompaktní výstup - subset fontů, deduplikace a komprese všech streamů
+            linearize: Linearizované PDF ("fast web view") - prohlížeč vykreslí první stránku
+                       dřív, než stáhne celý soubor
+            image_dpi: Cílové efektivní rozlišení obrázků - obrázky nad ním se převzorkují
+                       (None = obrázky beze změny)
+            backend: Způsob skládání ("xobject" = stránky jako Form XObjecty,
+                     "splice" = content streamy přímo v obsahu dvojstrany)
+            normalize: Zjednodušit obsah pro RIP - rozbalit vnořené formuláře, odstranit zbytečné operátory
+            stats: Volitelný slovník, do kterého se doplní statistiky kroků (např. 'normalize', 'images', 'cmyk')
+            mutation_slug: Kód mutace, který se vytiskne drobně do rohu dvojstrany (None = bez razítka)
+            deterministic: Reprodukovatelný výstup - stejné vstupy dají bajtově stejné PDF
+                           (čas z data vydání / SOURCE_DATE_EPOCH, /ID a XMP ID z hashe vstupů)
+            left_index, right_index: Strana vícestránkového zdroje (od 0)
+            documents: Pool otevřených zdrojů úlohy (page_sources.DocumentPool) - None = otevřít a zavřít
+            cmyk: Převést RGB barvy a obrázky do CMYK podle výstupního profilu (icc_profiles/newspaper.icc)
         """
         try:
-            logger.info(f"🔄 Začínám merge: {left_pdf.name} + {right_pdf.name}")
+            get_save_options(save_profile)
+            reproducible = self._reproducible_source(
+                [left_pdf, right_pdf], backend=backend, image_dpi=image_dpi, normalize=normalize, cmyk=cmyk,
+                pages=[(left_index, right_index)]
+            ) if deterministic else None
+            
+            new_doc = self.compose_spread(left_pdf, right_pdf, image_dpi=image_dpi, backend=backend,
+                                          normalize=normalize, optimize=optimize, stats=stats,
+                                          left_index=left_index, right_index=right_index, documents=documents,
+                                          cmyk=cmyk)
+            if new_doc is None:
+                return False
             
-            # Načtení PDF souborů pomocí PyMuPDF
-            left_doc = fitz.open(str(left_pdf))
-            right_doc = fitz.open(str(right_pdf))
+            try:
+                return self.finalize_spread(new_doc, output_path, rotation, save_profile=save_profile,
+                                            optimize=optimize, linearize=linearize, mutation_slug=mutation_slug,
+                                            reproducible=reproducible)
+            finally:
+                new_doc.close()
+            
+        except Exception as e:
+            logger.error(f"❌ EXCEPTION při merge: {type(e).__name__}: {str(e)}")
+            import traceback
+            logger.error(f"  Traceback: {traceback.format_exc()}")
+            return False
+    
+    def create_mutation_variants(self, left_pdf: Path, right_pdf: Path, outputs: Dict[str, Path],
+                                 rotation: int = -90, mutation_overlay: bool = False,
+                                 save_profile: str = DEFAULT_SAVE_PROFILE, optimize: bool = False,
+                                 linearize: bool = False, image_dpi: Optional[int] = None,
+                                 backend: str = DEFAULT_MERGE_BACKEND, normalize: bool = False,
+                                 stats: Optional[dict] = None, deterministic: bool = False,
+                                 left_index: int = 0, right_index: int = 0, documents=None,
+                                 cmyk: bool = False) -> Dict[str, bool]:
+        """
+        Vytvoří dvojstranu pro více mutací najednou.
+        
+        Základ dvojstrany (skládání, normalizace, převzorkování, subset fontů) vznikne
+        jen jednou; každá mutace je pak jen kopie základu s vlastním razítkem a metadaty.
+        
+        Args:
+            outputs: {kód mutace: cesta výstupního PDF}
+            mutation_overlay: Vytisknout do rohu každé varianty kód její mutace
+            ostatní: viz create_side_by_side_pdf_with_rotation
+        
+        Returns:
+            {kód mutace: úspěch}
+        """
+        results = {mutation: False for mutation in outputs}
+        try:
+            get_save_options(save_profile)
+            reproducible = self._reproducible_source(
+                [left_pdf, right_pdf], backend=backend, image_dpi=image_dpi, normalize=normalize, cmyk=cmyk,
+                pages=[(left_index, right_index)]
+            ) if deterministic else None
+            
+            base_doc = self.compose_spread(left_pdf, right_pdf, image_dpi=image_dpi, backend=backend,
+                                           normalize=normalize, optimize=optimize, stats=stats,
+                                           left_index=left_index, right_index=right_index, documents=documents,
+                                           cmyk=cmyk)
+            if base_doc is None:
+                return results
+            
+            self._write_variants(base_doc, outputs, rotation, results, mutation_overlay=mutation_overlay,
+                                 save_profile=save_profile, optimize=optimize, linearize=linearize,
+                                 reproducible=reproducible)
+            
+        except Exception as e:
+            logger.error(f"❌ EXCEPTION při merge: {type(e).__name__}: {str(e)}")
+            import traceback
+            logger.error(f"  Traceback: {traceback.format_exc()}")
+        
+        return results
+    
+    def create_sheet_variants(self, sides: List[dict], outputs: Dict[str, Path], mutation_overlay: bool = False,
+                              save_profile: str = DEFAULT_SAVE_PROFILE, optimize: bool = False,
+                              linearize: bool = False, image_dpi: Optional[int] = None,
+                              backend: str = DEFAULT_MERGE_BACKEND, normalize: bool = False,
+                              stats: Optional[dict] = None, deterministic: bool = False,
+                              documents=None, cmyk: bool = False) -> Dict[str, bool]:
+        """
+        Vytvoří oboustranný tiskový arch - přední a zadní dvojstranu v jednom PDF - pro více mutací.
+        
+        Každá strana archu se složí přes compose_spread() a dostane vlastní rotaci
+        (přední -90°, zadní +90°). RIP pak spouští jednu úlohu na arch místo dvou.
+        
+        Args:
+            sides: Strany archu v pořadí tisku - slovníky s klíči left_pdf, right_pdf, rotation
+                   a volitelně left_index, right_index
+            outputs: {kód mutace: cesta výstupního PDF}
+            ostatní: viz create_mutation_variants
+        
+        Returns:
+            {kód mutace: úspěch}
+        """
+        results = {mutation: False for mutation in outputs}
+        sheet_doc = None
+        try:
+            get_save_options(save_profile)
+            paths = [path for side in sides for path in (side['left_pdf'], side['right_pdf'])]
+            reproducible = self._reproducible_source(
+                paths, backend=backend, image_dpi=image_dpi, normalize=normalize, cmyk=cmyk,
+                pages=[(side.get('left_index', 0), side.get('right_index', 0)) for side in sides]
+            ) if deterministic else None
+            
+            for side in sides:
+                side_stats = {}
+                side_doc = self.compose_spread(side['left_pdf'], side['right_pdf'], image_dpi=image_dpi,
+                                               backend=backend, normalize=normalize, optimize=optimize,
+                                               stats=side_stats, left_index=side.get('left_index', 0),
+                                               right_index=side.get('right_index', 0), documents=documents,
+                                               cmyk=cmyk)
+                if side_doc is None:
+                    return results
+                for step, step_stats in (side_stats.items() if stats is not None else ()):
+                    summary = stats.setdefault(step, {})
+                    for key, value in step_stats.items():
+                        summary[key] = summary.get(key, 0) + value
+                
+                if sheet_doc is None:
+                    sheet_doc = side_doc
+                else:
+                    sheet_doc.insert_pdf(side_doc)
+                    side_doc.close()
+            
+            # Arch bez zadní strany (lichý počet párů) je obyčejná dvojstrana
+            rotations = [side['rotation'] for side in sides]
+            base_doc, sheet_doc = sheet_doc, None
+            self._write_variants(base_doc, outputs, rotations[0] if len(rotations) == 1 else rotations, results,
+                                 mutation_overlay=mutation_overlay, save_profile=save_profile,
+                                 optimize=optimize, linearize=linearize, reproducible=reproducible)
             
+        except Exception as e:
+            logger.error(f"❌ EXCEPTION při merge archu: {type(e).__name__}: {str(e)}")
+            import traceback
+            logger.error(f"  Traceback: {traceback.format_exc()}")
+        finally:
+            if sheet_doc is not None:
+                sheet_doc.close()
+        
+        return results
+    
+    def _write_variants(self, base_doc, outputs: Dict[str, Path], rotation: Union[int, Sequence[int]],
+                        results: Dict[str, bool], mutation_overlay: bool = False,
+                        save_profile: str = DEFAULT_SAVE_PROFILE, optimize: bool = False,
+                        linearize: bool = False, reproducible: Optional[Tuple[str, datetime]] = None) -> None:
+        """
+        Uloží varianty mutací ze složeného základu (základ zavře) - výsledky zapíše do results.
+        
+        Při více variantách se základ jednou serializuje s plnými volbami profilu (deduplikace,
+        čištění streamů) a varianty se pak ukládají bez garbage collection - přidávají jen razítko,
+        rotaci a metadata.
+        """
+        # Jediná varianta nepotřebuje kopii základu
+        if len(outputs) == 1:
+            variants = None
+        else:
+            base_options = get_save_options(save_profile)
+            if optimize:
+                base_options.update(COMPACT_SAVE_OPTIONS)
+            variants = base_doc.tobytes(**base_options)
+            base_doc.close()
+        
+        for mutation, output_path in outputs.items():
+            variant_doc = base_doc if variants is None else fitz.open('pdf', variants)
+            try:
+                results[mutation] = self.finalize_spread(
+                    variant_doc, output_path, rotation, save_profile=save_profile, optimize=optimize,
+                    linearize=linearize, mutation_slug=mutation if mutation_overlay else None,
+                    reproducible=reproducible, prepared=variants is not None
+                )
+            except Exception as variant_error:
+                logger.error(f"❌ Varianta {mutation} selhala: {type(variant_error).__name__}: {variant_error}")
+            finally:
+                variant_doc.close()
+    
+    def compose_spread(self, left_pdf: Path, right_pdf: Path, image_dpi: Optional[int] = None,
+                       backend: str = DEFAULT_MERGE_BACKEND, normalize: bool = False,
+                       optimize: bool = False, stats: Optional[dict] = None,
+                       left_index: int = 0, right_index: int = 0, documents=None, cmyk: bool = False):
+        """
+        Složí základ dvojstrany - společný pro všechny mutace.
+        
+        Obsah obou stránek, volitelná normalizace, převzorkování obrázků, převod do CMYK,
+        subset fontů a TrimBox. Rotace, razítko mutace a metadata patří až do finalize_spread().
+        
+        Stránky se berou z indexů left_index/right_index - zdrojem může být i vícestránkové
+        PDF celého vydání nebo sekce. Je-li zadán pool documents, zdroje se z něj jen půjčí
+        (otevřené zůstávají pro další dvojstrany úlohy).
+        
+        Returns:
+            Nový fitz dokument s jednou stránkou, nebo None při chybě vstupů
+        """
+        if backend not in MERGE_BACKENDS:
+            raise ValueError(f"Neznámý backend: {backend}. Podporované: {list(MERGE_BACKENDS)}")
+        
+        logger.info(f"🔄 Začínám merge: {left_pdf.name} + {right_pdf.name}")
+        
+        # Načtení PDF souborů pomocí PyMuPDF (z cache normalizovaných stran, je-li zapnutá)
+        if documents is not None:
+            left_doc = documents.get(self._source_path(left_pdf))
+            right_doc = documents.get(self._source_path(right_pdf))
+        else:
+            left_doc = fitz.open(str(self._source_path(left_pdf)))
+            right_doc = fitz.open(str(self._source_path(right_pdf)))
+        
+        try:
             logger.info(f"  📖 Levý PDF: {len(left_doc)} stránek")
             logger.info(f"  📖 Pravý PDF: {len(right_doc)} stránek")
             
             if len(left_doc) == 0 or len(right_doc) == 0:
                 logger.error("❌ Jeden nebo oba PDF soubory jsou prázdné")
-                return False
+                return None
             
-            # Získání stránek
-            left_page = left_doc[0]
-            right_page = right_doc[0]
-            
-            # Získání rozměrů stránek
-            left_rect = left_page.rect
-            right_rect = right_page.rect
+            if left_index >= len(left_doc) or right_index >= len(right_doc):
+                logger.error(f"❌ Strana mimo rozsah zdroje: {left_pdf.name}[{left_index}], "
+                             f"{right_pdf.name}[{right_index}]")
+                return None
             
+            left_rect = left_doc[left_index].rect
+            right_rect = right_doc[right_index].rect
             logger.info(f"Rozměry levé stránky: {left_rect.width} x {left_rect.height}")
             logger.info(f"Rozměry pravé stránky: {right_rect.width} x {right_rect.height}")
             
             # Vytvoření nového dokumentu
             new_doc = fitz.open()
             
-            # Vytvoření nové stránky s dvojnásobnou šířkou
-            new_width = left_rect.width + right_rect.width
-            new_height = max(left_rect.height, right_rect.height)
-            
-            # Vytvoření nové stránky
-            new_page = new_doc.new_page(width=new_width, height=new_height)
-            
             # KLÍČOVÁ ČÁST: Přímé kopírování PDF obsahu (jako InDesign)
             # Zachovává textovou editovatelnost a vektorovou kvalitu
-            
-            # Kopírování obsahu levé stránky (zachovává text a vektory)
-            left_clip = fitz.Rect(0, 0, left_rect.width, left_rect.height)
-            new_page.show_pdf_page(left_clip, left_doc, 0)
-            
-            # Kopírování obsahu pravé stránky (zachovává text a vektory)
-            right_clip = fitz.Rect(left_rect.width, 0, new_width, right_rect.height)
-            new_page.show_pdf_page(right_clip, right_doc, 0)
-            
-            # Nastavení TrimBox pro PDF/X-1a:2001 PŘED rotací
-            # TrimBox = ořezový rámeček (pro tiskárnu)
-            # Pro PDF/X-1a musí být buď TrimBox NEBO ArtBox (ne oba!)
-            page_rect = new_page.rect
-            try:
-                new_page.set_trimbox(page_rect)
-                logger.info(f"  ✅ TrimBox nastaven")
-            except Exception as box_error:
-                logger.warning(f"  ⚠️  TrimBox error: {box_error}")
-            
-            # Aplikace dynamické rotace na celou stránku
-            new_page.set_rotation(rotation)
-            
-            logger.info(f"  🔄 Stránka otočena o {rotation} stupňů")
-            
-            # Přidání PDF/X-1a:2001 metadat pro profesionální tisk
-            try:
-                # Standardní metadata včetně CreationDate a ModDate
-                from datetime import datetime
-                now = datetime.now().strftime("D:%Y%m%d%H%M%S+00'00'")
-                
-                metadata = {
-                    'producer': 'PDF Merger Pro - InDesign-like Quality',
-                    'creator': 'PDF Merger Web App',
-                    'title': f'Merged Pages - {output_path.name}',
-                    'creationDate': now,
-                    'modDate': now,
-                }
-                new_doc.set_metadata(metadata)
-                
-                # Trapped key musí být nastaven speciálně (jako /False, ne string "False")
-                # PyMuPDF to neumí přímo, takže přidáme do XMP
+            if backend == 'splice':
+                new_page = self._compose_spread_splice(new_doc, left_doc, right_doc, left_index, right_index)
+            else:
+                new_page = self._compose_spread_xobject(new_doc, left_doc, right_doc, left_index, right_index)
+        finally:
+            if documents is None:
+                left_doc.close()
+                right_doc.close()
+        
+        # Volitelná normalizace obsahu pro RIP (před převzorkováním - to pak vidí výsledné umístění obrázků)
+        if normalize:
+            normalize_stats = normalize_content(new_doc)
+            if stats is not None:
+                stats['normalize'] = normalize_stats
+            before = normalize_stats['operators_before']
+            after = normalize_stats['operators_after']
+            saved = (before - after) / before * 100 if before else 0
+            logger.info(f"  🧹 Normalizace: {before} → {after} operátorů (-{saved:.0f} %), "
+                        f"rozbaleno {normalize_stats['forms_flattened']} formulářů")
+        
+        # Volitelné převzorkování příliš velkých obrázků (text a vektory zůstávají)
+        if image_dpi:
+            image_stats = downsample_images(new_doc, image_dpi)
+            if stats is not None:
+                stats['images'] = image_stats
+            if image_stats['images']:
+                saved_mb = (image_stats['bytes_before'] - image_stats['bytes_after']) / (1024 * 1024)
+                logger.info(f"  🖼️  Převzorkováno {image_stats['images']} obrázků na {image_dpi} DPI "
+                            f"(ušetřeno {saved_mb:.2f} MB)")
+        
+        # Volitelný převod RGB -> CMYK (po převzorkování - převádí se už menší obrázky)
+        if cmyk:
+            cmyk_stats = convert_to_cmyk(new_doc)
+            if stats is not None:
+                stats['cmyk'] = cmyk_stats
+            logger.info(f"  🎨 CMYK: převedeno {cmyk_stats['colors']} barev a {cmyk_stats['images']} obrázků"
+                        + (f", přeskočeno {cmyk_stats['skipped']}" if cmyk_stats['skipped'] else ""))
+        
+        # Volitelná kompaktní optimalizace - jednou pro všechny varianty
+        # (razítko mutace má vlastní font, subset už předem)
+        if optimize:
+            self._optimize_document(new_doc)
+        
+        # Nastavení TrimBox pro PDF/X-1a:2001 PŘED rotací
+        # TrimBox = ořezový rámeček (pro tiskárnu)
+        # Pro PDF/X-1a musí být buď TrimBox NEBO ArtBox (ne oba!)
+        try:
+            new_page.set_trimbox(new_page.rect)
+            logger.info(f"  ✅ TrimBox nastaven")
+        except Exception as box_error:
+            logger.warning(f"  ⚠️  TrimBox error: {box_error}")
+        
+        return new_doc
+    
+    def finalize_spread(self, doc, output_path: Path, rotation: Union[int, Sequence[int]] = -90,
+                        save_profile: str = DEFAULT_SAVE_PROFILE, optimize: bool = False,
+                        linearize: bool = False, mutation_slug: Optional[str] = None,
+                        reproducible: Optional[Tuple[str, datetime]] = None, prepared: bool = False) -> bool:
+        """
+        Dokončí jednu variantu dvojstrany: razítko mutace, rotace, PDF/X metadata a uložení.
+        
+        Args:
+            doc: Dokument z compose_spread() (upravuje se na místě)
+            output_path: Cesta pro výstupní PDF
+            rotation: Rotace všech stránek, nebo rotace po stránkách (arch: přední, zadní)
+            mutation_slug: Kód mutace pro razítko (None = bez razítka)
+            reproducible: (hash vstupů a voleb skládání, čas) pro reprodukovatelný výstup - viz _reproducible_source()
+            prepared: Dokument už prošel uložením s volbami profilu - uloží se bez garbage collection
+        """
+        save_options = get_save_options(save_profile)
+        if optimize:
+            save_options.update(COMPACT_SAVE_OPTIONS)
+        
+        timestamp = None
+        document_id = None
+        if reproducible:
+            input_digest, timestamp = reproducible
+            # ID závisí na všem, co mění obsah výstupu - vstupech a volbách skládání (v input_digest),
+            # názvu, razítku, rotaci, volbách uložení a linearizaci
+            identity = (f"{input_digest}|{output_path.name}|{mutation_slug}|{rotation}"
+                        f"|{sorted(save_options.items())}|{linearize}")
+            document_id = hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+        
+        rotations = [rotation] * doc.page_count if isinstance(rotation, int) else list(rotation)
+        # Jedno otevřené razítko pro všechny stránky - font a Form XObject se vloží jen jednou
+        overlay_doc = fitz.open('pdf', self._mutation_overlay(mutation_slug)) if mutation_slug else None
+        try:
+            for page, page_rotation in zip(doc, rotations):
+                # Razítko se umisťuje v neotočených souřadnicích - rotace až potom
+                if overlay_doc is not None:
+                    self._stamp_mutation(page, mutation_slug, overlay_doc)
                 
-                # Vytvoříme kompletní PDF/X-1a:2001 XMP metadata
-                # Včetně GTS_PDFXVersion, Trapped, OutputIntent info
-                xmp_metadata = f'''<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>
+                # Aplikace dynamické rotace na celou stránku
+                page.set_rotation(page_rotation)
+        finally:
+            if overlay_doc is not None:
+                overlay_doc.close()
+        
+        logger.info(f"  🔄 Stránka otočena o {rotation} stupňů")
+        
+        self._apply_pdfx_metadata(doc, output_path, timestamp, document_id)
+        
+        if document_id:
+            # Vlastní /ID v traileru a zákaz generování nového - MuPDF by jinak použil náhodné
+            doc.xref_set_key(-1, 'ID', f'[<{document_id}><{document_id}>]')
+            save_options['no_new_id'] = True
+        
+        if prepared:
+            # Základ je deduplikovaný a vyčištěný - nové objekty (razítko, metadata) jen zkomprimovat
+            save_options.update({'garbage': 0, 'clean': False, 'deflate': True})
+        
+        # Uložení dokumentu podle profilu (barvy jsou nyní zachovány díky content copy)
+        logger.info(f"  💾 Ukládám do: {output_path} (profil {save_profile})")
+        try:
+            self._save_document(doc, output_path, save_options, linearize)
+            logger.info(f"  ✅ Soubor uložen")
+        except Exception as save_error:
+            logger.error(f"  ❌ Chyba při ukládání: {save_error}")
+            return False
+        
+        # Ověření že soubor existuje
+        if not output_path.exists():
+            logger.error(f"❌ Soubor nebyl vytvořen: {output_path}")
+            return False
+        
+        file_size = output_path.stat().st_size / (1024 * 1024)
+        logger.info(f"✅ Merge úspěšný: {output_path.name} ({file_size:.2f} MB)")
+        
+        # Post-processing: Konverze na PDF/X-1a:2001 pomocí Ghostscript
+        # VYPNUTO - Ghostscript kazí naše metadata!
+        # if self._convert_to_pdfx_with_ghostscript(output_path):
+        #     logger.info(f"✅ PDF konvertováno na PDF/X-1a:2001 pomocí Ghostscript")
+        # else:
+        #     logger.info(f"ℹ️  Ghostscript není dostupný, PDF má XMP metadata ale není plně PDF/X-1a validní")
+        
+        return True
+    
+    def _source_path(self, pdf_path: Path) -> Path:
+        """Cesta, ze které se vstup skutečně otevře - normalizovaná kopie z cache"""
+        if self.page_cache is None:
+            return pdf_path
+        return self.page_cache.normalized(pdf_path)
+    
+    def _mutation_overlay(self, mutation: str) -> bytes:
+        """
+        Malé PDF s kódem mutace (razítko) - vytvoří se jednou pro každý kód a pak se jen vkládá.
+        
+        Font je vložený a zmenšený na použité glyfy, barva 100 % K (PDF/X-1a bez RGB).
+        """
+        with self._overlay_lock:
+            cached = self._overlay_cache.get(mutation)
+        if cached is not None:
+            return cached
+        
+        font = fitz.Font('helv')
+        width = font.text_length(mutation, fontsize=MUTATION_SLUG_FONT_SIZE) + 2
+        height = MUTATION_SLUG_FONT_SIZE * 1.4
+        
+        overlay_doc = fitz.open()
+        overlay_page = overlay_doc.new_page(width=width, height=height)
+        overlay_page.insert_font(fontname='MutSlug', fontbuffer=font.buffer)
+        overlay_page.insert_text((1, MUTATION_SLUG_FONT_SIZE), mutation, fontname='MutSlug',
+                                 fontsize=MUTATION_SLUG_FONT_SIZE, color=MUTATION_SLUG_COLOR)
+        try:
+            overlay_doc.subset_fonts()
+        except Exception:
+            pass  # bez fonttools zůstane font celý - razítko je i tak malé
+        data = overlay_doc.tobytes(garbage=4, deflate=True)
+        overlay_doc.close()
+        
+        with self._overlay_lock:
+            self._overlay_cache[mutation] = data
+        return data
+    
+    def _stamp_mutation(self, page, mutation: str, overlay_doc) -> None:
+        """Vloží razítko mutace do levého dolního rohu dvojstrany (jako sdílený Form XObject)"""
+        size = overlay_doc[0].rect
+        bottom = page.rect.height - MUTATION_SLUG_MARGIN
+        target = fitz.Rect(MUTATION_SLUG_MARGIN, bottom - size.height,
+                           MUTATION_SLUG_MARGIN + size.width, bottom)
+        page.show_pdf_page(target, overlay_doc, 0, overlay=True)
+        logger.info(f"  🏷️  Razítko mutace {mutation}")
+    
+    def _reproducible_source(self, pdf_paths: Sequence[Path], **composition) -> Tuple[str, datetime]:
+        """
+        Hash vstupů a čas pro reprodukovatelný výstup.
+        
+        composition jsou volby skládání, které mění výstup (backend, image_dpi, normalize, cmyk,
+        strany vícestránkových zdrojů) - patří do hashe, jinak by různé dvojstrany ze stejného
+        souboru vydání dostaly stejné /ID a XMP UUID.
+        """
+        # Hash každého souboru se počítá jednou - strany z jednoho vydání ho sdílejí
+        digest = hashlib.sha256('|'.join(self._source_digests.digest(path) for path in pdf_paths).encode('ascii'))
+        digest.update(repr(sorted(composition.items())).encode('utf-8'))
+        return digest.hexdigest(), reproducible_timestamp(pdf_paths)
+    
+    def _apply_pdfx_metadata(self, doc, output_path: Path, timestamp: Optional[datetime] = None,
+                             document_id: Optional[str] = None) -> None:
+        """
+        Info slovník, XMP a OutputIntent pro PDF/X-1a:2001
+        
+        Args:
+            timestamp: Čas vytvoření (None = aktuální čas)
+            document_id: 32 hex znaků pro XMP DocumentID/InstanceID (None = náhodné UUID)
+        """
+        # Přidání PDF/X-1a:2001 metadat pro profesionální tisk
+        try:
+            # Standardní metadata včetně CreationDate a ModDate
+            now = (timestamp or datetime.now()).strftime("D:%Y%m%d%H%M%S+00'00'")
+            
+            if document_id:
+                document_uuid = uuid.UUID(hex=document_id)
+                instance_uuid = uuid.uuid5(document_uuid, output_path.name)
+            else:
+                document_uuid = uuid.uuid4()
+                instance_uuid = uuid.uuid4()
+            
+            metadata = {
+                'producer': 'PDF Merger Pro - InDesign-like Quality',
+                'creator': 'PDF Merger Web App',
+                'title': f'Merged Pages - {output_path.name}',
+                'creationDate': now,
+                'modDate': now,
+            }
+            doc.set_metadata(metadata)
+            
+            # Trapped key musí být nastaven speciálně (jako /False, ne string "False")
+            # PyMuPDF to neumí přímo, takže přidáme do XMP
+            
+            # Vytvoříme kompletní PDF/X-1a:2001 XMP metadata
+            # Včetně GTS_PDFXVersion, Trapped, OutputIntent info
+            xmp_metadata = f'''<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>
 <x:xmpmeta xmlns:x="adobe:ns:meta/">
   <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
     <rdf:Description rdf:about=""
@@ -358,37 +839,42 @@ class InDesignLikePDFMerger:
       <xmp:ModifyDate>{now}</xmp:ModifyDate>
       <xmp:CreatorTool>PDF Merger Pro - InDesign-like Quality</xmp:CreatorTool>
     </rdf:Description>
+    <rdf:Description rdf:about=""
+        xmlns:xmpMM="http://ns.adobe.com/xap/1.0/mm/">
+      <xmpMM:DocumentID>uuid:{document_uuid}</xmpMM:DocumentID>
+      <xmpMM:InstanceID>uuid:{instance_uuid}</xmpMM:InstanceID>
+    </rdf:Description>
   </rdf:RDF>
 </x:xmpmeta>
 <?xpacket end="w"?>'''
-                new_doc.set_xml_metadata(xmp_metadata)
-                logger.info("  ✅ PDF/X-1a:2001 XMP metadata přidána")
+            doc.set_xml_metadata(xmp_metadata)
+            logger.info("  ✅ PDF/X-1a:2001 XMP metadata přidána")
+            
+            # OutputIntent pro PDF/X-1a:2001 s embedovaným ICC profilem
+            try:
+                icc_profile_path = CMYK_PROFILE_PATH
                 
-                # OutputIntent pro PDF/X-1a:2001 s embedovaným ICC profilem
-                try:
-                    icc_profile_path = Path('icc_profiles/newspaper.icc')
+                if icc_profile_path.exists():
+                    # Načteme ICC profil
+                    with open(icc_profile_path, 'rb') as icc_file:
+                        icc_data = icc_file.read()
+                    
+                    # Vytvoříme ICC stream object s /N parametrem
+                    icc_xref = doc.get_new_xref()
                     
-                    if icc_profile_path.exists():
-                        # Načteme ICC profil
-                        with open(icc_profile_path, 'rb') as icc_file:
-                            icc_data = icc_file.read()
-                        
-                        # Vytvoříme ICC stream object s /N parametrem
-                        icc_xref = new_doc.get_new_xref()
-                        
-                        # Vytvoříme stream s parametry
-                        icc_stream_dict = f'''<<
+                    # Vytvoříme stream s parametry
+                    icc_stream_dict = f'''<<
 /N 4
 /Length {len(icc_data)}
 /Filter /FlateDecode
 >>'''
-                        new_doc.update_object(icc_xref, icc_stream_dict)
-                        new_doc.update_stream(icc_xref, icc_data, compress=True)
-                        
-                        # Vytvoříme OutputIntent s odkazem na ICC profil
-                        catalog_xref = new_doc.pdf_catalog()
-                        new_oi_xref = new_doc.get_new_xref()
-                        output_intent = f'''<<
+                    doc.update_object(icc_xref, icc_stream_dict)
+                    doc.update_stream(icc_xref, icc_data, compress=True)
+                    
+                    # Vytvoříme OutputIntent s odkazem na ICC profil
+                    catalog_xref = doc.pdf_catalog()
+                    new_oi_xref = doc.get_new_xref()
+                    output_intent = f'''<<
 /Type /OutputIntent
 /S /GTS_PDFX
 /OutputConditionIdentifier (CGATS TR 001)
@@ -396,97 +882,197 @@ class InDesignLikePDFMerger:
 /Info (ISOnewspaper26v4)
 /DestOutputProfile {icc_xref} 0 R
 >>'''
-                        new_doc.update_object(new_oi_xref, output_intent)
-                        new_doc.xref_set_key(catalog_xref, 'OutputIntents', f'[{new_oi_xref} 0 R]')
-                        
-                        logger.info(f"  ✅ OutputIntent + ICC profil embedován ({len(icc_data)} bytes)")
-                    else:
-                        # Fallback bez ICC profilu
-                        catalog_xref = new_doc.pdf_catalog()
-                        new_oi_xref = new_doc.get_new_xref()
-                        output_intent = '''<<
+                    doc.update_object(new_oi_xref, output_intent)
+                    doc.xref_set_key(catalog_xref, 'OutputIntents', f'[{new_oi_xref} 0 R]')
+                    
+                    logger.info(f"  ✅ OutputIntent + ICC profil embedován ({len(icc_data)} bytes)")
+                else:
+                    # Fallback bez ICC profilu
+                    catalog_xref = doc.pdf_catalog()
+                    new_oi_xref = doc.get_new_xref()
+                    output_intent = '''<<
 /Type /OutputIntent
 /S /GTS_PDFX
 /OutputConditionIdentifier (CGATS TR 001)
 /RegistryName (http://www.color.org)
 /Info (ISOnewspaper26v4)
 >>'''
-                        new_doc.update_object(new_oi_xref, output_intent)
-                        new_doc.xref_set_key(catalog_xref, 'OutputIntents', f'[{new_oi_xref} 0 R]')
-                        logger.info("  ✅ OutputIntent přidán (bez ICC profilu)")
-                        
-                except Exception as oi_error:
-                    logger.warning(f"  ⚠️  OutputIntent error: {oi_error}")
+                    doc.update_object(new_oi_xref, output_intent)
+                    doc.xref_set_key(catalog_xref, 'OutputIntents', f'[{new_oi_xref} 0 R]')
+                    logger.info("  ✅ OutputIntent přidán (bez ICC profilu)")
+                    
+            except Exception as oi_error:
+                logger.warning(f"  ⚠️  OutputIntent error: {oi_error}")
+            
+            # Přidání GTS_PDFXVersion a Trapped do Info Dictionary
+            # (Acrobat Preflight je tam hledá!)
+            try:
+                import re
+                trailer_str = doc.pdf_trailer()
+                
+                # Najdeme Info xref z trailer
+                info_match = re.search(r'/Info\s+(\d+)\s+0\s+R', trailer_str)
                 
-                # Přidání GTS_PDFXVersion a Trapped do Info Dictionary
-                # (Acrobat Preflight je tam hledá!)
-                try:
-                    import re
-                    trailer_str = new_doc.pdf_trailer()
+                if info_match:
+                    info_xref = int(info_match.group(1))
                     
-                    # Najdeme Info xref z trailer
-                    info_match = re.search(r'/Info\s+(\d+)\s+0\s+R', trailer_str)
+                    # Přidáme GTS_PDFXVersion a Trapped
+                    # DŮLEŽITÉ: PDF/X-1a:2001 (s "a"!) pro Acrobat Preflight
+                    doc.xref_set_key(info_xref, 'GTS_PDFXVersion', '(PDF/X-1a:2001)')
+                    doc.xref_set_key(info_xref, 'Trapped', '/False')
                     
-                    if info_match:
-                        info_xref = int(info_match.group(1))
-                        
-                        # Přidáme GTS_PDFXVersion a Trapped
-                        # DŮLEŽITÉ: PDF/X-1a:2001 (s "a"!) pro Acrobat Preflight
-                        new_doc.xref_set_key(info_xref, 'GTS_PDFXVersion', '(PDF/X-1a:2001)')
-                        new_doc.xref_set_key(info_xref, 'Trapped', '/False')
-                        
-                        logger.info("  ✅ GTS_PDFXVersion a Trapped přidány do Info Dictionary")
-                    else:
-                        logger.warning("  ⚠️  Info Dictionary nenalezen v trailer")
-                        
-                except Exception as info_error:
-                    logger.warning(f"  ⚠️  Info Dictionary error: {info_error}")
+                    logger.info("  ✅ GTS_PDFXVersion a Trapped přidány do Info Dictionary")
+                else:
+                    logger.warning("  ⚠️  Info Dictionary nenalezen v trailer")
                     
-            except Exception as meta_error:
-                logger.warning(f"  ⚠️  Nepodařilo se přidat PDF/X metadata: {meta_error}")
-                # Pokračujeme i bez metadat
-            
-            # Uložení dokumentu s optimalizací (barvy jsou nyní zachovány díky content copy)
-            logger.info(f"  💾 Ukládám do: {output_path}")
-            try:
-                new_doc.save(str(output_path), 
-                            garbage=4,           # Odstraní nepoužívané objekty
-                            deflate=True,        # Komprese
-                            clean=True)          # Vyčištění
-                logger.info(f"  ✅ Soubor uložen")
-            except Exception as save_error:
-                logger.error(f"  ❌ Chyba při ukládání: {save_error}")
-                new_doc.close()
-                left_doc.close()
-                right_doc.close()
-                return False
-            
-            new_doc.close()
-            left_doc.close()
-            right_doc.close()
-            
-            # Ověření že soubor existuje
-            if not output_path.exists():
-                logger.error(f"❌ Soubor nebyl vytvořen: {output_path}")
+            except Exception as info_error:
+                logger.warning(f"  ⚠️  Info Dictionary error: {info_error}")
+                
+        except Exception as meta_error:
+            logger.warning(f"  ⚠️  Nepodařilo se přidat PDF/X metadata: {meta_error}")
+            # Pokračujeme i bez metadat
+    
+    def _compose_spread_xobject(self, new_doc, left_doc, right_doc, left_index: int = 0, right_index: int = 0):
+        """
+        Složí dvojstranu přes show_pdf_page - každá stránka je vložená jako Form XObject.
+        
+        Returns:
+            Nová stránka dvojstrany v new_doc
+        """
+        left_rect = left_doc[left_index].rect
+        right_rect = right_doc[right_index].rect
+        
+        # Vytvoření nové stránky s dvojnásobnou šířkou
+        new_width = left_rect.width + right_rect.width
+        new_height = max(left_rect.height, right_rect.height)
+        new_page = new_doc.new_page(width=new_width, height=new_height)
+        
+        # Kopírování obsahu levé stránky (zachovává text a vektory)
+        left_clip = fitz.Rect(0, 0, left_rect.width, left_rect.height)
+        new_page.show_pdf_page(left_clip, left_doc, left_index)
+        
+        # Kopírování obsahu pravé stránky (zachovává text a vektory)
+        right_clip = fitz.Rect(left_rect.width, 0, new_width, right_rect.height)
+        new_page.show_pdf_page(right_clip, right_doc, right_index)
+        
+        return new_page
+    
+    def _compose_spread_splice(self, new_doc, left_doc, right_doc, left_index: int = 0, right_index: int = 0):
+        """
+        Složí dvojstranu přímým spojením content streamů (bez obalení do Form XObjectu).
+        
+        Operátory obou stránek jdou rovnou do obsahu dvojstrany, každá ve vlastním
+        q ... Q s ořezem a posunem. Resources se sloučí, kolidující jména se přejmenují.
+        RIP pak nemusí rozbalovat další úroveň formulářů.
+        
+        Returns:
+            Nová stránka dvojstrany v new_doc
+        """
+        if left_doc[left_index].rotation or right_doc[right_index].rotation:
+            logger.info("  ↪️  Zdrojová stránka má /Rotate - skládám přes Form XObject")
+            return self._compose_spread_xobject(new_doc, left_doc, right_doc, left_index, right_index)
+        
+        # Zkopírujeme obě stránky i se vším, na co odkazují (fonty, obrázky...)
+        new_doc.insert_pdf(left_doc, from_page=left_index, to_page=left_index)
+        new_doc.insert_pdf(right_doc, from_page=right_index, to_page=right_index)
+        
+        boxes = [page_box(new_doc[i]) for i in (0, 1)]
+        widths = [box[2] - box[0] for box in boxes]
+        heights = [box[3] - box[1] for box in boxes]
+        spread_height = max(heights)
+        
+        resources = {}
+        parts = []
+        x = 0.0
+        for index, suffix in ((0, 'L'), (1, 'R')):
+            page = new_doc[index]
+            x0, y0, _, _ = boxes[index]
+            width, height = widths[index], heights[index]
+            content = page.read_contents()
+            
+            operations = parse_content(content)
+            renames = merge_resources(resources, get_resources(new_doc, page.xref), suffix)
+            unclosed_q, missing_q = graphics_state_balance(operations)
+            if any(renames.values()) or unclosed_q or missing_q:
+                operations = rename_resources(operations, renames)
+                content = b'q\n' * missing_q + serialize_content(operations) + b'Q\n' * unclosed_q
+            
+            # Stránky zarovnáváme nahoru (stejně jako show_pdf_page)
+            y = spread_height - height
+            header = (f"q {format_number(x)} {format_number(y)} {format_number(width)} "
+                      f"{format_number(height)} re W n 1 0 0 1 {format_number(x - x0)} "
+                      f"{format_number(y - y0)} cm\n")
+            parts.append(header.encode('latin-1') + content + b'\nQ\n')
+            x += width
+        
+        new_page = new_doc.new_page(width=sum(widths), height=spread_height)
+        set_page_content(new_doc, new_page.xref, b''.join(parts))
+        new_doc.xref_set_key(new_page.xref, 'Resources', resources_to_pdf(resources))
+        
+        # Původní zkopírované stránky už nejsou potřeba - jejich zdroje drží nová stránka
+        new_doc.delete_pages([0, 1])
+        return new_doc[0]
+    
+    def _save_document(self, doc, output_path: Path, save_options: dict, linearize: bool = False) -> None:
+        """
+        Uloží dokument, volitelně linearizovaný.
+        
+        MuPDF od verze 1.24 linearizaci nepodporuje - uložený soubor proto linearizuje qpdf
+        (balíček pikepdf, jinak příkaz qpdf). Bez nich zůstane výstup běžný a zaloguje se varování.
+        """
+        doc.save(str(output_path), **save_options)
+        if linearize:
+            self._linearize_file(output_path)
+    
+    def _linearize_file(self, pdf_path: Path) -> bool:
+        """
+        Linearizuje ("fast web view") uložené PDF na místě.
+        
+        Returns:
+            True pokud byl soubor linearizován
+        """
+        try:
+            import pikepdf
+        except ImportError:
+            pikepdf = None
+        qpdf_path = shutil.which('qpdf')
+        
+        try:
+            if pikepdf is not None:
+                # deterministic_id: /ID z obsahu - reprodukovatelný export zůstává bajtově stejný
+                with pikepdf.open(str(pdf_path), allow_overwriting_input=True) as pdf:
+                    pdf.save(str(pdf_path), linearize=True, deterministic_id=True)
+            elif qpdf_path:
+                # Návratový kód 3 = hotovo s varováními
+                result = subprocess.run([qpdf_path, '--linearize', '--deterministic-id', '--replace-input',
+                                         str(pdf_path)], capture_output=True, text=True)
+                if result.returncode not in (0, 3):
+                    raise RuntimeError(result.stderr.strip() or f"qpdf exit {result.returncode}")
+            else:
+                logger.warning("  ⚠️  Linearizace vyžaduje balíček pikepdf (pip install pikepdf) nebo qpdf - "
+                               "výstup zůstává nelinearizovaný")
                 return False
-            
-            file_size = output_path.stat().st_size / (1024 * 1024)
-            logger.info(f"✅ Merge úspěšný: {output_path.name} ({file_size:.2f} MB)")
-            
-            # Post-processing: Konverze na PDF/X-1a:2001 pomocí Ghostscript
-            # VYPNUTO - Ghostscript kazí naše metadata!
-            # if self._convert_to_pdfx_with_ghostscript(output_path):
-            #     logger.info(f"✅ PDF konvertováno na PDF/X-1a:2001 pomocí Ghostscript")
-            # else:
-            #     logger.info(f"ℹ️  Ghostscript není dostupný, PDF má XMP metadata ale není plně PDF/X-1a validní")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ EXCEPTION při merge: {type(e).__name__}: {str(e)}")
-            import traceback
-            logger.error(f"  Traceback: {traceback.format_exc()}")
+        except Exception as linear_error:
+            logger.warning(f"  ⚠️  Linearizace selhala ({linear_error}), výstup zůstává nelinearizovaný")
             return False
+        
+        logger.info("  ⚡ Uloženo linearizovaně (fast web view)")
+        return True
+    
+    def _optimize_document(self, doc) -> None:
+        """
+        Zmenší vložené fonty na subsety s opravdu použitými glyfy.
+        
+        Fonty zůstávají vložené, takže výstup dál splňuje PDF/X-1a.
+        Deduplikaci a kompresi obstarají COMPACT_SAVE_OPTIONS při uložení.
+        """
+        try:
+            doc.subset_fonts()
+            logger.info("  ✅ Fonty zmenšeny na použité glyfy (subset)")
+        except ImportError:
+            logger.warning("  ⚠️  Subset fontů vyžaduje balíček fonttools (pip install fonttools)")
+        except Exception as subset_error:
+            logger.warning(f"  ⚠️  Subset fontů selhal: {subset_error}")
     
     def create_side_by_side_pdf_pypdf2(self, left_pdf: Path, right_pdf: Path, output_path: Path, 
                                       rotation: int = -90) -> bool:
@@ -592,13 +1178,15 @@ class InDesignLikePDFMerger:
             logger.error(f"Chyba při vytváření PyPDF2 PDF: {e}")
             return False
     
-    def merge_pairs(self, rotation: int = -90, mode: str = "indesign_like") -> list:
+    def merge_pairs(self, rotation: int = -90, mode: str = "indesign_like",
+                    save_profile: str = DEFAULT_SAVE_PROFILE) -> list:
         """
         Spojí páry PDF souborů do dvoustran
         
         Args:
             rotation: Úhel rotace (90 nebo -90 stupňů)
             mode: Režim ("indesign_like", "pypdf2")
+            save_profile: Profil ukládání pro režim indesign_like ("print", "fast")
         """
         pdf_files = self.get_pdf_files()
         merged_files = []
@@ -629,7 +1217,8 @@ class InDesignLikePDFMerger:
                     
                     success = False
                     if mode == "indesign_like":
-                        success = self.create_side_by_side_pdf_indesign_like(left_pdf, right_pdf, output_path, rotation)
+                        success = self.create_side_by_side_pdf_indesign_like(left_pdf, right_pdf, output_path, rotation,
+                                                                             save_profile)
                     elif mode == "pypdf2":
                         success = self.create_side_by_side_pdf_pypdf2(left_pdf, right_pdf, output_path, rotation)
                     
@@ -658,6 +1247,7 @@ class InDesignLikePDFMerger:
     def _convert_to_pdfx_with_ghostscript(self, pdf_path: Path) -> bool:
         """
         Konvertuje PDF na PDF/X-1a:2001 pomocí Ghostscript
+        (v trvalém workeru ghostscript_pool, je-li nastaven - jinak nový gs proces)
         
         Args:
             pdf_path: Cesta k PDF souboru
@@ -665,6 +1255,8 @@ class InDesignLikePDFMerger:
         Returns:
             True pokud konverze uspěla, False jinak
         """
+        if self.ghostscript_pool is not None:
+            return self.ghostscript_pool.convert(pdf_path)['success']
         if not self.ghostscript_path:
             return False
         
@@ -679,16 +1271,7 @@ class InDesignLikePDFMerger:
                 '-dBATCH',
                 '-dNOPAUSE',
                 '-dSAFER',
-                '-sDEVICE=pdfwrite',
-                '-dCompatibilityLevel=1.3',
-                '-dPDFSETTINGS=/prepress',
-                '-sColorConversionStrategy=LeaveColorUnchanged',  # Necháme CMYK
-                '-dEmbedAllFonts=true',
-                '-dSubsetFonts=false',
-                '-dAutoFilterColorImages=false',
-                '-dAutoFilterGrayImages=false',
-                '-dColorImageFilter=/FlateEncode',
-                '-dGrayImageFilter=/FlateEncode',
+                *PDFX_ARGS,
                 f'-sOutputFile={temp_output}',
                 str(pdf_path)
             ]
@@ -700,7 +1283,7 @@ class InDesignLikePDFMerger:
                 gs_command,
                 capture_output=True,
                 text=True,
-                timeout=60  # Max 60 sekund
+                timeout=GS_TIMEOUT
             )
             
             if result.returncode == 0 and temp_output.exists():
@@ -720,7 +1303,7 @@ class InDesignLikePDFMerger:
                 return False
                 
         except subprocess.TimeoutExpired:
-            logger.warning(f"  ⚠️  Ghostscript konverze timeout (>60s)")
+            logger.warning(f"  ⚠️  Ghostscript konverze timeout (>{GS_TIMEOUT}s)")
             return False
         except Exception as e:
             logger.warning(f"  ⚠️  Chyba při Ghostscript konverzi: {e}")
@@ -735,6 +1318,8 @@ def main():
                        help="Úhel rotace (90 nebo -90 stupňů)")
     parser.add_argument("--mode", choices=["indesign_like", "pypdf2"], default="indesign_like",
                        help="Režim: indesign_like (přímé kopírování), pypdf2 (alternativní)")
+    parser.add_argument("--save-profile", choices=list(SAVE_PROFILES.keys()), default=DEFAULT_SAVE_PROFILE,
+                       help="Profil ukládání: print (plná optimalizace pro tisk), fast (rychlé uložení pro náhledy)")
     parser.add_argument("--auto", action="store_true", help="Automatické spojení všech párových souborů")
     
     args = parser.parse_args()
@@ -745,7 +1330,7 @@ def main():
     if args.auto:
         # Automatické spojení všech párových souborů
         logger.info(f"Spouštím automatické spojování všech párových souborů - režim: {args.mode}")
-        merged_files = merger.merge_pairs(args.rotation, args.mode)
+        merged_files = merger.merge_pairs(args.rotation, args.mode, args.save_profile)
         
         if merged_files:
             logger.info(f"Úspěšně vytvořeno {len(merged_files)} spojených PDF souborů:")
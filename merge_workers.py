@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Merge dvojstran v samostatných procesech
+Zdrojová PDF úlohy se načtou jednou do sdílené paměti a workery dostanou jen její jméno -
+stranu otevřou přímo nad sdílenými bajty (fitz.open(stream=memoryview)), bez kopie a bez
+dalšího čtení z disku, ať stranu potřebuje kolik mutací a procesů chce.
+Worker po N úlohách nebo nad limitem RSS skončí a další úloha spustí nový - paměť
+fragmentovaná MuPDF se tak vrací systému průběžně, ne až při OOM.
+Poškozené PDF může MuPDF zaseknout nebo shodit - worker má proto časový limit a limit
+paměti; zaseknutý nebo spadlý se zabije, jeho dvojstrana selže a další úloha spustí nový
+"""
+
+import logging
+import mmap
+import os
+import queue
+import re
+import socket
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fitz
+
+from page_sources import DocumentPool
+
+try:
+    import resource
+except ImportError:
+    # Windows - limit paměti workeru není k dispozici
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Odkaz na zdroj ve sdílené paměti: (jméno segmentu, velikost souboru v bajtech)
+SourceHandle = Tuple[str, int]
+
+# Časový limit merge jedné dvojstrany (archu) ve workeru (s)
+UNIT_TIMEOUT = 300
+
+# Worker dostává socket přes pass_fds - jen POSIX. Výchozí jsou workery jen na Linuxu,
+# kde zdroje čtou přímo z /dev/shm a RLIMIT_AS omezuje opravdu celý proces
+WORKERS_SUPPORTED = os.name == 'posix'
+DEFAULT_WORKERS = (os.cpu_count() or 1) if sys.platform.startswith('linux') else 0
+
+# Skript procesu workeru - spouští se jako samostatný interpret (viz _WorkerProcess)
+WORKER_SCRIPT = Path(__file__).resolve()
+
+_SHM_DIR = Path('/dev/shm')
+
+_STORE_ITEM_SIZE_RE = re.compile(rb'\[size=(\d+)\]')
+
+
+def process_rss() -> int:
+    """Aktuální RSS procesu v bajtech (0, kde /proc není)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def store_size() -> int:
+    """
+    Velikost MuPDF resource store procesu v bajtech.
+
+    PyMuPDF ji přes TOOLS.store_size() nevrací ve všech verzích - pak ji sečteme
+    z výpisu obsahu store (fz_debug_store).
+    """
+    size = fitz.TOOLS.store_size()
+    if size is not None:
+        return size
+    buffer = fitz.mupdf.FzBuffer(4096)
+    output = fitz.mupdf.FzOutput(buffer)
+    fitz.mupdf.fz_debug_store(output)
+    output.fz_close_output()
+    listing = bytes(buffer.fz_buffer_extract())
+    # Každá položka je ve výpisu dvakrát (seznam a hash tabulka) - počítáme jen seznam
+    listing = listing.split(b'-- resource store hash contents --')[0]
+    return sum(int(size) for size in _STORE_ITEM_SIZE_RE.findall(listing))
+
+
+def trim_store(limit: int) -> int:
+    """
+    Zmenší MuPDF store pod limit (MuPDF ho jinak drží až do své výchozí velikosti).
+
+    Args:
+        limit: Limit v bajtech (0 = bez limitu)
+
+    Returns:
+        Velikost store po zmenšení v bajtech
+    """
+    size = store_size()
+    if limit and size > limit:
+        fitz.TOOLS.store_shrink(min(100, (size - limit) * 100 // size + 1))
+        size = store_size()
+    return size
+
+
+def process_usage(jobs: Optional[int] = None) -> dict:
+    """Paměť procesu pro stav úlohy: {'pid', 'rss_mb', 'store_mb'} (a počet úloh workeru)"""
+    usage = {'pid': os.getpid(), 'rss_mb': round(process_rss() / (1024 * 1024), 1),
+             'store_mb': round(store_size() / (1024 * 1024), 1)}
+    if jobs is not None:
+        usage['jobs'] = jobs
+    return usage
+
+
+def _attach_segment(name: str, size: int) -> tuple:
+    """
+    Namapuje segment úlohy v procesu workeru.
+
+    Na Linuxu jen pro čtení přímo z /dev/shm - ne přes SharedMemory, ta si (do Pythonu 3.13)
+    připojení registruje v resource trackeru workeru, který segment při konci workeru smaže,
+    a při neúspěšném mmap (limit paměti) ho smaže rovnou. Segment patří úloze, ruší ho jen
+    SharedSources. Jinde (macOS) přes SharedMemory bez registrace.
+
+    Returns:
+        (segment k zavření, pohled na bajty zdroje)
+    """
+    if _SHM_DIR.is_dir():
+        fd = os.open(_SHM_DIR / name, os.O_RDONLY)
+        try:
+            segment = mmap.mmap(fd, max(size, 1), access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        return segment, memoryview(segment)[:size]
+
+    try:
+        segment = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment, segment.buf[:size]
+
+
+class SharedSources:
+    """Zdrojová PDF jedné úlohy ve sdílené paměti - každý soubor se načte jen jednou"""
+
+    def __init__(self, resolve: Optional[Callable[[Path], Path]] = None):
+        """
+        Args:
+            resolve: Cesta, ze které se zdroj skutečně čte (např. PageCache.normalized) -
+                     None = přímo zadaná cesta
+        """
+        self._resolve = resolve
+        self._segments: Dict[str, Tuple[shared_memory.SharedMemory, int]] = {}
+        self._lock = threading.Lock()
+
+    def share(self, path: Path) -> SourceHandle:
+        """Zdroj ve sdílené paměti (při prvním požadavku ho načte)"""
+        key = str(path)
+        with self._lock:
+            entry = self._segments.get(key)
+            if entry is None:
+                source = self._resolve(Path(path)) if self._resolve else Path(path)
+                size = source.stat().st_size
+                segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+                with open(source, 'rb') as f:
+                    f.readinto(segment.buf[:size])
+                entry = self._segments[key] = (segment, size)
+            segment, size = entry
+        return segment.name, size
+
+    def handles(self, paths) -> Dict[str, SourceHandle]:
+        """Odkazy na zdroje pro worker ({cesta: (segment, velikost)})"""
+        return {str(path): self.share(path) for path in paths}
+
+    def close(self) -> None:
+        """Uvolní sdílenou paměť úlohy"""
+        with self._lock:
+            for segment, _ in self._segments.values():
+                segment.close()
+                try:
+                    segment.unlink()
+                except FileNotFoundError:
+                    pass
+            self._segments.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SharedDocumentPool(DocumentPool):
+    """DocumentPool workeru - zdroje ze sdílené paměti otevírá nad jejími bajty, ostatní z disku"""
+
+    def __init__(self, handles: Dict[str, SourceHandle]):
+        super().__init__()
+        self._handles = handles
+        self._segments: list = []
+        self._views: List[memoryview] = []
+
+    def get(self, path: Path) -> fitz.Document:
+        key = str(path)
+        if key in self._documents or key not in self._handles:
+            return super().get(path)
+
+        name, size = self._handles[key]
+        segment, view = _attach_segment(name, size)
+        self._segments.append(segment)
+        try:
+            doc = fitz.open(stream=view, filetype='pdf')
+            self._views.append(view)
+        except TypeError:
+            # Starší PyMuPDF bere jen bytes - jedna kopie v procesu workeru
+            doc = fitz.open(stream=bytes(view), filetype='pdf')
+            view.release()
+        self._documents[key] = doc
+        return doc
+
+    def close(self) -> None:
+        # Dokumenty před pohledy, pohledy před segmenty - jinak by segment nešel zavřít
+        super().close()
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        for segment in self._segments:
+            segment.close()
+        self._segments.clear()
+
+
+# Merger procesu workeru (vzniká při startu, jeden na proces)
+_merger = None
+
+
+def _init_worker() -> None:
+    global _merger
+    from indesign_like_pdf_merger import InDesignLikePDFMerger
+    _merger = InDesignLikePDFMerger()
+
+
+def merge_unit(sides: List[dict], outputs: Dict[str, Path], options: dict,
+               handles: Dict[str, SourceHandle]) -> Tuple[Dict[str, bool], dict]:
+    """
+    Složí dvojstranu (nebo arch) všech mutací v procesu workeru.
+
+    Returns:
+        (výsledky podle mutací, statistiky kroků)
+    """
+    stats = {}
+    with SharedDocumentPool(handles) as documents:
+        results = _merger.create_sheet_variants(sides, outputs, stats=stats, documents=documents, **options)
+    return results, stats
+
+
+def _worker_main(conn: Connection) -> None:
+    """
+    Smyčka procesu workeru: limity -> (úloha z roury -> merge -> odpověď)...
+
+    Odpověď je (stav 'ok'/'error', výsledek nebo text chyby, paměť workeru, recyklovat).
+    Po odpovědi s recyklací worker skončí.
+    """
+    limits = conn.recv()
+    _init_worker()
+    if limits['memory'] and resource is not None:
+        # Adresní prostor celého procesu (včetně namapovaných zdrojů) - MuPDF nad limitem selže
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limits['memory'], limits['memory']))
+        except (ValueError, OSError) as limit_error:
+            logger.warning(f"⚠️  Limit paměti merge workeru nelze nastavit: {limit_error}")
+
+    jobs = 0
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        failed = False
+        try:
+            reply = ('ok', merge_unit(*task))
+        except Exception as e:
+            # Po chybě (typicky MemoryError) nemusí být stav MuPDF v pořádku - worker skončí
+            reply = ('error', f"{type(e).__name__}: {e}")
+            failed = True
+        jobs += 1
+
+        trim_store(limits['store'])
+        usage = process_usage(jobs)
+        recycle = (failed or (limits['max_jobs'] and jobs >= limits['max_jobs']) or
+                   (limits['max_rss'] and process_rss() > limits['max_rss']))
+        conn.send((*reply, usage, bool(recycle)))
+        if recycle:
+            break
+    conn.close()
+
+
+class _WorkerProcess:
+    """
+    Jeden proces workeru a jeho roura (socketpair).
+
+    Worker je samostatný interpret (subprocess, ne multiprocessing spawn) - spawn by v každém
+    workeru znovu provedl hlavní modul aplikace (python web_app.py) i s jeho vlákny a pooly.
+    """
+
+    def __init__(self, limits: dict):
+        parent_sock, child_sock = socket.socketpair()
+        with child_sock:
+            # stdout workeru patří logům aplikace - úlohy jdou jen přes socket
+            self.process = subprocess.Popen([sys.executable, str(WORKER_SCRIPT), str(child_sock.fileno())],
+                                            pass_fds=[child_sock.fileno()])
+        self.conn = Connection(parent_sock.detach())
+        self.conn.send(limits)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, task: tuple, timeout: float) -> tuple:
+        """
+        Raises:
+            TimeoutError: Merge nedoběhl v limitu
+            RuntimeError: Worker během merge skončil (pád MuPDF, překročený limit paměti)
+        """
+        try:
+            self.conn.send(task)
+            finished = self.conn.poll(timeout)
+            if finished:
+                return self.conn.recv()
+        except (EOFError, OSError):
+            try:
+                code = self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                code = None
+            reason = f"signál {-code}" if code is not None and code < 0 else f"exit {code}"
+            raise RuntimeError(f"merge worker spadl ({reason})")
+        raise TimeoutError(f"merge nedoběhl do {timeout:g} s")
+
+    def stop(self, timeout: float = 5) -> None:
+        """Ukončí worker (po doběhnutí aktuální úlohy), zaseknutý zabije"""
+        try:
+            if self.alive():
+                self.conn.send(None)
+            self.process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        finally:
+            self.kill()
+
+    def kill(self) -> None:
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        self.conn.close()
+
+
+class MergeWorkerPool:
+    """
+    Pool procesů pro merge - zdroje předává přes SharedSources.
+
+    Procesy se spouští líně (nejvýše `workers` najednou) a recyklují se po max_jobs
+    úlohách nebo nad max_rss; store MuPDF každého workeru drží pod limitem store.
+    Worker, který nedoběhne v časovém limitu nebo spadne, se zabije - jeho úloha selže
+    a další úloha si spustí nový.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_jobs: int = 0, max_rss: int = 0, store: int = 0,
+                 timeout: float = UNIT_TIMEOUT, memory: int = 0):
+        """
+        Args:
+            workers: Počet procesů (None = počet CPU)
+            max_jobs: Recyklovat worker po tolika úlohách (0 = nikdy)
+            max_rss: Recyklovat worker, jehož RSS po úloze přesáhne tolik bajtů (0 = nikdy)
+            store: Limit MuPDF store workeru v bajtech (0 = výchozí MuPDF)
+            timeout: Časový limit jedné úlohy (s)
+            memory: Limit adresního prostoru workeru v bajtech (RLIMIT_AS, 0 = bez limitu)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.limits = {'max_jobs': max_jobs, 'max_rss': max_rss, 'store': store, 'memory': memory}
+        self._idle = queue.LifoQueue()
+        self._usage: Dict[int, dict] = {}
+        self._usage_lock = threading.Lock()
+        self.recycled = 0
+        self.killed = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='merge')
+
+    def submit(self, sides: List[dict], outputs: Dict[str, Path], options: dict,
+               sources: SharedSources) -> Future:
+        """Zařadí merge jednotky - Future vrací (výsledky podle mutací, statistiky)"""
+        paths = [side[key] for side in sides for key in ('left_pdf', 'right_pdf')]
+        task = (sides, outputs, options, sources.handles(paths))
+        return self._executor.submit(self._run, task)
+
+    def _run(self, task: tuple) -> Tuple[Dict[str, bool], dict]:
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            worker = None
+        if worker is None or not worker.alive():
+            worker = _WorkerProcess(self.limits)
+        pid = worker.process.pid
+
+        try:
+            status, payload, usage, recycle = worker.run(task, self.timeout)
+        except Exception as e:
+            # Zaseknutý nebo spadlý worker - nahradí ho další úloha
+            worker.kill()
+            with self._usage_lock:
+                self._usage.pop(pid, None)
+                self.killed += 1
+            logger.error(f"💥 Merge worker {pid} ukončen: {e}")
+            raise
+
+        with self._usage_lock:
+            self._usage[pid] = usage
+        if recycle:
+            worker.stop()
+            with self._usage_lock:
+                self._usage.pop(pid, None)
+                self.recycled += 1
+            logger.info(f"♻️  Merge worker {pid} recyklován po {usage['jobs']} úlohách "
+                        f"(RSS {usage['rss_mb']} MB)")
+        else:
+            self._idle.put(worker)
+
+        if status == 'error':
+            raise RuntimeError(payload)
+        return payload
+
+    def usage(self) -> List[dict]:
+        """Paměť běžících workerů po jejich poslední úloze"""
+        with self._usage_lock:
+            return [dict(usage) for usage in self._usage.values()]
+
+    def close(self) -> None:
+        """Počká na rozběhnuté merge a ukončí všechny workery"""
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+
+if __name__ == "__main__":
+    # Proces workeru (spouští _WorkerProcess): jediný argument je deskriptor socketu k poolu
+    _worker_main(Connection(int(sys.argv[1])))
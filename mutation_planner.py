@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plánovač dvojstran pro mutace vydání
+Mutace se liší jen několika regionálními stránkami - plánovač zjistí,
+které dvojstrany jsou opravdu různé, aby se každá skládala jen jednou
+"""
+
+import logging
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Manifest mutací: {kód mutace: {číslo strany: soubor, který ji v mutaci nahrazuje}}
+Manifest = Dict[str, Dict[int, str]]
+
+
+def parse_manifest(data, mutations: List[str]) -> Manifest:
+    """
+    Načte a ověří manifest mutací z JSON.
+
+    Args:
+        data: {"PXE": {"3": "PR25103003VY2.pdf", ...}, ...} (nebo None)
+        mutations: Exportované mutace - manifest nesmí obsahovat jiné
+
+    Raises:
+        ValueError: Neplatný manifest
+    """
+    if not data:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("Manifest mutací musí být objekt {mutace: {strana: soubor}}")
+
+    manifest = {}
+    for mutation, substitutions in data.items():
+        if mutation not in mutations:
+            raise ValueError(f"Mutace {mutation} z manifestu není mezi exportovanými mutacemi: {mutations}")
+        if not isinstance(substitutions, dict):
+            raise ValueError(f"Náhrady stran mutace {mutation} musí být objekt {{strana: soubor}}")
+
+        pages = {}
+        for page, filename in substitutions.items():
+            try:
+                page_number = int(page)
+            except (TypeError, ValueError):
+                raise ValueError(f"Neplatné číslo strany v manifestu mutace {mutation}: {page}")
+            if not isinstance(filename, str) or not filename:
+                raise ValueError(f"Neplatný soubor pro stranu {page_number} mutace {mutation}: {filename}")
+            pages[page_number] = filename
+        manifest[mutation] = pages
+    return manifest
+
+
+def plan_spreads(file_pairs: list, mutations: List[str], day: str, edition: str,
+                 page_number: Callable[[str], int], manifest: Manifest = None) -> Tuple[List[dict], List[str]]:
+    """
+    Naplánuje unikátní dvojstrany pro všechny mutace.
+
+    Každý pár stran se pro každou mutaci přeloží přes manifest (regionální strany).
+    Mutace se stejnou dvojicí (levý soubor, pravý soubor) na daném páru sdílejí
+    jednu dvojstranu - ta se skládá jen jednou a rozkopíruje do všech jejích výstupů.
+
+    Args:
+        file_pairs: Páry [{'left_file', 'right_file'}] ve výstupním pořadí (základní vydání)
+        mutations: Kódy mutací
+        day, edition: Den a číslo vydání pro jmennou konvenci
+        page_number: Funkce soubor -> číslo strany
+        manifest: Náhrady stran po mutacích (None = všechny mutace stejné)
+
+    Returns:
+        (dvojstrany, chyby) - dvojstrana je slovník s klíči left_file, right_file,
+        left_page, right_page, pair_index, pair_number, rotation
+        a targets {mutace: název výstupu}
+    """
+    manifest = manifest or {}
+    spreads = {}
+    errors = []
+
+    for i, pair in enumerate(file_pairs, start=1):  # start=1 pro 1-based pořadí
+        try:
+            left_file = pair['left_file']
+            right_file = pair['right_file']
+            left_page = page_number(left_file)
+            right_page = page_number(right_file)
+
+            # ZAJIŠTĚNÍ: Liché strany vždy vpravo!
+            if left_page % 2 == 1:
+                left_file, right_file = right_file, left_file
+                left_page, right_page = right_page, left_page
+                logger.info(f"Pár přehozen: Liché ({right_page}) je nyní vpravo")
+
+            # Číslo páru = nižší číslo strany ze dvojice
+            pair_number = min(left_page, right_page)
+
+            # OBOUSTRANNÝ TISK DVOJSTRAN: liché pořadí páru = přední strana (-90°),
+            # sudé = zadní strana (+90°)
+            rotation = -90 if i % 2 == 1 else 90
+
+            for mutation in mutations:
+                substitutions = manifest.get(mutation, {})
+                mutation_left = substitutions.get(left_page, left_file)
+                mutation_right = substitutions.get(right_page, right_file)
+
+                key = (i, mutation_left, mutation_right)
+                spread = spreads.get(key)
+                if spread is None:
+                    spread = spreads[key] = {
+                        'left_file': mutation_left,
+                        'right_file': mutation_right,
+                        'left_page': left_page,
+                        'right_page': right_page,
+                        'pair_index': i,
+                        'pair_number': pair_number,
+                        'rotation': rotation,
+                        'targets': {}
+                    }
+                # Jmenná konvence: {den}{mutace}{cislo_paru:02d}{cislo_vydani}.x.pdf
+                spread['targets'][mutation] = f"{day}{mutation}{pair_number:02d}{edition}.x.pdf"
+
+        except Exception as e:
+            error_msg = f"Chyba při zpracování páru {i}: {str(e)}"
+            logger.error(error_msg)
+            errors.append(error_msg)
+
+    planned = list(spreads.values())
+    outputs = sum(len(spread['targets']) for spread in planned)
+    logger.info(f"🧮 Plán mutací: {outputs} výstupů z {len(planned)} unikátních dvojstran")
+    return planned, errors
+
+
+def plan_sheets(spreads: List[dict]) -> List[dict]:
+    """
+    Seskupí naplánované dvojstrany do oboustranných tiskových archů.
+
+    Páry jdou v pořadí tisku: lichý pár je přední strana archu (-90°), následující
+    sudý pár jeho zadní strana (+90°). Arch mutace nese jméno podle čísla páru
+    přední strany; mutace se stejnou přední i zadní dvojstranou sdílejí jeden arch.
+
+    Args:
+        spreads: Dvojstrany z plan_spreads()
+
+    Returns:
+        Archy - slovníky s klíči sides (dvojstrany v pořadí tisku, 1-2),
+        sheet_index, pair_number a targets {mutace: název výstupu}
+    """
+    by_pair = {}
+    for spread in spreads:
+        for mutation in spread['targets']:
+            by_pair.setdefault(spread['pair_index'], {})[mutation] = spread
+
+    sheets = {}
+    for pair_index in sorted(by_pair):
+        front_index = pair_index if pair_index % 2 == 1 else pair_index - 1
+        if pair_index != front_index and front_index in by_pair:
+            continue  # zadní strana - patří k archu své přední strany
+
+        front = by_pair[pair_index]
+        back = by_pair.get(pair_index + 1, {}) if pair_index == front_index else {}
+        for mutation, front_spread in front.items():
+            sides = [front_spread]
+            if mutation in back:
+                sides.append(back[mutation])
+
+            key = tuple(id(side) for side in sides)
+            sheet = sheets.get(key)
+            if sheet is None:
+                sheet = sheets[key] = {
+                    'sides': sides,
+                    'sheet_index': (front_index + 1) // 2,
+                    'pair_number': front_spread['pair_number'],
+                    'targets': {}
+                }
+            sheet['targets'][mutation] = front_spread['targets'][mutation]
+
+    planned = list(sheets.values())
+    outputs = sum(len(sheet['targets']) for sheet in planned)
+    logger.info(f"🗞️  Plán archů: {outputs} výstupů z {len(planned)} unikátních archů")
+    return planned
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache normalizovaných stran podle hashe obsahu
+Každý vstup se opraví a vyčistí jen jednou - opakované inzertní strany
+a hlavičky pak každý další merge otevírá z rychlé, čisté kopie
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import fitz
+
+from disk_quota import DiskQuota
+from hashing import DigestCache
+
+logger = logging.getLogger(__name__)
+
+# Normalizace: opravená xref tabulka (MuPDF ji při otevření přestaví),
+# deduplikace shodných objektů a streamů, vyčištěné a komprimované content streamy
+NORMALIZE_SAVE_OPTIONS = {'garbage': 4, 'deflate': True, 'clean': True}
+
+
+class PageCache:
+    """Normalizované kopie vstupních PDF ve složce cache, klíčem je SHA-256 obsahu"""
+
+    def __init__(self, folder: Path, quota: Optional[DiskQuota] = None, workspace: str = 'cache'):
+        """
+        Args:
+            folder: Složka cache (soubory <sha256>.pdf)
+            quota: Disková kvóta - zápis nové kopie si rezervuje místo (None = bez kvóty)
+            workspace: Název složky cache v kvótě
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.quota = quota
+        self.workspace = workspace
+        self.hits = 0
+        self.misses = 0
+        # Hash podle (cesta, velikost, mtime) - vstup se nečte znovu při každém merge
+        self._digests = DigestCache()
+        # Zámek na hash - dvě vlákna nenormalizují tutéž stranu současně
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _digest_lock(self, digest: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(digest, threading.Lock())
+
+    def normalized(self, source: Path) -> Path:
+        """
+        Cesta k normalizované kopii vstupu - při prvním použití ji vytvoří.
+
+        Když normalizace selže, vrátí původní soubor (merge si poradí sám).
+        """
+        source = Path(source)
+        try:
+            digest = self._digests.digest(source)
+            cached = self.folder / f"{digest}.pdf"
+            with self._digest_lock(digest):
+                if cached.exists():
+                    DiskQuota.touch(cached)
+                    self.hits += 1
+                    return cached
+                self._normalize(source, cached)
+                self.misses += 1
+            return cached
+        except Exception as e:
+            logger.warning(f"⚠️  Normalizace {source.name} selhala, použije se originál: {e}")
+            return source
+
+    def _normalize(self, source: Path, cached: Path) -> None:
+        """Opraví a vyčistí vstup a atomicky ho zapíše do cache"""
+        estimated = source.stat().st_size
+        if self.quota is not None:
+            admitted, message = self.quota.admit(estimated, self.workspace)
+            if not admitted:
+                raise RuntimeError(message)
+
+        partial = cached.with_name(f".{cached.name}.part")
+        try:
+            with fitz.open(str(source)) as doc:
+                repaired = doc.is_repaired
+                doc.save(str(partial), **NORMALIZE_SAVE_OPTIONS)
+            os.replace(partial, cached)
+        finally:
+            if partial.exists():
+                partial.unlink()
+            if self.quota is not None:
+                self.quota.release(estimated, self.workspace)
+
+        size = cached.stat().st_size
+        logger.info(f"🧽 Normalizováno do cache: {source.name} "
+                    f"({estimated / 1024:.0f} kB -> {size / 1024:.0f} kB"
+                    f"{', opravená xref' if repaired else ''})")
+
+    def stats(self) -> dict:
+        """Počty zásahů a normalizací od startu"""
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zdroje stran vydání - jednostránková PDF, vícestránková PDF celého vydání nebo sekcí
+Strana vícestránkového souboru se odkazuje jako "soubor.pdf#page=N" (N od 1,
+stejně jako parametr otevření PDF) a čísla stran vydání určuje mapa sekcí
+"""
+
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+# Odkaz na stranu uvnitř vícestránkového souboru: PR251030VY1.pdf#page=3
+PAGE_REF_MARK = '#page='
+
+# Mapa sekcí: {soubor: číslo strany vydání, kterou soubor začíná}
+Sections = Dict[str, int]
+
+
+def page_ref(filename: str, page_index: int) -> str:
+    """Odkaz na stranu souboru (page_index od 0)"""
+    return f"{filename}{PAGE_REF_MARK}{page_index + 1}"
+
+
+def split_page_ref(ref: str) -> Tuple[str, int]:
+    """Rozloží odkaz na (soubor, index strany od 0) - prostý název souboru je jeho první strana"""
+    filename, mark, page = ref.partition(PAGE_REF_MARK)
+    if not mark:
+        return ref, 0
+    return filename, int(page) - 1
+
+
+def pdf_page_count(path: Path) -> int:
+    """Počet stran PDF (0 pro nečitelný soubor)"""
+    try:
+        with fitz.open(str(path)) as doc:
+            return doc.page_count
+    except Exception as e:
+        logger.warning(f"Nelze zjistit počet stran {Path(path).name}: {e}")
+        return 0
+
+
+def parse_sections(data) -> Sections:
+    """
+    Načte a ověří mapu sekcí z JSON.
+
+    Args:
+        data: {"PR251030VY1_A.pdf": 1, "PR251030VY1_B.pdf": 17, ...} (nebo None)
+
+    Raises:
+        ValueError: Neplatná mapa sekcí
+    """
+    if not data:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("Mapa sekcí musí být objekt {soubor: první strana}")
+
+    sections = {}
+    for filename, first_page in data.items():
+        try:
+            first_page = int(first_page)
+        except (TypeError, ValueError):
+            raise ValueError(f"Neplatná první strana sekce {filename}: {first_page}")
+        if first_page < 1:
+            raise ValueError(f"První strana sekce {filename} musí být kladná: {first_page}")
+        sections[filename] = first_page
+    return sections
+
+
+class PageMap:
+    """Mapa čísel stran vydání na zdrojové strany (odkazy soubor#page=N)"""
+
+    def __init__(self, page_number: Callable[[str], int], sections: Sections = None):
+        """
+        Args:
+            page_number: Číslo strany z názvu jednostránkového souboru (PRYYMMDDXXBBB.pdf)
+            sections: První strana vydání pro vícestránkové soubory; soubor mimo mapu začíná
+                      stranou 1 (celé vydání v jednom PDF)
+        """
+        self._page_number = page_number
+        self.sections = sections or {}
+        self.pages: Dict[int, str] = {}
+
+    def page_number(self, ref: str) -> int:
+        """Číslo strany vydání pro odkaz na zdrojovou stranu"""
+        filename, index = split_page_ref(ref)
+        if filename in self.sections:
+            return self.sections[filename] + index
+        if ref != filename:
+            return 1 + index
+        return self._page_number(filename)
+
+    def add_source(self, filename: str, page_count: int) -> List[int]:
+        """
+        Zaregistruje zdrojový soubor se všemi jeho stranami.
+
+        Strana, kterou už poskytuje jiný zdroj, se přepíše (platí poslední, stejně
+        jako u jednostránkových souborů se stejným číslem strany).
+
+        Returns:
+            Čísla stran vydání, které soubor poskytuje
+        """
+        if page_count <= 1:
+            # Jednostránkový (nebo nečitelný - chybu ohlásí až merge) soubor se odkazuje jménem
+            refs = [filename]
+        else:
+            refs = [page_ref(filename, index) for index in range(page_count)]
+
+        numbers = []
+        for ref in refs:
+            number = self.page_number(ref)
+            if number <= 0:
+                continue
+            if number in self.pages:
+                logger.warning(f"Strana {number} je ve dvou zdrojích: {self.pages[number]} a {ref} - platí {ref}")
+            self.pages[number] = ref
+            numbers.append(number)
+
+        if page_count > 1 and numbers:
+            logger.info(f"📚 {filename}: strany {numbers[0]}-{numbers[-1]} ({page_count} stran)")
+        return numbers
+
+    def page_files(self) -> List[dict]:
+        """Strany ve formátu pro auto_pair_files ([{'filename', 'page_number'}])"""
+        return [{'filename': ref, 'page_number': number} for number, ref in sorted(self.pages.items())]
+
+
+class DocumentPool:
+    """Otevřené zdrojové dokumenty jedné úlohy - každý soubor se otevře jen jednou"""
+
+    def __init__(self):
+        self._documents: Dict[str, fitz.Document] = {}
+
+    def get(self, path: Path) -> fitz.Document:
+        """Dokument pro cestu - při prvním požadavku ho otevře"""
+        key = str(path)
+        doc = self._documents.get(key)
+        if doc is None:
+            doc = self._documents[key] = fitz.open(key)
+        return doc
+
+    def close(self) -> None:
+        for doc in self._documents.values():
+            doc.close()
+        self._documents.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
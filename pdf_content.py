@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Práce s PDF content streamy a slovníky zdrojů (Resources)
+Parser operátorů, přejmenování zdrojů při kolizi jmen a slučování Resources
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Kategorie slovníku /Resources, jejichž jména se objevují v content streamu
+RESOURCE_CATEGORIES = ('ExtGState', 'ColorSpace', 'Pattern', 'Shading', 'XObject', 'Font', 'Properties')
+
+# Operátor -> (kategorie zdroje, pozice jména mezi operandy)
+_RESOURCE_OPERANDS = {
+    b'Do': ('XObject', 0),
+    b'Tf': ('Font', 0),
+    b'gs': ('ExtGState', 0),
+    b'cs': ('ColorSpace', 0),
+    b'CS': ('ColorSpace', 0),
+    b'sh': ('Shading', 0),
+    b'scn': ('Pattern', -1),
+    b'SCN': ('Pattern', -1),
+    b'BDC': ('Properties', 1),
+    b'DPD': ('Properties', 1),
+}
+
+_TOKEN_RE = re.compile(rb'''
+    (?P<ws>[\x00\t\n\x0c\r ]+)
+  | (?P<comment>%[^\r\n]*)
+  | (?P<dict_open><<)
+  | (?P<dict_close>>>)
+  | (?P<hex><[0-9A-Fa-f\x00\t\n\x0c\r ]*>)
+  | (?P<array_open>\[)
+  | (?P<array_close>\])
+  | (?P<string>\()
+  | (?P<name>/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*)
+  | (?P<regular>[^\x00\t\n\x0c\r ()<>\[\]{}/%]+)
+''', re.X)
+
+_NUMBER_RE = re.compile(rb'^[+-]?(\d+\.?\d*|\.\d+)$')
+_INLINE_IMAGE_END_RE = re.compile(rb'[\x00\t\n\x0c\r ]EI(?=[\x00\t\n\x0c\r ]|$)')
+_INLINE_IMAGE_ID_RE = re.compile(rb'(?<=[\x00\t\n\x0c\r ])ID[\x00\t\n\x0c\r ]')
+
+# Jedna operace: (operandy jako surové bajty, operátor)
+Operation = Tuple[List[bytes], bytes]
+
+
+def _string_end(data: bytes, pos: int) -> int:
+    """Konec literálového řetězce (...) včetně vnořených závorek a escape sekvencí"""
+    depth = 0
+    n = len(data)
+    while pos < n:
+        char = data[pos]
+        if char == 0x5C:  # backslash
+            pos += 2
+            continue
+        if char == 0x28:  # (
+            depth += 1
+        elif char == 0x29:  # )
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    return n
+
+
+def _inline_image_end(data: bytes, pos: int) -> int:
+    """Konec inline obrázku BI ... ID <data> EI (pozice za EI)"""
+    id_match = _INLINE_IMAGE_ID_RE.search(data, pos)
+    if id_match is None:
+        return len(data)
+    ei_match = _INLINE_IMAGE_END_RE.search(data, id_match.end())
+    if ei_match is None:
+        return len(data)
+    return ei_match.end()
+
+
+def split_inline_image(raw: bytes) -> Tuple[bytes, bytes]:
+    """Rozdělí inline obrázek z parse_content na slovník (BI ...) a data mezi ID a EI"""
+    id_match = _INLINE_IMAGE_ID_RE.search(raw)
+    end_match = _INLINE_IMAGE_END_RE.search(raw, id_match.end())
+    return raw[:id_match.start()], raw[id_match.end():end_match.start() if end_match else len(raw)]
+
+
+def _is_operand(token: bytes) -> bool:
+    return token in (b'true', b'false', b'null') or _NUMBER_RE.match(token) is not None
+
+
+def parse_content(data: bytes) -> List[Operation]:
+    """
+    Rozloží content stream na seznam operací.
+
+    Pole a slovníky jsou jeden operand (surové bajty). Inline obrázek je operace
+    s operátorem b'BI' a jediným operandem obsahujícím celé BI ... EI.
+    """
+    operations = []
+    operands = []
+    depth = 0
+    start = 0
+    pos = 0
+    n = len(data)
+
+    while pos < n:
+        match = _TOKEN_RE.match(data, pos)
+        if match is None:
+            # Osamocený oddělovač (např. ')' nebo '{') - přeskočíme
+            pos += 1
+            continue
+
+        kind = match.lastgroup
+        end = _string_end(data, pos) if kind == 'string' else match.end()
+
+        if kind in ('ws', 'comment'):
+            pos = end
+            continue
+
+        if kind in ('dict_open', 'array_open'):
+            if depth == 0:
+                start = pos
+            depth += 1
+        elif kind in ('dict_close', 'array_close'):
+            if depth > 0:
+                depth -= 1
+                if depth == 0:
+                    operands.append(data[start:end])
+        elif depth == 0:
+            token = data[pos:end]
+            if kind == 'regular' and not _is_operand(token):
+                if token == b'BI':
+                    end = _inline_image_end(data, end)
+                    operations.append(([data[pos:end]], b'BI'))
+                else:
+                    operations.append((operands, token))
+                operands = []
+            else:
+                operands.append(token)
+
+        pos = end
+
+    return operations
+
+
+def serialize_content(operations: List[Operation]) -> bytes:
+    """Složí operace zpět do content streamu"""
+    lines = []
+    for operands, operator in operations:
+        if operator == b'BI':
+            lines.append(operands[0])
+        elif operands:
+            lines.append(b' '.join(operands) + b' ' + operator)
+        else:
+            lines.append(operator)
+    return b'\n'.join(lines) + b'\n'
+
+
+def count_operators(operations: List[Operation]) -> Counter:
+    """Počty jednotlivých operátorů (pro měření složitosti pro RIP)"""
+    return Counter(operator.decode('latin-1') for _, operator in operations)
+
+
+def rename_resources(operations: List[Operation], renames: Dict[str, Dict[str, str]]) -> List[Operation]:
+    """
+    Přejmenuje odkazy na zdroje v operacích.
+
+    Args:
+        operations: Operace z parse_content
+        renames: {kategorie: {staré_jméno: nové_jméno}} (jména bez lomítka)
+    """
+    if not any(renames.values()):
+        return operations
+
+    encoded = {
+        category: {b'/' + old.encode('latin-1'): b'/' + new.encode('latin-1') for old, new in mapping.items()}
+        for category, mapping in renames.items()
+    }
+    colorspaces = encoded.get('ColorSpace', {})
+
+    result = []
+    for operands, operator in operations:
+        spec = _RESOURCE_OPERANDS.get(operator)
+        if spec is not None and operands:
+            category, index = spec
+            mapping = encoded.get(category)
+            if mapping and -len(operands) <= index < len(operands) and operands[index] in mapping:
+                operands = list(operands)
+                operands[index] = mapping[operands[index]]
+        elif operator == b'BI' and colorspaces:
+            # Inline obrázek může odkazovat na pojmenovaný barevný prostor (/CS /Name)
+            raw = operands[0]
+            head_end = _INLINE_IMAGE_ID_RE.search(raw).start()
+            head = re.sub(
+                rb'(/(?:CS|ColorSpace)[\x00\t\n\x0c\r ]*)(/[^\x00\t\n\x0c\r ()<>\[\]{}/%]+)',
+                lambda m: m.group(1) + colorspaces.get(m.group(2), m.group(2)),
+                raw[:head_end]
+            )
+            operands = [head + raw[head_end:]]
+        result.append((operands, operator))
+    return result
+
+
+def graphics_state_balance(operations: List[Operation]) -> Tuple[int, int]:
+    """
+    Zjistí nevyvážené q/Q.
+
+    Returns:
+        (kolik Q chybí na konci, kolik q chybí na začátku)
+    """
+    depth = 0
+    missing_q = 0
+    for _, operator in operations:
+        if operator == b'q':
+            depth += 1
+        elif operator == b'Q':
+            if depth == 0:
+                missing_q += 1
+            else:
+                depth -= 1
+    return depth, missing_q
+
+
+def form_xrefs(doc) -> List[int]:
+    """Čísla všech Form XObjectů v dokumentu (volné položky xref přeskakuje)"""
+    forms = []
+    for xref in range(1, doc.xref_length()):
+        try:
+            if doc.xref_is_stream(xref) and doc.xref_get_key(xref, 'Subtype')[1] == '/Form':
+                forms.append(xref)
+        except Exception:
+            continue
+    return forms
+
+
+def document_operators(doc, max_depth: int = 32) -> Counter:
+    """
+    Počty operátorů, které RIP zpracuje při vykreslení všech stránek.
+
+    Formulář (Form XObject) se započítá při každém vykreslení operátorem Do,
+    nepoužité objekty v souboru se nepočítají.
+    """
+    cache = {}
+
+    def content_counts(xref: int, content: bytes, parent_xobjects: dict, depth: int) -> Counter:
+        operations = parse_content(content)
+        counts = count_operators(operations)
+        # Formulář bez vlastních Resources dědí zdroje od toho, kdo ho vykresluje
+        xobjects = get_resources(doc, xref).get('XObject') or parent_xobjects
+        for operands, operator in operations:
+            if operator != b'Do' or not operands or depth >= max_depth:
+                continue
+            form_xref = reference_xref(xobjects.get(operands[0][1:].decode('latin-1')))
+            if not form_xref or doc.xref_get_key(form_xref, 'Subtype')[1] != '/Form':
+                continue
+            if form_xref not in cache:
+                cache[form_xref] = content_counts(form_xref, doc.xref_stream(form_xref) or b'',
+                                                  xobjects, depth + 1)
+            counts += cache[form_xref]
+        return counts
+
+    total = Counter()
+    for page in doc:
+        total += content_counts(page.xref, page.read_contents(), {}, 0)
+    return total
+
+
+def page_box(page) -> Tuple[float, float, float, float]:
+    """Viditelná oblast stránky (průnik CropBox a MediaBox) v PDF souřadnicích"""
+    doc = page.parent
+
+    def parse_box(key):
+        value_type, value = doc.xref_get_key(page.xref, key)
+        if value_type != 'array':
+            return None
+        x0, y0, x1, y1 = (float(v) for v in value.strip('[]').split())
+        return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+    media = parse_box('MediaBox')
+    if media is None:
+        # Zděděný nebo nepřímý MediaBox - fitz ho dohledá
+        rect = page.mediabox
+        media = (rect.x0, rect.y0, rect.x1, rect.y1)
+    crop = parse_box('CropBox')
+    if crop is None:
+        # Zděděný, nepřímý nebo chybějící CropBox (= MediaBox) - fitz ho vrací s osou y
+        # od horního okraje MediaBoxu
+        rect = page.cropbox
+        crop = (rect.x0, media[3] - rect.y1, rect.x1, media[3] - rect.y0)
+    return max(media[0], crop[0]), max(media[1], crop[1]), min(media[2], crop[2]), min(media[3], crop[3])
+
+
+def format_number(value: float) -> str:
+    """Číslo pro content stream (bez exponentu a zbytečných nul)"""
+    text = f"{value:.4f}".rstrip('0').rstrip('.')
+    return text if text not in ('', '-0') else '0'
+
+
+def dict_items(doc, value_type: str, value: str) -> Dict[str, str]:
+    """
+    Položky PDF slovníku jako {jméno: text hodnoty}.
+
+    Args:
+        doc: fitz dokument
+        value_type, value: Výsledek doc.xref_get_key() - 'xref' nebo vložený 'dict'
+    """
+    if value_type == 'xref':
+        xref = int(value.split()[0])
+        return {key: _value_text(*doc.xref_get_key(xref, key)) for key in doc.xref_get_keys(xref)}
+
+    if value_type == 'dict':
+        # Vložený slovník rozebereme přes dočasný objekt - fitz umí klíče jen u xref
+        temp_xref = doc.get_new_xref()
+        doc.update_object(temp_xref, value)
+        try:
+            return {key: _value_text(*doc.xref_get_key(temp_xref, key)) for key in doc.xref_get_keys(temp_xref)}
+        finally:
+            doc.update_object(temp_xref, 'null')
+
+    return {}
+
+
+def _value_text(value_type: str, value: str) -> str:
+    if value_type == 'string':
+        return '(' + value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+    return value
+
+
+def get_resources(doc, xref: int) -> Dict[str, Dict[str, str]]:
+    """Slovník /Resources objektu (stránky nebo formuláře) po kategoriích"""
+    resources = {}
+    for category in RESOURCE_CATEGORIES:
+        value_type, value = doc.xref_get_key(xref, f'Resources/{category}')
+        items = dict_items(doc, value_type, value)
+        if items:
+            resources[category] = items
+    return resources
+
+
+def merge_resources(target: Dict[str, Dict[str, str]], source: Dict[str, Dict[str, str]],
+                    suffix: str) -> Dict[str, Dict[str, str]]:
+    """
+    Přidá zdroje `source` do `target`.
+
+    Stejné jméno se stejnou hodnotou se sdílí; při kolizi se zdroj přejmenuje
+    na jméno s příponou `suffix`.
+
+    Returns:
+        Přejmenování {kategorie: {staré: nové}} pro rename_resources
+    """
+    renames = {}
+    for category, items in source.items():
+        merged = target.setdefault(category, {})
+        for name, value in items.items():
+            if name not in merged:
+                merged[name] = value
+                continue
+            if merged[name] == value:
+                continue
+            counter = 0
+            new_name = f"{name}{suffix}"
+            while new_name in merged and merged[new_name] != value:
+                counter += 1
+                new_name = f"{name}{suffix}{counter}"
+            merged[new_name] = value
+            renames.setdefault(category, {})[name] = new_name
+    return renames
+
+
+def reference_xref(value: str) -> int:
+    """Číslo objektu z nepřímého odkazu '12 0 R' (0, pokud hodnota není odkaz)"""
+    parts = value.split() if value else []
+    if len(parts) == 3 and parts[2] == 'R' and parts[0].isdigit():
+        return int(parts[0])
+    return 0
+
+
+def set_page_content(doc, page_xref: int, data: bytes):
+    """Nahradí obsah stránky jediným (komprimovaným) content streamem"""
+    contents_xref = doc.get_new_xref()
+    doc.update_object(contents_xref, '<<>>')
+    doc.update_stream(contents_xref, data, compress=True)
+    doc.xref_set_key(page_xref, 'Contents', f'{contents_xref} 0 R')
+
+
+def resources_to_pdf(resources: Dict[str, Dict[str, str]]) -> str:
+    """Slovník zdrojů jako text PDF objektu"""
+    parts = ['/ProcSet [/PDF /Text /ImageB /ImageC /ImageI]']
+    for category, items in resources.items():
+        entries = ' '.join(f'/{name} {value}' for name, value in items.items())
+        parts.append(f'/{category} <<{entries}>>')
+    return '<<' + ' '.join(parts) + '>>'
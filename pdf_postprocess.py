@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Post-processing sloučených dvojstran (vektorová cesta přes show_pdf_page)
+Volitelné kroky nad hotovým fitz dokumentem před uložením
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import math
+import re
+import threading
+import zlib
+from pathlib import Path
+
+import fitz
+from PIL import Image, ImageCms
+
+from pdf_content import (parse_content, serialize_content, rename_resources, graphics_state_balance,
+                         document_operators, format_number, get_resources, merge_resources, resources_to_pdf,
+                         reference_xref, set_page_content, form_xrefs, split_inline_image)
+
+logger = logging.getLogger(__name__)
+
+# Obrázek se převzorkuje až když má efektivní rozlišení o 25 % vyšší než cíl
+IMAGE_DPI_TOLERANCE = 1.25
+# Kvalita JPEG pro obrázky, které už ve zdroji byly JPEG (DCTDecode)
+IMAGE_JPEG_QUALITY = 85
+
+# Kolik úrovní vnořených formulářů nejvýš rozbalujeme do obsahu stránky
+MAX_FLATTEN_DEPTH = 8
+
+# Barevné prostory, které umíme převzorkovat beze změny barev (Separation/DeviceN/Indexed necháváme)
+_PIL_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+# Operátory stavby cesty - ořez 'W n' platí pro celou cestu od posledního vykreslení
+_PATH_OPERATORS = {b'm', b'l', b'c', b'v', b'y', b'h', b're'}
+
+# Cílový CMYK prostor převodu barev - stejný profil jako v OutputIntentu výstupu
+# (vedle modulu, ne v pracovním adresáři - aplikace může běžet odkudkoliv)
+CMYK_PROFILE_PATH = Path(__file__).resolve().parent / 'icc_profiles' / 'newspaper.icc'
+# Percepční záměr - fotografie bez ořezu mimo gamut novinového papíru
+CMYK_RENDERING_INTENT = 0
+
+# Klíč a hodnota ve slovníku inline obrázku (BI /W 8 /CS /RGB /F [/AHx /Fl] ID)
+_INLINE_ENTRY_RE = re.compile(rb'/([^\x00\t\n\x0c\r ()<>\[\]{}/%]+)[\x00\t\n\x0c\r ]*'
+                              rb'(\[[^\]]*\]|/[^\x00\t\n\x0c\r ()<>\[\]{}/%]+|[^\x00\t\n\x0c\r /\[]+)')
+# Zkratky klíčů inline obrázku -> plné názvy
+_INLINE_KEYS = {b'W': b'Width', b'H': b'Height', b'BPC': b'BitsPerComponent', b'CS': b'ColorSpace',
+                b'F': b'Filter', b'DP': b'DecodeParms', b'D': b'Decode', b'IM': b'ImageMask', b'I': b'Interpolate'}
+# Zkratky filtrů inline obrázku -> plné názvy (LZW, RunLength a CCITT převádět neumíme)
+_INLINE_FILTERS = {b'AHx': b'ASCIIHexDecode', b'A85': b'ASCII85Decode', b'Fl': b'FlateDecode',
+                   b'DCT': b'DCTDecode'}
+
+# Transformace RGB -> CMYK podle (zdrojový profil, cílový profil) - sestavení je drahé
+_cmyk_transforms = {}
+_cmyk_transforms_lock = threading.Lock()
+
+
+def _image_colorspace_ok(doc, xref: int) -> bool:
+    """Jen DeviceGray/RGB/CMYK a ICCBased - přímé spoty a paletové obrázky nepřevzorkováváme"""
+    cs_type, cs_value = doc.xref_get_key(xref, 'ColorSpace')
+    if cs_type == 'name':
+        return cs_value in ('/DeviceGray', '/DeviceRGB', '/DeviceCMYK')
+    if cs_type in ('array', 'xref'):
+        if cs_type == 'xref':
+            cs_value = doc.xref_object(int(cs_value.split()[0]), compressed=True)
+        return '/ICCBased' in cs_value
+    return False
+
+
+def _effective_dpi(images: dict, page) -> None:
+    """Doplní do `images` nejnižší efektivní DPI každého obrázku na stránce (podle xref)"""
+    for info in page.get_image_info(xrefs=True):
+        xref = info.get('xref', 0)
+        if not xref:
+            continue
+        a, b, c, d, _, _ = info['transform']
+        shown_width = math.hypot(a, b) / 72   # palce
+        shown_height = math.hypot(c, d) / 72
+        if shown_width <= 0 or shown_height <= 0:
+            continue
+        dpi = min(info['width'] / shown_width, info['height'] / shown_height)
+        # Obrázek použitý víckrát musí stačit i pro největší umístění
+        images[xref] = min(images.get(xref, dpi), dpi)
+
+
+def downsample_images(doc, target_dpi: int, jpeg_quality: int = IMAGE_JPEG_QUALITY) -> dict:
+    """
+    Převzorkuje vložené obrázky s efektivním rozlišením nad target_dpi.
+
+    Text a vektory zůstávají nedotčené - mění se jen streamy obrázků.
+    JPEG obrázky se znovu kódují do JPEG, ostatní bezeztrátově (Flate).
+
+    Args:
+        doc: fitz dokument (sloučená dvojstrana)
+        target_dpi: Cílové efektivní rozlišení (např. 300 pro novinový tisk)
+        jpeg_quality: Kvalita JPEG pro ztrátově komprimované obrázky
+
+    Returns:
+        Statistika {'images': počet převzorkovaných, 'bytes_before', 'bytes_after'}
+    """
+    stats = {'images': 0, 'bytes_before': 0, 'bytes_after': 0}
+
+    images = {}
+    for page in doc:
+        _effective_dpi(images, page)
+
+    for xref, dpi in images.items():
+        if dpi <= target_dpi * IMAGE_DPI_TOLERANCE:
+            continue
+        try:
+            if doc.xref_get_key(xref, 'ImageMask')[1] == 'true':
+                continue
+            if not _image_colorspace_ok(doc, xref):
+                continue
+
+            pix = fitz.Pixmap(doc, xref)
+            if pix.alpha:
+                pix = fitz.Pixmap(pix, 0)  # alfa je v samostatném /SMask
+            mode = _PIL_MODES.get(pix.n)
+            if mode is None:
+                continue
+
+            scale = target_dpi / dpi
+            new_size = (max(1, round(pix.width * scale)), max(1, round(pix.height * scale)))
+            image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+            image = image.resize(new_size, Image.LANCZOS)
+
+            bytes_before = len(doc.xref_stream_raw(xref))
+            was_jpeg = doc.xref_get_key(xref, 'Filter')[1] in ('/DCTDecode', '[/DCTDecode]')
+
+            if was_jpeg:
+                buffer = io.BytesIO()
+                image.save(buffer, format='JPEG', quality=jpeg_quality)
+                data = buffer.getvalue()
+                doc.update_stream(xref, data, compress=False)
+                doc.xref_set_key(xref, 'Filter', '/DCTDecode')
+            else:
+                data = image.tobytes()
+                doc.update_stream(xref, data, compress=True)
+
+            doc.xref_set_key(xref, 'Width', str(new_size[0]))
+            doc.xref_set_key(xref, 'Height', str(new_size[1]))
+            doc.xref_set_key(xref, 'BitsPerComponent', '8')
+            doc.xref_set_key(xref, 'DecodeParms', 'null')
+            # Pillow ukládá CMYK JPEG invertovaně (Adobe APP14) - stejně jako Photoshop
+            if was_jpeg and mode == 'CMYK':
+                doc.xref_set_key(xref, 'Decode', '[1 0 1 0 1 0 1 0]')
+            else:
+                doc.xref_set_key(xref, 'Decode', 'null')
+
+            stats['images'] += 1
+            stats['bytes_before'] += bytes_before
+            stats['bytes_after'] += len(doc.xref_stream_raw(xref))
+            logger.info(f"  🖼️  Obrázek {xref}: {dpi:.0f} DPI → {target_dpi} DPI "
+                        f"({pix.width}x{pix.height} → {new_size[0]}x{new_size[1]})")
+        except Exception as image_error:
+            logger.warning(f"  ⚠️  Obrázek {xref} nelze převzorkovat: {image_error}")
+
+    return stats
+
+
+def _form_usage(doc) -> dict:
+    """Kolikrát je který Form XObject vykreslen (operátor Do) ze stránek a jiných formulářů"""
+    holders = [(page.xref, page.read_contents()) for page in doc]
+    holders += [(xref, doc.xref_stream(xref) or b'') for xref in form_xrefs(doc)]
+
+    usage = {}
+    for holder, content in holders:
+        xobjects = get_resources(doc, holder).get('XObject')
+        if not xobjects:
+            continue
+        for operands, operator in parse_content(content):
+            if operator == b'Do' and operands:
+                xref = reference_xref(xobjects.get(operands[0][1:].decode('latin-1')))
+                if xref:
+                    usage[xref] = usage.get(xref, 0) + 1
+    return usage
+
+
+def _form_flattenable(doc, xref: int) -> bool:
+    """
+    Formulář jde vložit přímo do obsahu, jen když nenese vlastní sémantiku:
+    transparentní skupina (/Group), volitelný obsah (/OC) a odkaz do jiného PDF (/Ref) necháváme.
+    """
+    if doc.xref_get_key(xref, 'Subtype')[1] != '/Form':
+        return False
+    for key in ('Group', 'OC', 'Ref'):
+        if doc.xref_get_key(xref, key)[0] != 'null':
+            return False
+    return doc.xref_get_key(xref, 'BBox')[0] == 'array'
+
+
+def _inline_form(doc, xref: int, resources: dict) -> list:
+    """Operace formuláře připravené k vložení místo '/Name Do' (s maticí a ořezem na BBox)"""
+    operations = parse_content(doc.xref_stream(xref))
+    renames = merge_resources(resources, get_resources(doc, xref), f"F{xref}")
+    operations = rename_resources(operations, renames)
+    unclosed_q, missing_q = graphics_state_balance(operations)
+
+    bbox = doc.xref_get_key(xref, 'BBox')[1].strip('[]').split()
+    x0, y0, x1, y1 = (float(v) for v in bbox)
+    prefix = [([], b'q')]
+    matrix_type, matrix = doc.xref_get_key(xref, 'Matrix')
+    if matrix_type == 'array':
+        prefix.append((matrix.strip('[]').encode('latin-1').split(), b'cm'))
+    prefix.append(([format_number(v).encode('latin-1') for v in (x0, y0, x1 - x0, y1 - y0)], b're'))
+    prefix += [([], b'W'), ([], b'n')]
+
+    return (prefix + [([], b'q')] * missing_q + operations
+            + [([], b'Q')] * unclosed_q + [([], b'Q')])
+
+
+def _is_identity_cm(operands: list) -> bool:
+    try:
+        return [float(v) for v in operands] == [1, 0, 0, 1, 0, 0]
+    except ValueError:
+        return False
+
+
+def _repeated_clips(operations: list) -> set:
+    """
+    Indexy ořezů (celá cesta + 'W n') shodných s ořezem těsně před nimi (mezi nimi je nanejvýš q).
+
+    Ořez se porovnává podle celé cesty od posledního vykreslení nebo ořezu, ne jen podle
+    posledního 're' - ořez více obdélníky tak nezaměníme za ořez jedním z nich.
+    """
+    drop = set()
+    clip = None
+    path = []
+    index = 0
+    while index < len(operations):
+        operands, operator = operations[index]
+        if operator in _PATH_OPERATORS:
+            path.append(index)
+        elif (operator in (b'W', b'W*') and path and index + 1 < len(operations)
+                and operations[index + 1][1] == b'n'):
+            key = (tuple((tuple(operations[i][0]), operations[i][1]) for i in path), operator)
+            if key == clip:
+                drop.update(range(path[0], index + 2))
+            clip = key
+            path = []
+            index += 2
+            continue
+        else:
+            if operator != b'q' or path:
+                clip = None
+            path = []
+        index += 1
+    return drop
+
+
+def remove_noop_operators(operations: list) -> tuple:
+    """
+    Odstraní operátory bez vlivu na výsledek:
+    jednotkovou matici 'cm', prázdné páry q Q a BT ET, zdvojené q q ... Q Q
+    a opakovaný stejný ořez (typicky BBox formuláře uvnitř stejně velkého ořezu stránky).
+
+    Returns:
+        (operace, počet odstraněných operátorů)
+    """
+    result = [(operands, operator) for operands, operator in operations
+              if not (operator == b'cm' and _is_identity_cm(operands))]
+    removed = len(operations) - len(result)
+
+    while True:
+        matches = {}
+        stack = []
+        for index, (_, operator) in enumerate(result):
+            if operator == b'q':
+                stack.append(index)
+            elif operator == b'Q' and stack:
+                matches[stack.pop()] = index
+
+        drop = set()
+        for start, end in matches.items():
+            if end == start + 1:
+                drop.update((start, end))
+            elif matches.get(start + 1) == end - 1:
+                drop.update((start + 1, end - 1))
+        for index in range(len(result) - 1):
+            if result[index][1] == b'BT' and result[index + 1][1] == b'ET':
+                drop.update((index, index + 1))
+        drop.update(_repeated_clips(result))
+
+        if not drop:
+            return result, removed
+        result = [operation for index, operation in enumerate(result) if index not in drop]
+        removed += len(drop)
+
+
+def normalize_content(doc) -> dict:
+    """
+    Zjednoduší obsah pro RIP: rozbalí vnořené formuláře a odstraní zbytečné operátory.
+
+    Do obsahu stránky se vkládají jen formuláře vykreslené jedinkrát - opakovaně
+    použité (loga, záhlaví) zůstávají sdílené, jinak by výstup zbytečně narostl.
+
+    Args:
+        doc: fitz dokument (sloučená dvojstrana)
+
+    Returns:
+        Statistika {'forms_flattened', 'noops_removed', 'operators_before', 'operators_after'}
+    """
+    stats = {'forms_flattened': 0, 'noops_removed': 0,
+             'operators_before': sum(document_operators(doc).values()), 'operators_after': 0}
+
+    usage = _form_usage(doc)
+    for page in doc:
+        resources = get_resources(doc, page.xref)
+        operations = parse_content(page.read_contents())
+
+        for _ in range(MAX_FLATTEN_DEPTH):
+            xobjects = resources.get('XObject', {})
+            flattened = []
+            changed = False
+            for operands, operator in operations:
+                if operator == b'Do' and operands:
+                    name = operands[0][1:].decode('latin-1')
+                    xref = reference_xref(xobjects.get(name))
+                    if xref and usage.get(xref) == 1 and _form_flattenable(doc, xref):
+                        flattened += _inline_form(doc, xref, resources)
+                        del xobjects[name]
+                        stats['forms_flattened'] += 1
+                        changed = True
+                        continue
+                flattened.append((operands, operator))
+            operations = flattened
+            if not changed:
+                break
+
+        operations, removed = remove_noop_operators(operations)
+        stats['noops_removed'] += removed
+        set_page_content(doc, page.xref, serialize_content(operations))
+        doc.xref_set_key(page.xref, 'Resources', resources_to_pdf(resources))
+
+    # Ve formulářích, které zůstaly sdílené, stačí vyčistit zbytečné operátory
+    for xref in form_xrefs(doc):
+        operations, removed = remove_noop_operators(parse_content(doc.xref_stream(xref)))
+        if removed:
+            stats['noops_removed'] += removed
+            doc.update_stream(xref, serialize_content(operations), compress=True)
+
+    stats['operators_after'] = sum(document_operators(doc).values())
+    return stats
+
+
+def _cmyk_transform(cmyk_profile: Path, source_icc: bytes = None):
+    """ImageCms transformace RGB -> CMYK (zdroj: vložený ICC profil obrázku, jinak sRGB)"""
+    key = (hashlib.sha1(source_icc).hexdigest() if source_icc else 'sRGB', str(cmyk_profile))
+    with _cmyk_transforms_lock:
+        transform = _cmyk_transforms.get(key)
+    if transform is None:
+        if source_icc:
+            source = ImageCms.ImageCmsProfile(io.BytesIO(source_icc))
+        else:
+            source = ImageCms.createProfile('sRGB')
+        transform = ImageCms.buildTransform(source, ImageCms.getOpenProfile(str(cmyk_profile)),
+                                           'RGB', 'CMYK', renderingIntent=CMYK_RENDERING_INTENT)
+        with _cmyk_transforms_lock:
+            _cmyk_transforms[key] = transform
+    return transform
+
+
+def _rgb_space_profile(doc, value: str):
+    """
+    Je barevný prostor RGB? Vrací (True, vložený ICC profil nebo None), jinak (False, None).
+
+    Args:
+        value: Hodnota /ColorSpace - jméno, nepřímý odkaz nebo pole
+    """
+    xref = reference_xref(value)
+    text = doc.xref_object(xref, compressed=True) if xref else (value or '')
+    if '/DeviceRGB' in text or '/CalRGB' in text or text.strip() == '/RGB':
+        # Indexed s RGB základem je paleta - tu převádět neumíme
+        return '/Indexed' not in text, None
+    if '/ICCBased' in text and '/Indexed' not in text:
+        icc_xref = reference_xref(text.strip('[] ').replace('/ICCBased', '').strip())
+        if icc_xref and doc.xref_get_key(icc_xref, 'N')[1] == '3':
+            return True, doc.xref_stream(icc_xref)
+    return False, None
+
+
+def _cmyk_color(operands: list, transform, cache: dict) -> list:
+    """RGB operandy (0-1) -> CMYK operandy; neutrální šedá jen černou (K), bez CMY soutisku"""
+    rgb = tuple(min(255, max(0, round(float(value) * 255))) for value in operands)
+    cmyk = cache.get(rgb)
+    if cmyk is None:
+        if rgb[0] == rgb[1] == rgb[2]:
+            cmyk = (0, 0, 0, 1 - rgb[0] / 255)
+        else:
+            pixel = ImageCms.applyTransform(Image.new('RGB', (1, 1), rgb), transform).getpixel((0, 0))
+            cmyk = tuple(value / 255 for value in pixel)
+        cache[rgb] = cmyk
+    return [format_number(value).encode('latin-1') for value in cmyk]
+
+
+def _inline_image_entries(head: bytes) -> dict:
+    """Slovník inline obrázku (část mezi BI a ID) s plnými názvy klíčů a filtrů"""
+    entries = {}
+    for key, value in _INLINE_ENTRY_RE.findall(head[2:]):
+        key = _INLINE_KEYS.get(key, key)
+        if key == b'Filter':
+            names = re.findall(rb'/([^\s/\[\]]+)', value)
+            value = b' '.join(b'/' + _INLINE_FILTERS.get(name, name) for name in names)
+        entries[key] = value
+    return entries
+
+
+def _decode_inline_data(data: bytes, filters: bytes) -> bytes:
+    """Rozbalí data inline obrázku podle řetězce filtrů; DCT dekóduje na RGB vzorky"""
+    for name in filters.split():
+        if name == b'/ASCIIHexDecode':
+            data = binascii.unhexlify(re.sub(rb'\s', b'', data.split(b'>')[0]).ljust(2, b'0'))
+        elif name == b'/ASCII85Decode':
+            data = base64.a85decode(re.sub(rb'\s', b'', data).split(b'~>')[0])
+        elif name == b'/FlateDecode':
+            data = zlib.decompressobj().decompress(data)
+        elif name == b'/DCTDecode':
+            data = Image.open(io.BytesIO(data)).convert('RGB').tobytes()
+        else:
+            raise ValueError(f"nepodporovaný filtr {name.decode('latin-1')}")
+    return data
+
+
+def _convert_inline_image(raw: bytes, rgb_names: dict, transform, cmyk_profile: Path) -> tuple:
+    """
+    Převede RGB inline obrázek (BI ... ID <data> EI) na DeviceCMYK.
+
+    Převádí 8bitové obrázky bez /DecodeParms a /Decode, zakódované bez filtru nebo přes
+    AHx/A85/Fl/DCT. Výsledek je Flate zabalený do ASCIIHex, aby data nikdy neobsahovala EI.
+
+    Returns:
+        (operand obrázku, jméno RGB prostoru ze zdrojů nebo None). Obrázek, který není v RGB,
+        se vrací beze změny; None znamená RGB obrázek, který převést nejde.
+    """
+    head, data = split_inline_image(raw)
+    entries = _inline_image_entries(head)
+    space = entries.get(b'ColorSpace', b'')
+    name = space[1:].decode('latin-1') if space.startswith(b'/') else None
+    if name in rgb_names:
+        source_icc = rgb_names[name]
+    elif space in (b'/RGB', b'/DeviceRGB', b'/CalRGB'):
+        name, source_icc = None, None
+    else:
+        return raw, None
+    if (entries.get(b'BitsPerComponent') != b'8' or entries.get(b'ImageMask') == b'true'
+            or b'DecodeParms' in entries or b'Decode' in entries):
+        return None, name
+
+    try:
+        width, height = int(entries[b'Width']), int(entries[b'Height'])
+        samples = _decode_inline_data(data, entries.get(b'Filter', b''))
+        image = Image.frombytes('RGB', (width, height), samples[:width * height * 3])
+    except Exception as image_error:
+        logger.warning(f"  ⚠️  Inline obrázek nelze dekódovat: {image_error}")
+        return None, name
+
+    if source_icc is not None:
+        transform = _cmyk_transform(cmyk_profile, source_icc)
+    data = binascii.hexlify(zlib.compress(ImageCms.applyTransform(image, transform).tobytes())) + b'>'
+    head = f"BI /W {width} /H {height} /BPC 8 /CS /DeviceCMYK /F [/AHx /Fl]".encode('latin-1')
+    if b'Interpolate' in entries:
+        head += b' /I ' + entries[b'Interpolate']
+    return head + b' ID ' + data + b' EI', None
+
+
+def _convert_operations(operations: list, rgb_names: dict, transform, cache: dict,
+                        cmyk_profile: Path = CMYK_PROFILE_PATH) -> tuple:
+    """
+    Převede RGB barvy a RGB inline obrázky v operacích na CMYK.
+
+    rg/RG -> k/K, cs/CS s RGB prostorem -> /DeviceCMYK a následné sc/scn/SC/SCN na 4 složky.
+    Barevný prostor je součástí grafického stavu - q/Q ho ukládá a obnovuje.
+
+    Args:
+        rgb_names: {jméno RGB prostoru ze zdrojů: vložený ICC profil nebo None}
+
+    Returns:
+        (operace, statistika {'colors', 'images', 'skipped'}, jména RGB prostorů, která zůstala použitá)
+    """
+    converted = []
+    stats = {'colors': 0, 'images': 0, 'skipped': 0}
+    still_used = set()
+    fill_rgb = stroke_rgb = False
+    stack = []
+    for operands, operator in operations:
+        if operator == b'q':
+            stack.append((fill_rgb, stroke_rgb))
+        elif operator == b'Q':
+            fill_rgb, stroke_rgb = stack.pop() if stack else (False, False)
+        elif operator in (b'rg', b'RG') and len(operands) == 3:
+            operands = _cmyk_color(operands, transform, cache)
+            operator = b'k' if operator == b'rg' else b'K'
+            stats['colors'] += 1
+        elif operator in (b'g', b'k'):
+            fill_rgb = False
+        elif operator in (b'G', b'K'):
+            stroke_rgb = False
+        elif operator in (b'cs', b'CS') and operands:
+            name = operands[0]
+            is_rgb = name in (b'/DeviceRGB', b'/CalRGB') or name[1:].decode('latin-1') in rgb_names
+            if is_rgb:
+                operands = [b'/DeviceCMYK']
+            if operator == b'cs':
+                fill_rgb = is_rgb
+            else:
+                stroke_rgb = is_rgb
+        elif operator in (b'sc', b'scn') and fill_rgb and len(operands) == 3:
+            operands = _cmyk_color(operands, transform, cache)
+            stats['colors'] += 1
+        elif operator in (b'SC', b'SCN') and stroke_rgb and len(operands) == 3:
+            operands = _cmyk_color(operands, transform, cache)
+            stats['colors'] += 1
+        elif operator == b'BI':
+            image, name = _convert_inline_image(operands[0], rgb_names, transform, cmyk_profile)
+            if image is None:
+                # Nepřevedený obrázek dál odkazuje na jméno prostoru - to pak nesmíme odebrat
+                stats['skipped'] += 1
+                if name:
+                    still_used.add(name)
+            elif image is not operands[0]:
+                operands = [image]
+                stats['images'] += 1
+        converted.append((operands, operator))
+    return converted, stats, still_used
+
+
+def _colour_space_location(doc, xref: int) -> tuple:
+    """
+    Kde leží /ColorSpace zdrojů obsahu: (xref, klíč), u nepřímého slovníku (xref, None).
+
+    Stránky a formuláře se sdíleným slovníkem zdrojů mají stejné místo.
+    """
+    res_type, res_value = doc.xref_get_key(xref, 'Resources')
+    holder = reference_xref(res_value) if res_type == 'xref' else xref
+    key = 'Resources/ColorSpace' if holder == xref else 'ColorSpace'
+    cs_type, cs_value = doc.xref_get_key(holder, key)
+    if cs_type == 'xref':
+        return reference_xref(cs_value), None
+    return holder, key
+
+
+def _drop_colour_spaces(doc, location: tuple, items: dict, names: set) -> None:
+    """Odebere převedené RGB prostory ze slovníku /ColorSpace na daném místě"""
+    remaining = ''.join(f"/{name} {value}" for name, value in items.items() if name not in names)
+    text = f"<<{remaining}>>"
+    xref, key = location
+    if key is None:
+        doc.update_object(xref, text)
+    else:
+        doc.xref_set_key(xref, key, text)
+
+
+def _convert_image(doc, xref: int, source_icc: bytes, cmyk_profile: Path,
+                   jpeg_quality: int = IMAGE_JPEG_QUALITY) -> bool:
+    """Převede RGB obrázek na DeviceCMYK přes ICC (JPEG zůstává JPEG, ostatní Flate)"""
+    pix = fitz.Pixmap(doc, xref)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)  # alfa je v samostatném /SMask
+    if pix.n != 3:
+        return False
+
+    image = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    image = ImageCms.applyTransform(image, _cmyk_transform(cmyk_profile, source_icc))
+
+    was_jpeg = doc.xref_get_key(xref, 'Filter')[1] in ('/DCTDecode', '[/DCTDecode]')
+    if was_jpeg:
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=jpeg_quality)
+        doc.update_stream(xref, buffer.getvalue(), compress=False)
+        doc.xref_set_key(xref, 'Filter', '/DCTDecode')
+        # Pillow ukládá CMYK JPEG invertovaně (Adobe APP14) - stejně jako Photoshop
+        doc.xref_set_key(xref, 'Decode', '[1 0 1 0 1 0 1 0]')
+    else:
+        doc.update_stream(xref, image.tobytes(), compress=True)
+        doc.xref_set_key(xref, 'Decode', 'null')
+
+    doc.xref_set_key(xref, 'ColorSpace', '/DeviceCMYK')
+    doc.xref_set_key(xref, 'BitsPerComponent', '8')
+    doc.xref_set_key(xref, 'DecodeParms', 'null')
+    return True
+
+
+def convert_to_cmyk(doc, cmyk_profile: Path = CMYK_PROFILE_PATH) -> dict:
+    """
+    Převede RGB obsah na CMYK podle výstupního profilu (náhrada za průchod Ghostscriptem).
+
+    Vektorové barvy (rg/RG, RGB prostory v cs/CS) jdou přes ICC transformaci ze sRGB,
+    neutrální šedé jen do černé. Obrázky v DeviceRGB/CalRGB/ICCBased RGB se převedou
+    přes svůj vložený profil (jinak sRGB), stejně tak 8bitové RGB inline obrázky (BI ... EI).
+    Metadata dokumentu zůstávají nedotčená. Přechody (shading), palety v RGB a inline obrázky,
+    které dekódovat neumíme (LZW, CCITT, /DecodeParms), se nepřevádějí - počítají se jako 'skipped'.
+
+    Args:
+        doc: fitz dokument (sloučená dvojstrana)
+        cmyk_profile: Cílový CMYK ICC profil (podmínka tisku)
+
+    Returns:
+        Statistika {'colors': převedené barvy, 'images': převedené obrázky, 'skipped'}
+    """
+    stats = {'colors': 0, 'images': 0, 'skipped': 0}
+    if not Path(cmyk_profile).exists():
+        logger.warning(f"  ⚠️  CMYK profil {cmyk_profile} neexistuje - převod barev přeskočen")
+        return stats
+
+    transform = _cmyk_transform(cmyk_profile)
+    cache = {}
+
+    # Content streamy stránek a formulářů. Slovník zdrojů může být sdílený víc stránkami
+    # či formuláři - RGB prostory z něj odebereme, až když je nepoužívá žádný z nich
+    colour_spaces = {}
+    holders = [(page.xref, page) for page in doc] + [(xref, None) for xref in form_xrefs(doc)]
+    for xref, page in holders:
+        resources = get_resources(doc, xref)
+        items = resources.get('ColorSpace', {})
+        rgb_names = {}
+        for name, value in items.items():
+            is_rgb, source_icc = _rgb_space_profile(doc, value)
+            if is_rgb:
+                rgb_names[name] = source_icc
+        content = page.read_contents() if page is not None else doc.xref_stream(xref)
+        operations, content_stats, still_used = _convert_operations(parse_content(content or b''), rgb_names,
+                                                                    transform, cache, cmyk_profile)
+        if content_stats['colors'] or content_stats['images'] or rgb_names:
+            data = serialize_content(operations)
+            if page is not None:
+                set_page_content(doc, xref, data)
+            else:
+                doc.update_stream(xref, data, compress=True)
+        for key, value in content_stats.items():
+            stats[key] += value
+        if rgb_names:
+            entry = colour_spaces.setdefault(_colour_space_location(doc, xref),
+                                             {'items': items, 'names': set(), 'used': set()})
+            entry['names'] |= set(rgb_names)
+            entry['used'] |= still_used
+
+        for value in resources.get('Shading', {}).values():
+            shading_xref = reference_xref(value)
+            if shading_xref and _rgb_space_profile(doc, doc.xref_get_key(shading_xref, 'ColorSpace')[1])[0]:
+                stats['skipped'] += 1
+
+    for location, entry in colour_spaces.items():
+        if entry['names'] - entry['used']:
+            _drop_colour_spaces(doc, location, entry['items'], entry['names'] - entry['used'])
+
+    # Obrázky stránek i formulářů (každý jen jednou, i když se kreslí víckrát)
+    images = sorted({image[0] for page in doc for image in page.get_images(full=True)})
+    for xref in images:
+        try:
+            if doc.xref_get_key(xref, 'ImageMask')[1] == 'true':
+                continue
+            cs_value = doc.xref_get_key(xref, 'ColorSpace')[1]
+            is_rgb, source_icc = _rgb_space_profile(doc, cs_value)
+            if not is_rgb:
+                cs_xref = reference_xref(cs_value)
+                cs_text = doc.xref_object(cs_xref, compressed=True) if cs_xref else cs_value
+                if '/Indexed' in cs_text and 'RGB' in cs_text:
+                    stats['skipped'] += 1
+                continue
+            if _convert_image(doc, xref, source_icc, cmyk_profile):
+                stats['images'] += 1
+            else:
+                stats['skipped'] += 1
+        except Exception as image_error:
+            logger.warning(f"  ⚠️  Obrázek {xref} nelze převést do CMYK: {image_error}")
+            stats['skipped'] += 1
+
+    return stats
+
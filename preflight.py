@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rychlý preflight PDF/X-1a:2001 přímo v aplikaci
+Čte jen katalog, Info, XMP, rámečky stránek a zdroje/obsah stránek a formulářů -
+celé vydání zkontroluje paralelně za pár sekund místo ruční kontroly v Acrobatu
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz
+
+from pdf_content import parse_content, form_xrefs, get_resources, reference_xref
+
+logger = logging.getLogger(__name__)
+
+# Tolerance porovnání rámečků (body)
+BOX_TOLERANCE = 0.01
+
+# Barevné prostory, které PDF/X-1a nepřipouští (jen CMYK, šedá, přímé barvy)
+_FORBIDDEN_SPACE_RE = re.compile(r'/(DeviceRGB|CalRGB|Lab|RGB)\b')
+_INLINE_SPACE_RE = re.compile(rb'/(?:CS|ColorSpace)\s*/(?:RGB|DeviceRGB|CalRGB|Lab)\b')
+_SMASK_RE = re.compile(r'/SMask\s*(?!/None)(\d+\s+0\s+R|<<|/)')
+_ALPHA_RE = re.compile(r'/(CA|ca)\s+([\d.]+)')
+_BLEND_RE = re.compile(r'/BM\s*(?:\[\s*)?/(\w+)')
+_REF_RE = re.compile(r'(\d+)\s+0\s+R')
+
+
+def _object_text(doc, value: str) -> str:
+    """Text objektu - nepřímý odkaz rozbalí, vložená hodnota zůstává"""
+    xref = reference_xref(value)
+    return doc.xref_object(xref, compressed=True) if xref else (value or '')
+
+
+def _colour_space_problem(doc, value: str) -> Optional[str]:
+    """Název nepovoleného barevného prostoru (RGB, Lab, ICC s 3 složkami), jinak None"""
+    text = _object_text(doc, value)
+    match = _FORBIDDEN_SPACE_RE.search(text)
+    if match:
+        return match.group(1)
+    if '/ICCBased' in text:
+        for ref in _REF_RE.findall(text):
+            if doc.xref_get_key(int(ref), 'N')[1] == '3':
+                return 'ICCBased RGB'
+    return None
+
+
+def _parse_box(doc, xref: int, key: str):
+    value_type, value = doc.xref_get_key(xref, key)
+    if value_type != 'array':
+        return None
+    x0, y0, x1, y1 = (float(v) for v in value.strip('[]').split())
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+def _box_inside(inner, outer) -> bool:
+    return (inner[0] >= outer[0] - BOX_TOLERANCE and inner[1] >= outer[1] - BOX_TOLERANCE
+            and inner[2] <= outer[2] + BOX_TOLERANCE and inner[3] <= outer[3] + BOX_TOLERANCE)
+
+
+def _check_info(doc, errors: List[str]) -> Dict[str, str]:
+    """Info slovník: GTS_PDFXVersion, Trapped, Title, CreationDate, ModDate"""
+    info = {}
+    value_type, value = doc.xref_get_key(-1, 'Info')
+    info_xref = reference_xref(value) if value_type == 'xref' else 0
+    if not info_xref:
+        errors.append("Chybí Info slovník")
+        return info
+
+    for key in ('GTS_PDFXVersion', 'Trapped', 'Title', 'CreationDate', 'ModDate'):
+        info[key] = doc.xref_get_key(info_xref, key)[1]
+
+    if not info['GTS_PDFXVersion'].startswith('PDF/X-1'):
+        errors.append(f"Info: GTS_PDFXVersion není PDF/X-1a ({info['GTS_PDFXVersion'] or 'chybí'})")
+    if info['Trapped'] not in ('/True', '/False'):
+        errors.append(f"Info: Trapped musí být /True nebo /False ({info['Trapped'] or 'chybí'})")
+    for key in ('Title', 'CreationDate', 'ModDate'):
+        if info[key] in ('', 'null'):
+            errors.append(f"Info: chybí {key}")
+    return info
+
+
+def _check_xmp(doc, info: Dict[str, str], errors: List[str], warnings: List[str]) -> None:
+    """XMP: musí se shodovat s Info (verze PDF/X a Trapped)"""
+    xmp = doc.get_xml_metadata()
+    if not xmp:
+        warnings.append("Chybí XMP metadata")
+        return
+    version = re.search(r'GTS_PDFXVersion>([^<]*)<', xmp)
+    if not version:
+        errors.append("XMP: chybí GTS_PDFXVersion")
+    elif info.get('GTS_PDFXVersion') and version.group(1) != info['GTS_PDFXVersion']:
+        errors.append(f"XMP: GTS_PDFXVersion {version.group(1)} nesouhlasí s Info ({info['GTS_PDFXVersion']})")
+    trapped = re.search(r'Trapped>([^<]*)<', xmp)
+    if trapped and info.get('Trapped') and f"/{trapped.group(1)}" != info['Trapped']:
+        errors.append(f"XMP: Trapped {trapped.group(1)} nesouhlasí s Info ({info['Trapped']})")
+
+
+def _check_output_intent(doc, errors: List[str], warnings: List[str]) -> None:
+    """OutputIntent /GTS_PDFX s identifikátorem podmínek tisku a CMYK profilem"""
+    value_type, value = doc.xref_get_key(doc.pdf_catalog(), 'OutputIntents')
+    if value_type == 'xref':
+        value = doc.xref_object(reference_xref(value), compressed=True)
+    intents = [int(ref) for ref in _REF_RE.findall(value or '')]
+    pdfx = [xref for xref in intents if doc.xref_get_key(xref, 'S')[1] == '/GTS_PDFX']
+    if not pdfx:
+        errors.append("Chybí OutputIntent /GTS_PDFX")
+        return
+    if len(pdfx) > 1:
+        errors.append(f"Více OutputIntentů /GTS_PDFX ({len(pdfx)})")
+
+    intent = pdfx[0]
+    if doc.xref_get_key(intent, 'OutputConditionIdentifier')[0] != 'string':
+        errors.append("OutputIntent: chybí OutputConditionIdentifier")
+    profile_type, profile = doc.xref_get_key(intent, 'DestOutputProfile')
+    if profile_type != 'xref':
+        warnings.append("OutputIntent bez ICC profilu (DestOutputProfile) - jen registrovaná podmínka tisku")
+    elif doc.xref_get_key(reference_xref(profile), 'N')[1] != '4':
+        errors.append("OutputIntent: ICC profil není CMYK (/N 4)")
+
+
+def _check_boxes(doc, page, errors: List[str]) -> None:
+    """TrimBox nebo ArtBox (ne oba) uvnitř MediaBox, BleedBox mezi nimi"""
+    label = f"Strana {page.number + 1}"
+    media = _parse_box(doc, page.xref, 'MediaBox')
+    if media is None:
+        # Zděděný MediaBox - fitz ho dohledá
+        rect = page.mediabox
+        media = (rect.x0, rect.y0, rect.x1, rect.y1)
+    trim = _parse_box(doc, page.xref, 'TrimBox')
+    art = _parse_box(doc, page.xref, 'ArtBox')
+    bleed = _parse_box(doc, page.xref, 'BleedBox')
+
+    if trim is None and art is None:
+        errors.append(f"{label}: chybí TrimBox (ani ArtBox)")
+    if trim is not None and art is not None:
+        errors.append(f"{label}: TrimBox a ArtBox současně")
+    for name, box in (('TrimBox', trim), ('ArtBox', art), ('BleedBox', bleed)):
+        if box is not None and not _box_inside(box, media):
+            errors.append(f"{label}: {name} přesahuje MediaBox")
+    if bleed is not None and trim is not None and not _box_inside(trim, bleed):
+        errors.append(f"{label}: TrimBox přesahuje BleedBox")
+
+
+def _check_resources(doc, xref: int, label: str, problems: Dict[str, str]) -> None:
+    """Barevné prostory, obrázky a průhlednost ve zdrojích stránky nebo formuláře"""
+    resources = get_resources(doc, xref)
+
+    for name, value in resources.get('ColorSpace', {}).items():
+        space = _colour_space_problem(doc, value)
+        if space:
+            problems.setdefault(f"{label}: barevný prostor {space} (/{name})", 'error')
+
+    for name, value in resources.get('ExtGState', {}).items():
+        text = _object_text(doc, value)
+        if _SMASK_RE.search(text):
+            problems.setdefault(f"{label}: průhlednost - SMask v ExtGState /{name}", 'error')
+        for key, alpha in _ALPHA_RE.findall(text):
+            if float(alpha) < 1:
+                problems.setdefault(f"{label}: průhlednost - {key} {alpha} v ExtGState /{name}", 'error')
+        blend = _BLEND_RE.search(text)
+        if blend and blend.group(1) not in ('Normal', 'Compatible'):
+            problems.setdefault(f"{label}: průhlednost - režim prolnutí {blend.group(1)} (/{name})", 'error')
+
+    for name, value in resources.get('XObject', {}).items():
+        object_xref = reference_xref(value)
+        if not object_xref:
+            continue
+        subtype = doc.xref_get_key(object_xref, 'Subtype')[1]
+        if subtype == '/Image':
+            if doc.xref_get_key(object_xref, 'SMask')[0] == 'xref':
+                problems.setdefault(f"{label}: průhlednost - obrázek /{name} se SMask", 'error')
+            space = _colour_space_problem(doc, doc.xref_get_key(object_xref, 'ColorSpace')[1])
+            if space:
+                problems.setdefault(f"{label}: obrázek /{name} v {space}", 'error')
+        elif subtype == '/Form' and doc.xref_get_key(object_xref, 'Group/S')[1] == '/Transparency':
+            problems.setdefault(f"{label}: průhlednost - skupina /Transparency ve formuláři /{name}", 'error')
+
+
+def _check_content(content: bytes, label: str, problems: Dict[str, str]) -> None:
+    """RGB operátory a inline obrázky v content streamu"""
+    for operands, operator in parse_content(content):
+        if operator in (b'rg', b'RG'):
+            problems.setdefault(f"{label}: DeviceRGB barva (operátor {operator.decode()})", 'error')
+        elif operator in (b'cs', b'CS') and operands and operands[0] in (b'/DeviceRGB', b'/CalRGB', b'/Lab'):
+            problems.setdefault(f"{label}: barevný prostor {operands[0].decode()[1:]}", 'error')
+        elif operator == b'BI' and any(_INLINE_SPACE_RE.search(operand) for operand in operands):
+            problems.setdefault(f"{label}: inline obrázek v RGB", 'error')
+
+
+def preflight_file(path: Path) -> dict:
+    """
+    Zkontroluje jeden soubor proti PDF/X-1a:2001.
+
+    Returns:
+        {'file', 'passed', 'errors': [...], 'warnings': [...]}
+    """
+    path = Path(path)
+    errors = []
+    warnings = []
+    try:
+        with fitz.open(str(path)) as doc:
+            if doc.is_encrypted:
+                errors.append("Dokument je šifrovaný")
+            else:
+                info = _check_info(doc, errors)
+                _check_xmp(doc, info, errors, warnings)
+                _check_output_intent(doc, errors, warnings)
+
+                problems = {}
+                for page in doc:
+                    label = f"Strana {page.number + 1}"
+                    _check_boxes(doc, page, errors)
+                    _check_resources(doc, page.xref, label, problems)
+                    _check_content(page.read_contents(), label, problems)
+                    for font in page.get_fonts(full=True):
+                        xref, ext, font_type, basefont = font[:4]
+                        if ext == 'n/a' and font_type != 'Type3':
+                            problems.setdefault(f"{label}: font {basefont} není vložený", 'error')
+                for xref in form_xrefs(doc):
+                    label = f"Formulář {xref}"
+                    _check_resources(doc, xref, label, problems)
+                    _check_content(doc.xref_stream(xref) or b'', label, problems)
+                errors.extend(problems)
+    except Exception as e:
+        errors.append(f"Soubor nelze přečíst: {e}")
+
+    return {'file': path.name, 'passed': not errors, 'errors': errors, 'warnings': warnings}
+
+
+def preflight_files(paths: List[Path], workers: Optional[int] = None) -> List[dict]:
+    """
+    Preflight více souborů paralelně (procesy - kontrola je výpočetně náročná na CPU).
+
+    Args:
+        paths: Soubory ke kontrole
+        workers: Počet procesů (None = počet CPU, 1 = sekvenčně v tomto procesu)
+
+    Returns:
+        Zprávy preflight_file() ve stejném pořadí jako paths
+    """
+    paths = [Path(path) for path in paths]
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [preflight_file(path) for path in paths]
+
+    # Samostatné interprety (python preflight.py --json) - ne fork (vícevláknová webová aplikace
+    # by předala zamčené zámky) ani multiprocessing spawn (ten v každém procesu znovu provede
+    # hlavní modul aplikace, tj. celé python web_app.py)
+    chunks = [paths[index::workers] for index in range(workers)]
+    processes = [subprocess.Popen([sys.executable, str(Path(__file__).resolve()), '--json', '--',
+                                   *(str(path) for path in chunk)],
+                                  stdout=subprocess.PIPE, text=True)
+                 for chunk in chunks]
+
+    reports = {}
+    for chunk, process in zip(chunks, processes):
+        output, _ = process.communicate()
+        try:
+            # JSON je poslední řádek - MuPDF může před ním vypsat varování na stdout
+            chunk_reports = json.loads(output.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            error = f"Preflight proces selhal (exit {process.returncode})"
+            chunk_reports = [{'file': path.name, 'passed': False, 'errors': [error], 'warnings': []}
+                             for path in chunk]
+        reports.update(zip(chunk, chunk_reports))
+    return [reports[path] for path in paths]
+
+
+def summarize(reports: List[dict]) -> dict:
+    """Souhrn pro výsledek úlohy - podrobnosti jen u souborů s nálezy"""
+    failed = [report for report in reports if not report['passed']]
+    warned = [report for report in reports if report['passed'] and report['warnings']]
+    summary = {
+        'checked': len(reports),
+        'failed': len(failed),
+        'warnings': sum(len(report['warnings']) for report in reports),
+        'files': failed + warned
+    }
+    if failed:
+        logger.warning(f"🛫 Preflight: {len(failed)} z {len(reports)} souborů neprošlo PDF/X-1a")
+    else:
+        logger.info(f"🛫 Preflight: všech {len(reports)} souborů prošlo PDF/X-1a")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preflight PDF/X-1a:2001")
+    parser.add_argument("files", type=Path, nargs='+', help="PDF soubory ke kontrole")
+    parser.add_argument("--workers", type=int, default=None, help="Počet procesů (výchozí počet CPU)")
+    parser.add_argument("--json", action="store_true",
+                        help="Zprávy jako JSON na jednom řádku, sekvenčně (proces workeru preflight_files)")
+    args = parser.parse_args()
+
+    if args.json:
+        print(json.dumps([preflight_file(path) for path in args.files], ensure_ascii=False))
+        return
+
+    reports = preflight_files(args.files, args.workers)
+    for report in reports:
+        print(f"{'✅' if report['passed'] else '❌'} {report['file']}")
+        for error in report['errors']:
+            print(f"    ❌ {error}")
+        for warning in report['warnings']:
+            print(f"    ⚠️  {warning}")
+
+    failed = sum(1 for report in reports if not report['passed'])
+    print(f"\n{len(reports) - failed}/{len(reports)} souborů prošlo")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
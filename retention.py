@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retence souborů - jeden úklidový proces (janitor) na pozadí
+Maže prošlé uploady, výstupy, ZIP archivy a dokončené úlohy podle nastavených TTL
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionJanitor:
+    """
+    Úklid na pozadí v jediném vlákně.
+
+    Nahrazuje jednorázová vlákna "počkej a smaž" - odložené mazání se jen
+    zaeviduje a janitor ho provede spolu s běžným úklidem podle TTL.
+    """
+
+    def __init__(self, rules: List[Tuple[Path, str, float]], tasks: Optional[Dict] = None,
+                 task_ttl: float = 0, interval: float = 60, batch_size: int = 200):
+        """
+        Args:
+            rules: Seznam pravidel (složka, glob vzor, TTL v sekundách); TTL 0 = nemazat
+            tasks: Slovník úloh (processing_tasks) pro úklid dokončených úloh
+            task_ttl: Jak dlouho držet dokončenou úlohu (sekundy); 0 = nemazat
+            interval: Perioda pravidelného úklidu (sekundy)
+            batch_size: Počet souborů smazaných v jedné dávce
+        """
+        self.rules = rules
+        self.tasks = tasks
+        self.task_ttl = task_ttl
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._scheduled = {}  # cesta -> čas smazání
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def schedule_delete(self, path: Path, delay: float = 2.0):
+        """Naplánuje smazání souboru za `delay` sekund (např. po stažení)"""
+        with self._lock:
+            self._scheduled[Path(path)] = time.time() + delay
+        self._wakeup.set()
+
+    def _collect_expired(self, now: float) -> List[Path]:
+        """Vrátí soubory, kterým vypršel TTL nebo naplánovaný čas smazání"""
+        expired = []
+
+        with self._lock:
+            for path, deadline in list(self._scheduled.items()):
+                if deadline <= now:
+                    expired.append(path)
+                    del self._scheduled[path]
+
+        for folder, pattern, ttl in self.rules:
+            if ttl <= 0 or not folder.exists():
+                continue
+            for path in folder.glob(pattern):
+                try:
+                    if now - path.stat().st_mtime > ttl:
+                        expired.append(path)
+                except FileNotFoundError:
+                    continue
+
+        # Bez duplicit (naplánovaný soubor může zároveň překročit TTL)
+        return list(dict.fromkeys(expired))
+
+    def _expire_tasks(self, now: float) -> int:
+        """Smaže dokončené úlohy starší než task_ttl"""
+        if self.tasks is None or self.task_ttl <= 0:
+            return 0
+
+        expired = [
+            task_id for task_id, task in list(self.tasks.items())
+            if task.get('status') != 'processing'
+            and now - task.get('end_time', task.get('start_time', now)) > self.task_ttl
+        ]
+        for task_id in expired:
+            self.tasks.pop(task_id, None)
+        return len(expired)
+
+    def sweep(self) -> dict:
+        """
+        Provede jeden úklid.
+
+        Returns:
+            Slovník s počtem smazaných souborů, uvolněnými bajty a smazanými úlohami
+        """
+        now = time.time()
+        expired = self._collect_expired(now)
+
+        deleted_files = 0
+        reclaimed_bytes = 0
+
+        # Mazání po dávkách - mezi dávkami pustíme ke slovu ostatní vlákna
+        for start in range(0, len(expired), self.batch_size):
+            for path in expired[start:start + self.batch_size]:
+                try:
+                    size = path.stat().st_size
+                    path.unlink()
+                    deleted_files += 1
+                    reclaimed_bytes += size
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.warning(f"Janitor: nelze smazat {path}: {e}")
+            time.sleep(0)
+
+        deleted_tasks = self._expire_tasks(now)
+
+        if deleted_files or deleted_tasks:
+            logger.info(f"🧹 Janitor: smazáno {deleted_files} souborů "
+                        f"({reclaimed_bytes / (1024 * 1024):.1f} MB), {deleted_tasks} úloh")
+
+        return {
+            'deleted_files': deleted_files,
+            'reclaimed_bytes': reclaimed_bytes,
+            'deleted_tasks': deleted_tasks
+        }
+
+    def _next_wait(self) -> float:
+        """Čas do dalšího úklidu - dřív, pokud je naplánované mazání"""
+        with self._lock:
+            if self._scheduled:
+                return max(0.0, min(self.interval, min(self._scheduled.values()) - time.time()))
+        return self.interval
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Janitor: chyba při úklidu: {e}")
+            self._wakeup.wait(self._next_wait())
+            self._wakeup.clear()
+
+    def start(self):
+        """Spustí úklidové vlákno (daemon)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='retention-janitor', daemon=True)
+        self._thread.start()
+        logger.info(f"🧹 Janitor spuštěn (interval {self.interval:.0f} s)")
+
+    def stop(self):
+        """Zastaví úklidové vlákno"""
+        self._stopped.set()
+        self._wakeup.set()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Atomický zápis výstupů přes rychlou scratch složku
+Soubor vzniká v pracovní složce úlohy (ideálně tmpfs) a do cílové složky
+se publikuje až hotový - atomickým přejmenováním
+"""
+
+import errno
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Velikost bloku pro sekvenční kopii na pomalý svazek
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def default_scratch_root() -> Path:
+    """
+    Kořen pro scratch složky úloh.
+
+    Pořadí: proměnná SCRATCH_DIR, /dev/shm (tmpfs v RAM), systémový temp.
+    """
+    env_dir = os.environ.get('SCRATCH_DIR')
+    if env_dir:
+        path = Path(env_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    shm = Path('/dev/shm')
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm
+
+    return Path(tempfile.gettempdir())
+
+
+def publish_file(staged: Path, final: Path) -> Path:
+    """
+    Atomicky přesune hotový soubor ze scratch do cílové cesty.
+
+    Na stejném svazku stačí rename. Jinak se soubor jedním sekvenčním zápisem
+    zkopíruje do skrytého dočasného souboru vedle cíle a teprve pak přejmenuje,
+    takže čtenář nikdy neuvidí rozepsaný soubor.
+    """
+    staged = Path(staged)
+    final = Path(final)
+
+    try:
+        os.replace(staged, final)
+        return final
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    partial = final.with_name(f".{final.name}.part")
+    try:
+        with open(staged, 'rb') as src, open(partial, 'wb') as dst:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(partial, final)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    staged.unlink()
+    return final
+
+
+class ScratchJob:
+    """Pracovní (scratch) složka jedné úlohy - po skončení se smaže"""
+
+    def __init__(self, root: Optional[Path] = None, prefix: str = 'job_'):
+        self.root = Path(root) if root else default_scratch_root()
+        self.path = Path(tempfile.mkdtemp(prefix=prefix, dir=self.root))
+        logger.info(f"📂 Scratch složka úlohy: {self.path}")
+
+    def stage(self, name: str) -> Path:
+        """Cesta, kam se má soubor rozepsat"""
+        return self.path / name
+
+    def publish(self, name: str, final: Path) -> Path:
+        """Publikuje hotový soubor `name` do cílové cesty"""
+        return publish_file(self.stage(name), final)
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test diskové kvóty - LRU vyklízení výstupů a odmítnutí úlohy, která se nevejde
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from disk_quota import DiskQuota
+
+
+def _make_file(path: Path, size: int, last_used: float):
+    path.write_bytes(b"x" * size)
+    os.utime(path, (last_used, last_used))
+
+
+def test_lru_eviction_and_admission():
+    """Nejdéle nepoužitý výstup se vyklidí jako první, nahrané stránky zůstanou"""
+    with tempfile.TemporaryDirectory() as tmp:
+        uploads = Path(tmp) / "uploads"
+        outputs = Path(tmp) / "output"
+        uploads.mkdir()
+        outputs.mkdir()
+
+        now = time.time()
+        _make_file(uploads / "PR25103001VY1.pdf", 4000, now - 7200)
+        _make_file(outputs / "old.x.pdf", 3000, now - 7200)
+        _make_file(outputs / "recent.x.pdf", 3000, now - 3600)
+
+        quota = DiskQuota(global_budget=12000, min_free=0)
+        quota.add_workspace('uploads', uploads, ('*.pdf',))
+        quota.add_workspace('outputs', outputs, ('*.pdf',), evictable=True)
+
+        # 10000 obsazeno + 4000 potřeba -> je třeba vyklidit 2000 B = jeden soubor
+        admitted, _ = quota.admit(4000)
+        assert admitted
+        assert not (outputs / "old.x.pdf").exists()
+        assert (outputs / "recent.x.pdf").exists()
+        assert (uploads / "PR25103001VY1.pdf").exists()
+        quota.release(4000)
+
+        # Úloha větší než celý rozpočet se nespustí
+        admitted, message = quota.admit(20000)
+        assert not admitted
+        assert "Nedostatek místa" in message
+
+
+def test_recently_used_file_is_protected():
+    """Starý výstup, který se právě stáhl (touch), se nevyklidí dřív než po min_age"""
+    with tempfile.TemporaryDirectory() as tmp:
+        outputs = Path(tmp) / "output"
+        outputs.mkdir()
+        _make_file(outputs / "old.x.pdf", 3000, time.time() - 7200)
+        DiskQuota.touch(outputs / "old.x.pdf")
+
+        quota = DiskQuota(global_budget=5000, min_free=0, min_age=300)
+        quota.add_workspace('outputs', outputs, ('*.pdf',), evictable=True)
+
+        admitted, _ = quota.admit(4000)
+        assert not admitted
+        assert (outputs / "old.x.pdf").exists()
+
+
+if __name__ == "__main__":
+    test_lru_eviction_and_admission()
+    test_recently_used_file_is_protected()
+    print("✅ Test kvóty prošel")
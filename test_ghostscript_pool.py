@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test poolu Ghostscript workerů - víc konverzí v jednom běžícím gs, chybný soubor ho neshodí
+(vyžaduje gs v PATH, jinak se přeskočí)
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import fitz
+import pytest
+
+from conftest import write_page
+from ghostscript_pool import GhostscriptPool
+
+GS_PATH = shutil.which('gs')
+
+
+@pytest.mark.skipif(GS_PATH is None, reason="Ghostscript (gs) není nainstalovaný")
+def test_pool_converts_in_persistent_worker():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'first.pdf', "Strana 2")
+        write_page(tmp / 'second.pdf', "Strana 3")
+        (tmp / 'broken.pdf').write_bytes(b'tohle neni PDF')
+
+        with GhostscriptPool(GS_PATH, workers=1, timeout=30, folders=[tmp]) as pool:
+            first, broken, second = pool.convert_many([tmp / 'first.pdf', tmp / 'broken.pdf', tmp / 'second.pdf'])
+            worker = pool._idle.get_nowait()
+            assert worker.jobs == 3 and worker.alive()
+            pool._idle.put(worker)
+
+        assert first['success'] and second['success'], (first, second)
+        assert not broken['success'] and broken['error']
+        assert (tmp / 'broken.pdf').read_bytes() == b'tohle neni PDF'
+        for name, text in (('first.pdf', "Strana 2"), ('second.pdf', "Strana 3")):
+            with fitz.open(str(tmp / name)) as doc:
+                assert 'Ghostscript' in doc.metadata['producer']
+                assert text in doc[0].get_text()
+        assert not list(tmp.glob('*_temp_pdfx.pdf'))
+
+
+if __name__ == "__main__":
+    if GS_PATH is None:
+        print("⏭️  Ghostscript není nainstalovaný - test přeskočen")
+    else:
+        test_pool_converts_in_persistent_worker()
+        print("✅ Test poolu Ghostscript workerů prošel")
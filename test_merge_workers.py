@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test merge v procesech workerů - zdroje ze sdílené paměti, výstup stejný jako ve vlákně,
+zaseknutý nebo spadlý worker se nahradí
+"""
+
+import tempfile
+from multiprocessing import shared_memory
+from pathlib import Path
+
+from conftest import write_page
+from indesign_like_pdf_merger import InDesignLikePDFMerger
+import merge_workers
+from merge_workers import MergeWorkerPool, SharedSources
+
+
+def test_worker_merge_matches_in_process():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'PR25103002VY1.pdf', "Strana 2")
+        write_page(tmp / 'PR25103003VY1.pdf', "Strana 3")
+        sides = [{'left_pdf': tmp / 'PR25103002VY1.pdf', 'right_pdf': tmp / 'PR25103003VY1.pdf',
+                  'rotation': -90}]
+        options = {'deterministic': True, 'mutation_overlay': True}
+        # Název výstupu je v metadatech - obě varianty se jmenují stejně
+        (tmp / 'local').mkdir()
+        (tmp / 'worker').mkdir()
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        local = merger.create_sheet_variants(sides, {'PXB': tmp / 'local' / '28PXB021.pdf'}, **options)
+        assert local == {'PXB': True}
+
+        pool = MergeWorkerPool(workers=1)
+        try:
+            with SharedSources() as sources:
+                future = pool.submit(sides, {'PXB': tmp / 'worker' / '28PXB021.pdf'}, options, sources)
+                results, stats = future.result()
+                segment_name, size = sources.share(sides[0]['left_pdf'])
+                assert size == (tmp / 'PR25103002VY1.pdf').stat().st_size
+        finally:
+            pool.close()
+
+        assert results == {'PXB': True}
+        assert (tmp / 'worker' / '28PXB021.pdf').read_bytes() == (tmp / 'local' / '28PXB021.pdf').read_bytes()
+
+        # Sdílená paměť úlohy je po skončení uvolněná
+        try:
+            shared_memory.SharedMemory(name=segment_name).close()
+            assert False, "segment zůstal ve sdílené paměti"
+        except FileNotFoundError:
+            pass
+
+
+def test_worker_recycled_after_max_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'PR25103002VY1.pdf', "Strana 2")
+        write_page(tmp / 'PR25103003VY1.pdf', "Strana 3")
+        sides = [{'left_pdf': tmp / 'PR25103002VY1.pdf', 'right_pdf': tmp / 'PR25103003VY1.pdf',
+                  'rotation': 0}]
+
+        pool = MergeWorkerPool(workers=1, max_jobs=2, store=1)
+        try:
+            with SharedSources() as sources:
+                pids = []
+                for index in range(3):
+                    results, _ = pool.submit(sides, {'PXB': tmp / f'{index}.pdf'}, {}, sources).result()
+                    assert results == {'PXB': True}
+                    pids.append(pool.usage()[0]['pid'] if pool.usage() else None)
+        finally:
+            pool.close()
+
+        # Po druhé úloze worker skončil, třetí běžela v novém procesu
+        assert pool.recycled == 1
+        assert pids[1] is None and pids[0] != pids[2]
+
+
+# Testovací proces workeru: merge výstupu hung.pdf se zasekne, crashed.pdf shodí proces
+FAULTY_WORKER = """
+import os, sys, time
+sys.path.insert(0, {package!r})
+from multiprocessing.connection import Connection
+import merge_workers
+
+merge = merge_workers.merge_unit
+
+def faulty_merge_unit(sides, outputs, options, handles):
+    names = {{path.name for path in outputs.values()}}
+    if 'hung.pdf' in names:
+        while True:
+            time.sleep(60)
+    if 'crashed.pdf' in names:
+        os._exit(3)
+    return merge(sides, outputs, options, handles)
+
+merge_workers.merge_unit = faulty_merge_unit
+merge_workers._worker_main(Connection(int(sys.argv[1])))
+"""
+
+
+def test_hung_and_crashed_workers_are_replaced():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'PR25103002VY1.pdf', "Strana 2")
+        write_page(tmp / 'PR25103003VY1.pdf', "Strana 3")
+        sides = [{'left_pdf': tmp / 'PR25103002VY1.pdf', 'right_pdf': tmp / 'PR25103003VY1.pdf',
+                  'rotation': 0}]
+        script = tmp / 'faulty_worker.py'
+        script.write_text(FAULTY_WORKER.format(package=str(Path(__file__).resolve().parent)))
+
+        worker_script = merge_workers.WORKER_SCRIPT
+        merge_workers.WORKER_SCRIPT = script
+        pool = MergeWorkerPool(workers=1, timeout=5)
+        try:
+            with SharedSources() as sources:
+                hung = pool.submit(sides, {'PXB': tmp / 'hung.pdf'}, {}, sources)
+                crashed = pool.submit(sides, {'PXB': tmp / 'crashed.pdf'}, {}, sources)
+                ok = pool.submit(sides, {'PXB': tmp / 'ok.pdf'}, {}, sources)
+
+                try:
+                    hung.result()
+                    assert False, "zaseknutý merge nevypršel"
+                except TimeoutError:
+                    pass
+                try:
+                    crashed.result()
+                    assert False, "pád workeru se neohlásil"
+                except RuntimeError as e:
+                    assert 'exit 3' in str(e), e
+                # Další dvojstrana běží v novém workeru nad stále platnou sdílenou pamětí
+                assert ok.result()[0] == {'PXB': True}
+        finally:
+            pool.close()
+            merge_workers.WORKER_SCRIPT = worker_script
+
+        assert pool.killed == 2
+
+
+if __name__ == "__main__":
+    test_worker_merge_matches_in_process()
+    test_worker_recycled_after_max_jobs()
+    test_hung_and_crashed_workers_are_replaced()
+    print("✅ Test merge v procesech workerů prošel")
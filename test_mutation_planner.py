@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test plánovače mutací - společné dvojstrany se skládají jen jednou
+"""
+
+import pytest
+
+from mutation_planner import parse_manifest, plan_spreads, plan_sheets
+
+
+def _page_number(filename: str) -> int:
+    # PR251030XXBBB.pdf -> XX
+    return int(filename[-9:-7])
+
+
+PAIRS = [
+    {'left_file': 'PR25103001VY1.pdf', 'right_file': 'PR25103008VY1.pdf'},
+    {'left_file': 'PR25103002VY1.pdf', 'right_file': 'PR25103007VY1.pdf'},
+    {'left_file': 'PR25103006VY1.pdf', 'right_file': 'PR25103003VY1.pdf'},
+    {'left_file': 'PR25103004VY1.pdf', 'right_file': 'PR25103005VY1.pdf'},
+]
+
+
+def test_shared_spreads_are_planned_once():
+    """Mutace PXE nahrazuje stranu 3 - liší se jen jedna dvojstrana"""
+    mutations = ['PXB', 'PXE', 'PXS']
+    manifest = parse_manifest({'PXE': {'3': 'PR25103003VY2.pdf'}}, mutations)
+    spreads, errors = plan_spreads(PAIRS, mutations, '28', '1', _page_number, manifest)
+
+    assert not errors
+    assert len(spreads) == 5
+    assert sum(len(spread['targets']) for spread in spreads) == 12
+
+    regional = [spread for spread in spreads if spread['right_file'] == 'PR25103003VY2.pdf']
+    assert len(regional) == 1
+    assert regional[0]['targets'] == {'PXE': '28PXE031.x.pdf'}
+    assert regional[0]['rotation'] == -90
+
+    # Liché strany vždy vpravo, rotace podle pořadí páru
+    first = spreads[0]
+    assert (first['left_file'], first['right_file']) == ('PR25103008VY1.pdf', 'PR25103001VY1.pdf')
+    assert first['targets'] == {'PXB': '28PXB011.x.pdf', 'PXE': '28PXE011.x.pdf', 'PXS': '28PXS011.x.pdf'}
+    assert spreads[1]['rotation'] == 90
+
+
+def test_manifest_validation():
+    with pytest.raises(ValueError):
+        parse_manifest({'PXX': {'3': 'PR25103003VY2.pdf'}}, ['PXB'])
+    with pytest.raises(ValueError):
+        parse_manifest({'PXB': {'tri': 'PR25103003VY2.pdf'}}, ['PXB'])
+    assert parse_manifest(None, ['PXB']) == {}
+
+
+def test_sheets_bundle_front_and_back():
+    """Přední (-90°) a zadní (+90°) dvojstrana jednoho archu jdou do jednoho PDF"""
+    mutations = ['PXB', 'PXE']
+    manifest = parse_manifest({'PXE': {'3': 'PR25103003VY2.pdf'}}, mutations)
+    spreads, _ = plan_spreads(PAIRS, mutations, '28', '1', _page_number, manifest)
+    sheets = plan_sheets(spreads)
+
+    # Archy 1 a 2 pro PXB; PXE má na archu 2 jinou přední stranu
+    assert len(sheets) == 3
+    assert sum(len(sheet['targets']) for sheet in sheets) == 4
+    for sheet in sheets:
+        assert [side['rotation'] for side in sheet['sides']] == [-90, 90]
+
+    first = sheets[0]
+    assert first['targets'] == {'PXB': '28PXB011.x.pdf', 'PXE': '28PXE011.x.pdf'}
+    assert [side['pair_index'] for side in first['sides']] == [1, 2]
+
+    regional = [sheet for sheet in sheets if 'PXE' in sheet['targets'] and sheet['sheet_index'] == 2]
+    assert regional[0]['targets'] == {'PXE': '28PXE031.x.pdf'}
+    assert regional[0]['sides'][0]['right_file'] == 'PR25103003VY2.pdf'
+
+
+if __name__ == "__main__":
+    test_shared_spreads_are_planned_once()
+    test_manifest_validation()
+    test_sheets_bundle_front_and_back()
+    print("✅ Test plánovače mutací prošel")
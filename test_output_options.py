@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test voleb výstupu merge - profily ukládání, kompaktní výstup (optimize), převzorkování obrázků,
+linearizované PDF (fast web view), razítka mutací,
+skládání splice, reprodukovatelný výstup
+"""
+
+import io
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import fitz
+import pytest
+from PIL import Image
+
+import hashing
+from conftest import write_page
+import indesign_like_pdf_merger
+from indesign_like_pdf_merger import InDesignLikePDFMerger, get_save_options
+
+
+def _linearization_tools() -> bool:
+    try:
+        import pikepdf  # noqa: F401
+        return True
+    except ImportError:
+        return shutil.which('qpdf') is not None
+
+
+# Očekávané volby fitz.Document.save() pro každý profil
+EXPECTED_SAVE_OPTIONS = {
+    'print': {'garbage': 4, 'deflate': True, 'clean': True},
+    'fast': {'garbage': 1, 'deflate': True, 'clean': False},
+}
+
+
+def test_save_profiles():
+    """--save-profile (CLI) i save_profile merge předají fitz odpovídající volby uložení"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'strana_02.pdf', "Strana 2")
+        write_page(tmp / 'strana_03.pdf', "Strana 3")
+
+        saved = []
+        save = fitz.Document.save
+
+        def recording_save(doc, filename, *args, **options):
+            saved.append((Path(str(filename)).name, options))
+            return save(doc, filename, *args, **options)
+
+        cwd, argv = os.getcwd(), sys.argv
+        fitz.Document.save = recording_save
+        os.chdir(tmp)
+        try:
+            for profile, expected in EXPECTED_SAVE_OPTIONS.items():
+                assert get_save_options(profile) == expected
+
+                saved.clear()
+                sys.argv = ['indesign_like_pdf_merger.py', '--files-dir', str(tmp), '--auto',
+                            '--save-profile', profile]
+                indesign_like_pdf_merger.main()
+                assert saved == [('merged_02_03_indesign_like.pdf', expected)]
+
+                saved.clear()
+                merger = InDesignLikePDFMerger(files_dir=str(tmp))
+                assert merger.create_side_by_side_pdf_with_rotation(tmp / 'strana_02.pdf', tmp / 'strana_03.pdf',
+                                                                    tmp / f'{profile}.pdf', save_profile=profile)
+                assert saved == [(f'{profile}.pdf', expected)]
+
+            sys.argv = ['indesign_like_pdf_merger.py', '--auto', '--save-profile', 'archiv']
+            with pytest.raises(SystemExit):
+                indesign_like_pdf_merger.main()
+            with pytest.raises(ValueError):
+                get_save_options('archiv')
+        finally:
+            fitz.Document.save = save
+            os.chdir(cwd)
+            sys.argv = argv
+
+
+def _embedded_fonts(doc) -> list:
+    """(FontName, velikost vloženého fontu) pro každý FontDescriptor v dokumentu"""
+    fonts = []
+    for xref in range(1, doc.xref_length()):
+        if doc.xref_get_key(xref, 'Type')[1] != '/FontDescriptor':
+            continue
+        for key in ('FontFile', 'FontFile2', 'FontFile3'):
+            kind, value = doc.xref_get_key(xref, key)
+            if kind == 'xref':
+                fonts.append((doc.xref_get_key(xref, 'FontName')[1], len(doc.xref_stream(int(value.split()[0])))))
+    return fonts
+
+
+def test_optimize_removes_duplicates_and_unused_glyphs():
+    """optimize sloučí shodné obrázky a fonty obou stran a zmenší font na použité glyfy"""
+    pytest.importorskip('fontTools')
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        # Obě strany mají stejné logo a stejný vložený font - ve dvojstraně jsou to zdvojené objekty
+        logo = io.BytesIO()
+        Image.effect_noise((64, 64), 50).convert('RGB').save(logo, format='PNG')
+        for number in ('02', '03'):
+            doc = fitz.open()
+            page = doc.new_page(width=200, height=300)
+            page.insert_font(fontname='F0', fontbuffer=fitz.Font('helv').buffer)
+            page.insert_text((20, 50), f"Strana {number}", fontname='F0', fontsize=12)
+            page.insert_image(fitz.Rect(20, 100, 120, 200), stream=logo.getvalue())
+            doc.save(str(tmp / f'strana_{number}.pdf'))
+            doc.close()
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        results = {}
+        for optimize in (False, True):
+            output = tmp / f'optimize_{optimize}.pdf'
+            # Profil 'fast' sám duplicity neslučuje (garbage=1) - rozdíl je jen z optimize
+            assert merger.create_side_by_side_pdf_with_rotation(tmp / 'strana_02.pdf', tmp / 'strana_03.pdf', output,
+                                                                save_profile='fast', optimize=optimize)
+            with fitz.open(str(output)) as doc:
+                images = [xref for xref in range(1, doc.xref_length())
+                          if doc.xref_get_key(xref, 'Subtype')[1] == '/Image']
+                results[optimize] = (images, _embedded_fonts(doc), doc[0].get_text())
+
+        images, fonts, text = results[False]
+        assert len(images) == 2 and len(fonts) == 2
+
+        optimized_images, optimized_fonts, optimized_text = results[True]
+        # Shodné logo je jen jednou
+        assert len(optimized_images) == 1
+        # Font je jednou, dál vložený (PDF/X-1a), ale jako subset s prefixem ABCDEF+ a menší
+        assert len(optimized_fonts) == 1
+        name, size = optimized_fonts[0]
+        assert re.match(r'^/[A-Z]{6}\+', name)
+        assert size < fonts[0][1]
+        # Text zůstává beze změny
+        assert optimized_text == text and "Strana 02" in text and "Strana 03" in text
+
+
+def _image_dpi(doc) -> dict:
+    """Efektivní DPI a rozměry v pixelech každého obrázku ve výstupu (podle xref)"""
+    images = {}
+    for page in doc:
+        for info in page.get_image_info(xrefs=True):
+            a, b, c, d, _, _ = info['transform']
+            dpi = min(info['width'] / (math.hypot(a, b) / 72), info['height'] / (math.hypot(c, d) / 72))
+            images[info['xref']] = (round(dpi), info['width'], info['height'],
+                                    doc.xref_get_key(info['xref'], 'Filter')[1])
+    return images
+
+
+def test_image_downsampling_lowers_effective_dpi():
+    """image_dpi převzorkuje obrázky nad cílovým rozlišením (JPEG i bezeztrátové), menší nechá být"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        photo, scan, logo = io.BytesIO(), io.BytesIO(), io.BytesIO()
+        Image.effect_noise((1200, 1200), 50).convert('RGB').save(photo, format='JPEG', quality=90)
+        Image.effect_noise((1200, 1200), 50).convert('L').save(scan, format='PNG')
+        Image.effect_noise((100, 100), 50).convert('RGB').save(logo, format='PNG')
+        # Obrázky 100 x 100 pt (1,39 palce): 1200 px = 864 DPI, 100 px = 72 DPI
+        doc = fitz.open()
+        page = doc.new_page(width=200, height=300)
+        page.insert_image(fitz.Rect(0, 0, 100, 100), stream=photo.getvalue())
+        page.insert_image(fitz.Rect(100, 0, 200, 100), stream=logo.getvalue())
+        doc.save(str(tmp / 'strana_02.pdf'))
+        doc.close()
+        doc = fitz.open()
+        doc.new_page(width=200, height=300).insert_image(fitz.Rect(0, 0, 100, 100), stream=scan.getvalue())
+        doc.save(str(tmp / 'strana_03.pdf'))
+        doc.close()
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        stats = {}
+        output = tmp / 'dvojstrana.pdf'
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'strana_02.pdf', tmp / 'strana_03.pdf', output,
+                                                            image_dpi=150, stats=stats)
+        with fitz.open(str(output)) as doc:
+            images = sorted(_image_dpi(doc).values())
+
+        # Fotka a sken na 150 DPI (208 px), fotka zůstává JPEG; logo pod cílem beze změny
+        assert images == [(72, 100, 100, '/FlateDecode'),
+                          (150, 208, 208, '/DCTDecode'),
+                          (150, 208, 208, '/FlateDecode')]
+        assert stats['images']['images'] == 2
+        assert stats['images']['bytes_after'] < stats['images']['bytes_before']
+        assert output.stat().st_size < (tmp / 'strana_02.pdf').stat().st_size
+
+
+@pytest.mark.skipif(not _linearization_tools(), reason="linearizace vyžaduje pikepdf nebo qpdf")
+def test_linearized_output():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'left.pdf', "Strana 2")
+        write_page(tmp / 'right.pdf', "Strana 3")
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'left.pdf', tmp / 'right.pdf',
+                                                            tmp / 'linear.pdf', linearize=True)
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'left.pdf', tmp / 'right.pdf',
+                                                            tmp / 'plain.pdf')
+
+        # Linearizační slovník je první objekt souboru
+        first_object = re.search(rb'\d+ 0 obj\s*(<<.*?>>)', (tmp / 'linear.pdf').read_bytes()[:2048], re.S)
+        assert first_object and b'/Linearized' in first_object.group(1)
+        assert b'/Linearized' not in (tmp / 'plain.pdf').read_bytes()[:2048]
+
+        with fitz.open(str(tmp / 'linear.pdf')) as doc:
+            assert doc.is_fast_webaccess
+            # PDF/X OutputIntent a Info z merge linearizace zachová
+            assert doc.xref_get_key(doc.pdf_catalog(), 'OutputIntents')[0] == 'array'
+            info = doc.xref_get_key(-1, 'Info')[1].split()[0]
+            assert doc.xref_get_key(int(info), 'GTS_PDFXVersion')[1] == 'PDF/X-1a:2001'
+
+
+def test_mutation_variants_stamped():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'left.pdf', "Strana 2")
+        write_page(tmp / 'right.pdf', "Strana 3")
+        outputs = {'PXB': tmp / 'pxb.pdf', 'PXE': tmp / 'pxe.pdf'}
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        results = merger.create_mutation_variants(tmp / 'left.pdf', tmp / 'right.pdf', outputs,
+                                                  mutation_overlay=True)
+        assert results == {'PXB': True, 'PXE': True}
+
+        for mutation, path in outputs.items():
+            other = 'PXE' if mutation == 'PXB' else 'PXB'
+            with fitz.open(str(path)) as doc:
+                text = doc[0].get_text()
+                assert mutation in text and other not in text
+                assert "Strana 2" in text and "Strana 3" in text
+                assert doc[0].rotation == 270
+                assert doc.xref_get_key(doc.pdf_catalog(), 'OutputIntents')[0] == 'array'
+
+
+def test_splice_with_indirect_boxes():
+    """Nepřímý MediaBox a CropBox zdrojové stránky neshodí skládání splice"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'right.pdf', "Strana 3")
+        doc = fitz.open()
+        page = doc.new_page(width=200, height=300)
+        page.insert_text((20, 50), "Strana 2", fontsize=12)
+        for key, box in (('MediaBox', '[0 0 200 300]'), ('CropBox', '[0 0 200 280]')):
+            xref = doc.get_new_xref()
+            doc.update_object(xref, box)
+            doc.xref_set_key(page.xref, key, f'{xref} 0 R')
+        doc.save(str(tmp / 'left.pdf'))
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'left.pdf', tmp / 'right.pdf',
+                                                            tmp / 'spread.pdf', rotation=0, backend='splice')
+        with fitz.open(str(tmp / 'spread.pdf')) as spread:
+            assert spread[0].rect.width == 400 and spread[0].rect.height == 300
+            text = spread[0].get_text()
+            assert "Strana 2" in text and "Strana 3" in text
+
+
+def test_deterministic_id_follows_composition():
+    """Stejné vstupy a volby = stejné bajty; jiná strana zdroje nebo backend = jiné /ID"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        edition = fitz.open()
+        for number in range(1, 5):
+            edition.new_page(width=200, height=300).insert_text((20, 50), f"Strana {number}", fontsize=12)
+        edition.save(str(tmp / 'vydani.pdf'))
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+
+        def export(folder: str, **options) -> tuple:
+            output = tmp / folder / '28PXB011.x.pdf'
+            output.parent.mkdir(exist_ok=True)
+            assert merger.create_side_by_side_pdf_with_rotation(tmp / 'vydani.pdf', tmp / 'vydani.pdf', output,
+                                                                deterministic=True, **options)
+            with fitz.open(str(output)) as doc:
+                return output.read_bytes(), doc.xref_get_key(-1, 'ID')[1]
+
+        # Soubor vydání se hashuje jen jednou, ne pro každou dvojstranu
+        hashed = []
+        file_digest = hashing.file_digest
+        hashing.file_digest = lambda *paths: hashed.append(paths) or file_digest(*paths)
+        try:
+            first, first_id = export('a', left_index=0, right_index=1)
+            again, _ = export('b', left_index=0, right_index=1)
+            _, other_pages_id = export('c', left_index=2, right_index=3)
+            _, splice_id = export('d', left_index=0, right_index=1, backend='splice')
+        finally:
+            hashing.file_digest = file_digest
+        assert first == again
+        assert len({first_id, other_pages_id, splice_id}) == 3
+        assert len(hashed) == 1
+
+
+if __name__ == "__main__":
+    test_save_profiles()
+    test_optimize_removes_duplicates_and_unused_glyphs()
+    test_image_downsampling_lowers_effective_dpi()
+    test_linearized_output()
+    test_mutation_variants_stamped()
+    test_splice_with_indirect_boxes()
+    test_deterministic_id_follows_composition()
+    print("✅ Test voleb výstupu prošel")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test cache normalizovaných stran - poškozený vstup se opraví jen jednou
+"""
+
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from page_cache import PageCache
+
+
+def _damaged_pdf(path: Path):
+    """Strana s rozbitým odkazem na xref tabulku (MuPDF ji musí přestavět)"""
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=300)
+    page.insert_text((20, 50), "Inzerce", fontsize=12)
+    data = doc.tobytes()
+    offset = data.rfind(b'startxref')
+    path.write_bytes(data[:offset] + b'startxref\n999999\n%%EOF\n')
+
+
+def test_damaged_page_is_normalized_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = tmp / 'PR25103001VY1.pdf'
+        _damaged_pdf(source)
+        with fitz.open(str(source)) as doc:
+            assert doc.is_repaired
+
+        cache = PageCache(tmp / 'cache')
+        cached = cache.normalized(source)
+        assert cached.parent == tmp / 'cache'
+        assert cache.stats() == {'hits': 0, 'misses': 1}
+
+        with fitz.open(str(cached)) as doc:
+            assert not doc.is_repaired
+            assert 'Inzerce' in doc[0].get_text()
+
+        # Stejný obsah pod jiným jménem (opakovaná inzerce) - zásah v cache
+        copy = tmp / 'PR25103105VY1.pdf'
+        copy.write_bytes(source.read_bytes())
+        assert cache.normalized(copy) == cached
+        assert cache.normalized(source) == cached
+        assert cache.stats() == {'hits': 2, 'misses': 1}
+
+
+if __name__ == "__main__":
+    test_damaged_page_is_normalized_once()
+    print("✅ Test cache normalizovaných stran prošel")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test zdrojů stran - vícestránková PDF vydání a sekcí přes mapu čísel stran
+"""
+
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from indesign_like_pdf_merger import InDesignLikePDFMerger
+from page_sources import PageMap, DocumentPool, parse_sections, split_page_ref
+from pairing_logic import auto_pair_files
+
+
+def _page_number(filename: str) -> int:
+    # PR251030XXBBB.pdf -> XX
+    return int(filename[-9:-7])
+
+
+def test_sections_map_pages():
+    """Sekce 1-16 + 17-32 a jednostránková regionální strana"""
+    page_map = PageMap(_page_number, parse_sections({'sekce_A.pdf': 1, 'sekce_B.pdf': '17'}))
+    assert page_map.add_source('sekce_A.pdf', 16) == list(range(1, 17))
+    assert page_map.add_source('sekce_B.pdf', 16) == list(range(17, 33))
+    page_map.add_source('PR25103003VY2.pdf', 1)
+
+    assert page_map.pages[3] == 'PR25103003VY2.pdf'
+    assert page_map.pages[20] == 'sekce_B.pdf#page=4'
+    assert split_page_ref(page_map.pages[20]) == ('sekce_B.pdf', 3)
+    assert page_map.page_number('sekce_B.pdf#page=4') == 20
+
+    pairs = auto_pair_files(page_map.page_files(), 32)
+    assert len(pairs) == 16
+    assert {'left_file': 'sekce_B.pdf#page=16', 'right_file': 'sekce_A.pdf#page=1',
+            'left_page': 32, 'right_page': 1} in pairs
+
+
+def test_spread_from_multipage_source():
+    """Dvojstrana ze stran 2 a 3 jednoho PDF - zdroj se otevře jednou a zůstane v poolu"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        edition = tmp / 'PR251030VY1.pdf'
+        doc = fitz.open()
+        for number in range(1, 5):
+            page = doc.new_page(width=200, height=300)
+            page.insert_text((20, 50), f"Strana {number}", fontsize=12)
+        doc.save(str(edition))
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        with DocumentPool() as documents:
+            for backend in ('xobject', 'splice'):
+                spread = merger.compose_spread(edition, edition, backend=backend,
+                                               left_index=1, right_index=2, documents=documents)
+                text = spread[0].get_text()
+                assert spread[0].rect.width == 400
+                assert 'Strana 2' in text and 'Strana 3' in text and 'Strana 1' not in text
+                spread.close()
+            assert len(documents._documents) == 1
+
+
+if __name__ == "__main__":
+    test_sections_map_pages()
+    test_spread_from_multipage_source()
+    print("✅ Test zdrojů stran prošel")
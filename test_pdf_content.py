@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test parseru content streamů - přejmenování zdrojů a odstranění zbytečných operátorů
+"""
+
+from pdf_content import parse_content, serialize_content, rename_resources, count_operators
+from pdf_postprocess import remove_noop_operators
+
+
+CONTENT = (b"q 1 0 0 1 0 0 cm BT /F1 12 Tf (Text (v z\\)vorce)) Tj ET Q\n"
+           b"/GS0 gs [1 2] 0 d BI /W 1 /H 1 /CS /CS0 /BPC 8 ID \x00EI EI\n"
+           b"q q 0 0 10 10 re W n q Q /Im0 Do Q Q")
+
+
+def test_parse_and_rename():
+    """Řetězce, pole i inline obrázek jsou jeden operand, jména zdrojů se přejmenují"""
+    operations = parse_content(CONTENT)
+    counts = count_operators(operations)
+    assert counts['Tj'] == 1
+    assert counts['BI'] == 1
+    assert counts['d'] == 1
+
+    renamed = rename_resources(operations, {'Font': {'F1': 'F1L'}, 'XObject': {'Im0': 'Im0L'},
+                                            'ColorSpace': {'CS0': 'CS0L'}})
+    data = serialize_content(renamed)
+    assert b'/F1L 12 Tf' in data
+    assert b'/Im0L Do' in data
+    assert b'/CS /CS0L' in data
+    assert b'(Text (v z\\)vorce))' in data
+    assert parse_content(data) == renamed
+
+
+def test_remove_noop_operators():
+    """Jednotková matice, prázdné q Q a zdvojené q q ... Q Q zmizí, obsah zůstane"""
+    operations, removed = remove_noop_operators(parse_content(CONTENT))
+    data = serialize_content(operations)
+    assert b'cm' not in data
+    assert removed == 5
+    assert data.count(b'q') == data.count(b'Q') == 2
+    assert b'/Im0 Do' in data
+
+
+def test_repeated_clip_uses_whole_path():
+    """Ořez jedním obdélníkem po ořezu dvěma obdélníky není opakování, stejný ořez znovu ano"""
+    content = (b"q 0 0 10 10 re 20 20 5 5 re W n q 20 20 5 5 re W n /Im0 Do Q Q\n"
+               b"q 0 0 10 10 re 20 20 5 5 re W n q 0 0 10 10 re 20 20 5 5 re W n /Im0 Do Q Q")
+    operations, removed = remove_noop_operators(parse_content(content))
+    data = serialize_content(operations)
+    assert removed == 4
+    assert data.count(b'20 20 5 5 re') == 3
+    assert count_operators(operations)['W'] == 3
+
+
+if __name__ == "__main__":
+    test_parse_and_rename()
+    test_remove_noop_operators()
+    test_repeated_clip_uses_whole_path()
+    print("✅ Test content streamů prošel")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test preflightu PDF/X-1a - výstup merge z CMYK stran projde, RGB barva ne
+(a projde až po převodu do CMYK)
+"""
+
+import binascii
+import io
+import tempfile
+import zlib
+from pathlib import Path
+
+import fitz
+from PIL import Image
+
+from conftest import write_page
+from indesign_like_pdf_merger import InDesignLikePDFMerger
+from page_sources import DocumentPool
+from preflight import preflight_file, preflight_files
+
+
+def test_preflight_spread():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'cmyk.pdf', color=(0, 0, 0, 1), embed_font=True)
+        write_page(tmp / 'rgb.pdf', color=(1, 0, 0), embed_font=True)
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'cmyk.pdf', tmp / 'cmyk.pdf', tmp / 'ok.pdf')
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'cmyk.pdf', tmp / 'rgb.pdf', tmp / 'bad.pdf')
+
+        ok, bad = preflight_files([tmp / 'ok.pdf', tmp / 'bad.pdf'], workers=1)
+        assert ok['passed'], ok['errors']
+        assert not bad['passed']
+        assert any('DeviceRGB' in error for error in bad['errors'])
+        # Samostatné procesy workerů vrací stejné zprávy ve stejném pořadí
+        assert preflight_files([tmp / 'ok.pdf', tmp / 'bad.pdf', tmp / 'cmyk.pdf'], workers=2)[:2] == [ok, bad]
+
+        # Nezpracovaná strana nemá PDF/X metadata ani TrimBox
+        raw = preflight_file(tmp / 'cmyk.pdf')
+        assert 'Chybí OutputIntent /GTS_PDFX' in raw['errors']
+        assert 'Strana 1: chybí TrimBox (ani ArtBox)' in raw['errors']
+
+
+def test_cmyk_conversion_passes():
+    """RGB text, obrázek a barva přes cs/scn - po převodu do CMYK bez chyb barev"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'rgb.pdf', color=(1, 0, 0), embed_font=True)
+        doc = fitz.open(str(tmp / 'rgb.pdf'))
+        page = doc[0]
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), (0, 120, 200)).save(buffer, format='JPEG')
+        page.insert_image(fitz.Rect(20, 100, 120, 200), stream=buffer.getvalue())
+        contents = page.get_contents()[0]
+        doc.update_stream(contents, doc.xref_stream(contents) +
+                          b'\nq /DeviceRGB cs 0 0.5 0 scn 20 220 50 20 re f Q 0.5 0.5 0.5 RG 20 250 m 150 250 l S\n')
+        doc.saveIncr()
+        doc.close()
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        stats = {}
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'rgb.pdf', tmp / 'rgb.pdf', tmp / 'out.pdf',
+                                                            backend='splice', cmyk=True, stats=stats)
+        # Obě strany: text (rg + RG), scn, šedá čára a obrázek
+        assert stats['cmyk'] == {'colors': 8, 'images': 2, 'skipped': 0}, stats
+
+        report = preflight_file(tmp / 'out.pdf')
+        assert report['passed'], report['errors']
+
+
+def test_cmyk_conversion_shared_resources():
+    """Dvě strany jednoho zdroje se sdíleným slovníkem zdrojů (/CS0 /DeviceRGB) - převedou se obě"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        doc = fitz.open()
+        resources = doc.get_new_xref()
+        doc.update_object(resources, '<< /ColorSpace << /CS0 /DeviceRGB >> >>')
+        for index in range(2):
+            page = doc.new_page(width=200, height=300)
+            doc.xref_set_key(page.xref, 'Resources', f'{resources} 0 R')
+            contents = doc.get_new_xref()
+            doc.update_object(contents, '<<>>')
+            doc.update_stream(contents, f'/CS0 cs {1 - index} {index} 0 scn 20 20 160 260 re f'.encode())
+            doc.xref_set_key(page.xref, 'Contents', f'{contents} 0 R')
+        doc.save(str(tmp / 'section.pdf'))
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        stats = {}
+        with DocumentPool() as documents:
+            assert merger.create_side_by_side_pdf_with_rotation(
+                tmp / 'section.pdf', tmp / 'section.pdf', tmp / 'out.pdf', backend='xobject', cmyk=True,
+                stats=stats, left_index=0, right_index=1, documents=documents)
+        assert stats['cmyk']['colors'] == 2, stats
+
+        out = fitz.open(str(tmp / 'out.pdf'))
+        fitz.TOOLS.reset_mupdf_warnings()
+        pix = out[0].get_pixmap(dpi=20, colorspace=fitz.csRGB)
+        assert 'CS0' not in fitz.TOOLS.mupdf_warnings()
+        # Obě poloviny zůstaly barevné (zelená i červená), žádná nespadla do černé
+        halves = [pix.pixel(pix.width // 2, pix.height // 4), pix.pixel(pix.width // 2, 3 * pix.height // 4)]
+        assert sorted(max(range(3), key=color.__getitem__) for color in halves) == [0, 1], halves
+
+
+def _inline_images_page(path: Path, convertible: bool) -> None:
+    """Strana s RGB inline obrázky - surovými, v AHx+Fl a pojmenovaným prostorem; volitelně i 4bitovým"""
+    red = bytes((220, 30, 30)) * 4
+    images = [
+        b'BI /W 2 /H 2 /BPC 8 /CS /RGB ID ' + red + b' EI',
+        b'BI /W 2 /H 2 /BPC 8 /CS /Foto /F [/AHx /Fl] ID ' + binascii.hexlify(zlib.compress(red)) + b'> EI',
+    ]
+    if not convertible:
+        # 4 bity na složku převádět neumíme
+        images.append(b'BI /W 2 /H 2 /BPC 4 /CS /DeviceRGB ID \xd1\x1d\x11\xd1\x1d\x11 EI')
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=300)
+    doc.xref_set_key(page.xref, 'Resources', '<< /ColorSpace << /Foto /DeviceRGB >> >>')
+    contents = doc.get_new_xref()
+    doc.update_object(contents, '<<>>')
+    doc.update_stream(contents, b'\n'.join(b'q 50 0 0 50 %d 20 cm %s Q' % (20 + 60 * index, image)
+                                           for index, image in enumerate(images)))
+    doc.xref_set_key(page.xref, 'Contents', f'{contents} 0 R')
+    doc.save(str(path))
+    doc.close()
+
+
+def test_cmyk_conversion_inline_images():
+    """RGB inline obrázky (BI ... EI) se převedou; ty, co převést nejde, jsou ve statistice i v preflightu"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_page(tmp / 'cmyk.pdf', color=(0, 0, 0, 1), embed_font=True)
+        _inline_images_page(tmp / 'inline.pdf', convertible=True)
+        _inline_images_page(tmp / 'bpc4.pdf', convertible=False)
+
+        merger = InDesignLikePDFMerger(files_dir=str(tmp))
+        stats = {}
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'inline.pdf', tmp / 'cmyk.pdf', tmp / 'ok.pdf',
+                                                            cmyk=True, stats=stats)
+        assert stats['cmyk'] == {'colors': 0, 'images': 2, 'skipped': 0}, stats
+        report = preflight_file(tmp / 'ok.pdf')
+        assert report['passed'], report['errors']
+
+        # Obrázky zůstaly červené (převod přes ICC, ne do černé)
+        out = fitz.open(str(tmp / 'ok.pdf'))
+        pix = out[0].get_pixmap(dpi=72, colorspace=fitz.csRGB)
+        for image in out[0].get_image_info():
+            box = fitz.Rect(image['bbox']) * out[0].rotation_matrix
+            r, g, b = pix.pixel(int((box.x0 + box.x1) / 2), int((box.y0 + box.y1) / 2))
+            assert r > 150 and g < 120 and b < 120, (r, g, b)
+        out.close()
+
+        stats = {}
+        assert merger.create_side_by_side_pdf_with_rotation(tmp / 'bpc4.pdf', tmp / 'cmyk.pdf', tmp / 'bad.pdf',
+                                                            cmyk=True, stats=stats)
+        assert stats['cmyk'] == {'colors': 0, 'images': 2, 'skipped': 1}, stats
+        report = preflight_file(tmp / 'bad.pdf')
+        assert any('inline obrázek v RGB' in error for error in report['errors']), report['errors']
+
+
+if __name__ == "__main__":
+    test_preflight_spread()
+    test_cmyk_conversion_passes()
+    test_cmyk_conversion_shared_resources()
+    test_cmyk_conversion_inline_images()
+    print("✅ Test preflightu prošel")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test úklidového procesu (janitor) - TTL souborů, odložené mazání a úlohy
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from retention import RetentionJanitor
+
+
+def test_ttl_and_scheduled_delete():
+    """Prošlé soubory a naplánovaná mazání se smažou v jednom úklidu"""
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        old_file = folder / "old.pdf"
+        new_file = folder / "new.pdf"
+        scheduled = folder / "scheduled.zip"
+        for path in (old_file, new_file, scheduled):
+            path.write_bytes(b"x" * 1024)
+
+        # Soubor starý 2 hodiny
+        two_hours_ago = time.time() - 2 * 3600
+        os.utime(old_file, (two_hours_ago, two_hours_ago))
+
+        janitor = RetentionJanitor(rules=[(folder, '*.pdf', 3600)])
+        janitor.schedule_delete(scheduled, delay=0)
+        stats = janitor.sweep()
+
+        assert not old_file.exists()
+        assert not scheduled.exists()
+        assert new_file.exists()
+        assert stats['deleted_files'] == 2
+        assert stats['reclaimed_bytes'] == 2048
+
+
+def test_task_expiry():
+    """Dokončené úlohy po TTL zmizí, běžící zůstávají"""
+    now = time.time()
+    tasks = {
+        'task_1': {'status': 'completed', 'start_time': now - 100, 'end_time': now - 90},
+        'task_2': {'status': 'processing', 'start_time': now - 100},
+        'task_3': {'status': 'completed', 'start_time': now - 5, 'end_time': now - 1},
+    }
+    janitor = RetentionJanitor(rules=[], tasks=tasks, task_ttl=60)
+    stats = janitor.sweep()
+
+    assert stats['deleted_tasks'] == 1
+    assert sorted(tasks) == ['task_2', 'task_3']
+
+
+if __name__ == "__main__":
+    test_ttl_and_scheduled_delete()
+    test_task_expiry()
+    print("✅ Testy janitoru prošly")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test atomického publikování výstupů - ve výstupní složce se nikdy neobjeví rozepsaný soubor
+"""
+
+import errno
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from staging import ScratchJob, publish_file
+
+
+def test_scratch_output_appears_only_when_published():
+    """Rozepsaný soubor leží jen ve scratch složce, výstup se objeví až hotový"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / 'output'
+        output.mkdir()
+        with ScratchJob(root=Path(tmp)) as scratch:
+            staged = scratch.stage('28PXB011.x.pdf')
+            staged.write_bytes(b'%PDF-1.7 rozepsano')
+            assert not list(output.iterdir())
+            staged.write_bytes(b'%PDF-1.7 hotovo')
+            final = scratch.publish('28PXB011.x.pdf', output / '28PXB011.x.pdf')
+            assert [path.name for path in output.iterdir()] == ['28PXB011.x.pdf']
+            assert final.read_bytes() == b'%PDF-1.7 hotovo'
+        assert not scratch.path.exists()
+
+
+def test_cross_volume_publish_is_atomic():
+    """Scratch na jiném svazku (tmpfs): kopie jde do skrytého .part a cíl vznikne až přejmenováním"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        staged = tmp / 'scratch.pdf'
+        final = tmp / 'output' / '28PXB011.x.pdf'
+        final.parent.mkdir()
+        data = os.urandom(3 * 1024 * 1024)
+        staged.write_bytes(data)
+
+        replace, copyfileobj = os.replace, shutil.copyfileobj
+        seen_during_copy = []
+
+        def cross_volume_replace(src, dst):
+            # Přímé přejmenování ze scratch selže jako mezi dvěma svazky
+            if Path(src) == staged:
+                raise OSError(errno.EXDEV, 'Invalid cross-device link')
+            return replace(src, dst)
+
+        def watched_copy(src, dst, length=0):
+            seen_during_copy.append(sorted(path.name for path in final.parent.iterdir()))
+            return copyfileobj(src, dst, length)
+
+        os.replace, shutil.copyfileobj = cross_volume_replace, watched_copy
+        try:
+            assert publish_file(staged, final) == final
+        finally:
+            os.replace, shutil.copyfileobj = replace, copyfileobj
+
+        # Během kopie byl ve výstupní složce jen skrytý .part, nikdy rozepsaný cíl
+        assert seen_during_copy == [['.28PXB011.x.pdf.part']]
+        assert final.read_bytes() == data
+        assert sorted(path.name for path in final.parent.iterdir()) == ['28PXB011.x.pdf']
+        assert not staged.exists()
+
+
+def test_failed_copy_leaves_no_partial_file():
+    """Selhání kopie (plný disk) nenechá ve výstupní složce nic"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        staged = tmp / 'scratch.pdf'
+        final = tmp / 'output' / '28PXB011.x.pdf'
+        final.parent.mkdir()
+        staged.write_bytes(b'%PDF-1.7')
+
+        replace, copyfileobj = os.replace, shutil.copyfileobj
+
+        def cross_volume_replace(src, dst):
+            if Path(src) == staged:
+                raise OSError(errno.EXDEV, 'Invalid cross-device link')
+            return replace(src, dst)
+
+        def failing_copy(src, dst, length=0):
+            dst.write(b'%PDF')
+            raise OSError(errno.ENOSPC, 'No space left on device')
+
+        os.replace, shutil.copyfileobj = cross_volume_replace, failing_copy
+        try:
+            publish_file(staged, final)
+            assert False, "chyba kopie se neohlásila"
+        except OSError as e:
+            assert e.errno == errno.ENOSPC
+        finally:
+            os.replace, shutil.copyfileobj = replace, copyfileobj
+
+        assert not list(final.parent.iterdir())
+        assert staged.exists()
+
+
+if __name__ == "__main__":
+    test_scratch_output_appears_only_when_published()
+    test_cross_volume_publish_is_atomic()
+    test_failed_copy_leaves_no_partial_file()
+    print("✅ Test atomického publikování prošel")
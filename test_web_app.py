@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test webové aplikace přes Flask klienta - stahování přes proxy, bezstavový export,
+export úlohou, archiv vydání a pozdní výměna strany
+(každý test běží v dočasné pracovní složce s vlastními uploads/ a output/)
+"""
+
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import fitz
+
+# Merge ve vlákně - workery by běžely v jiné pracovní složce než test
+os.environ.setdefault('MERGE_WORKERS', '0')
+
+import web_app
+from conftest import write_page
+
+
+@contextmanager
+def _workspace():
+    """Dočasná pracovní složka aplikace a Flask klient"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for folder in (web_app.UPLOAD_FOLDER, web_app.OUTPUT_FOLDER):
+                folder.mkdir()
+            yield Path(tmp), web_app.app.test_client()
+        finally:
+            os.chdir(cwd)
+
+
+def _wait(client, task_id: str) -> dict:
+    for _ in range(300):
+        task = client.get(f'/api/task/{task_id}').json['task']
+        if task['status'] != 'processing':
+            return task
+        time.sleep(0.1)
+    raise AssertionError(f"Úloha {task_id} nedoběhla")
+
+
+def _text(path: Path) -> str:
+    with fitz.open(str(path)) as doc:
+        return ''.join(page.get_text() for page in doc)
+
+
+def test_proxy_download_headers():
+    """V režimu proxy odpověď nese jen hlavičku X-Accel-Redirect / X-Sendfile, tělo posílá proxy"""
+    with _workspace() as (tmp, client):
+        output = tmp / web_app.OUTPUT_FOLDER
+        write_page(output / '28PXB011.x.pdf', "Strana 1")
+        sendfile_mode, use_x_sendfile = web_app.SENDFILE_MODE, web_app.app.config['USE_X_SENDFILE']
+        try:
+            web_app.SENDFILE_MODE = 'x-accel'
+            response = client.get('/api/download/28PXB011.x.pdf')
+            assert response.headers['X-Accel-Redirect'] == web_app.X_ACCEL_PREFIX.rstrip('/') + '/28PXB011.x.pdf'
+            assert response.headers['Content-Disposition'] == 'attachment; filename="28PXB011.x.pdf"'
+            assert response.data == b''
+            response = client.get('/api/download/28PXB011.x.pdf?inline=true')
+            assert response.headers['Content-Disposition'] == 'inline; filename="28PXB011.x.pdf"'
+
+            # ZIP pro proxy leží na disku pod vlastním názvem pro každý request
+            redirects = set()
+            for _ in range(2):
+                response = client.post('/api/download-all', json={'filenames': ['28PXB011.x.pdf']})
+                assert response.headers['Content-Disposition'].startswith('attachment; filename="pary_')
+                redirects.add(response.headers['X-Accel-Redirect'])
+            assert len(redirects) == 2
+            for redirect in redirects:
+                with zipfile.ZipFile(output / redirect.rsplit('/', 1)[1]) as archive:
+                    assert archive.namelist() == ['28PXB011.x.pdf']
+
+            web_app.SENDFILE_MODE = 'x-sendfile'
+            web_app.app.config['USE_X_SENDFILE'] = True
+            response = client.get('/api/download/28PXB011.x.pdf')
+            assert response.headers['X-Sendfile'] == str((output / '28PXB011.x.pdf').resolve())
+            assert response.data == b''
+        finally:
+            web_app.SENDFILE_MODE = sendfile_mode
+            web_app.app.config['USE_X_SENDFILE'] = use_x_sendfile
+
+
+def test_stateless_export_streams_zip():
+    """/api/export průběžně streamuje ZIP - sekce jako vícestránkové PDF, regionální strana z manifestu"""
+    with _workspace() as (tmp, client):
+        section = fitz.open()
+        for number in (1, 2):
+            section.new_page(width=200, height=300).insert_text((20, 50), f"Sekce strana {number}", fontsize=12)
+        section.save(str(tmp / 'sekce_A.pdf'))
+        write_page(tmp / 'PR25103031VY1.pdf', "Strana 31")
+        write_page(tmp / 'PR25103032VY1.pdf', "Strana 32")
+        write_page(tmp / 'PR25103001VY2.pdf', "Strana 1 region")
+        work_dirs = set(Path(tempfile.gettempdir()).glob('export_*'))
+
+        names = ('sekce_A.pdf', 'PR25103031VY1.pdf', 'PR25103032VY1.pdf', 'PR25103001VY2.pdf')
+        response = client.post('/api/export', content_type='multipart/form-data', data={
+            'files': [(open(tmp / name, 'rb'), name) for name in names],
+            'day': '28', 'mutations': 'PXB,PXE', 'page_count': '32',
+            'sections': json.dumps({'sekce_A.pdf': 1}),
+            'manifest': json.dumps({'PXE': {'1': 'PR25103001VY2.pdf'}})
+        })
+        assert response.status_code == 200 and response.is_streamed
+        assert response.headers['Content-Disposition'] == 'attachment; filename="vydani_28_1.zip"'
+
+        with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+            assert sorted(archive.namelist()) == ['28PXB011.x.pdf', '28PXB021.x.pdf',
+                                                  '28PXE011.x.pdf', '28PXE021.x.pdf']
+            texts = {name: fitz.open('pdf', archive.read(name))[0].get_text() for name in archive.namelist()}
+        # Dvojstrana 32-1: základ ze sekce, PXE s regionální stranou; 2-31 je společná
+        assert "Sekce strana 1" in texts['28PXB011.x.pdf'] and "region" not in texts['28PXB011.x.pdf']
+        assert "Strana 1 region" in texts['28PXE011.x.pdf']
+        assert "Sekce strana 2" in texts['28PXE021.x.pdf'] and "Strana 31" in texts['28PXE021.x.pdf']
+        # Bezstavový export po sobě nenechá pracovní složku ani výstupy aplikace
+        assert set(Path(tempfile.gettempdir()).glob('export_*')) == work_dirs
+        assert not list((tmp / web_app.OUTPUT_FOLDER).iterdir())
+
+
+def test_edition_archive_ready_when_job_finishes():
+    """Archiv vydání je po doběhnutí úlohy hotový v output/ a obsahuje všechny výstupy"""
+    with _workspace() as (tmp, client):
+        uploads = tmp / web_app.UPLOAD_FOLDER
+        for page in (1, 2, 31, 32):
+            write_page(uploads / f'PR251030{page:02d}VY1.pdf', f"Strana {page}")
+
+        response = client.post('/api/merge', json={
+            'pairs': [{'left_file': 'PR25103032VY1.pdf', 'right_file': 'PR25103001VY1.pdf'},
+                      {'left_file': 'PR25103002VY1.pdf', 'right_file': 'PR25103031VY1.pdf'}],
+            'day': '28', 'mutations': ['PXB', 'PXE']
+        })
+        task = _wait(client, response.json['task_id'])
+        assert task['status'] == 'completed'
+
+        output = tmp / web_app.OUTPUT_FOLDER
+        filenames = sorted(result['filename'] for result in task['results']['success'])
+        assert len(filenames) == 4
+        with zipfile.ZipFile(output / task['results']['archive']) as archive:
+            assert archive.testzip() is None
+            assert sorted(archive.namelist()) == filenames
+            for name in filenames:
+                assert archive.read(name) == (output / name).read_bytes()
+        assert not list(output.glob('.*.part'))
+
+
+def test_reexport_keeps_manifest_pages():
+    """Nová verze strany základního vydání nepřepíše regionální stranu mutace z manifestu"""
+    with _workspace() as (tmp, client):
+        uploads = tmp / web_app.UPLOAD_FOLDER
+        write_page(uploads / 'PR25103030VY1.pdf', "Strana 30")
+        write_page(uploads / 'PR25103003VY1.pdf', "Strana 3 zaklad")
+        write_page(uploads / 'PR25103003VY2.pdf', "Strana 3 region")
+
+        response = client.post('/api/merge', json={
+            'pairs': [{'left_file': 'PR25103030VY1.pdf', 'right_file': 'PR25103003VY1.pdf'}],
+            'day': '28', 'mutations': ['PXB', 'PXE'], 'manifest': {'PXE': {'3': 'PR25103003VY2.pdf'}}
+        })
+        task_id = response.json['task_id']
+        task = _wait(client, task_id)
+        assert task['status'] == 'completed'
+        outputs = {output['mutation']: tmp / web_app.OUTPUT_FOLDER / output['filename']
+                   for output in task['results']['success']}
+        assert "region" in _text(outputs['PXE']) and "zaklad" in _text(outputs['PXB'])
+
+        # Nová verze strany základního vydání - jen mutace bez regionální strany
+        write_page(uploads / 'PR25103003VY1.pdf', "Strana 3 opravena")
+        response = client.post('/api/reexport', json={'task_id': task_id, 'page_count': 32,
+                                                      'filename': 'PR25103003VY1.pdf'})
+        assert response.json['success'], response.json
+        files = response.json['report']['files']
+        assert [(f['mutation'], f['replaced_file']) for f in files] == [('PXB', 'PR25103003VY1.pdf')]
+        assert "opravena" in _text(outputs['PXB'])
+        assert "region" in _text(outputs['PXE'])
+
+        # Nová verze regionální strany (stejný název) - jen mutace, které ji mají z manifestu
+        write_page(uploads / 'PR25103003VY2.pdf', "Strana 3 region opravena")
+        response = client.post('/api/reexport', json={'task_id': task_id, 'page_count': 32,
+                                                      'filename': 'PR25103003VY2.pdf'})
+        assert response.json['success'], response.json
+        assert [f['mutation'] for f in response.json['report']['files']] == ['PXE']
+        assert "region opravena" in _text(outputs['PXE'])
+        assert "Strana 3 opravena" in _text(outputs['PXB'])
+
+
+if __name__ == "__main__":
+    test_proxy_download_headers()
+    test_stateless_export_streams_zip()
+    test_edition_archive_ready_when_job_finishes()
+    test_reexport_keeps_manifest_pages()
+    print("✅ Test webové aplikace prošel")
@@ -12,23 +12,43 @@ import json
 import logging
 import zipfile
 import io
+import mimetypes
 from pathlib import Path
+from urllib.parse import quote
 from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, Response
 from werkzeug.utils import secure_filename
 import threading
 import time
+import shutil
+import uuid
+import tempfile
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import Future, wait as wait_futures, FIRST_COMPLETED
 from datetime import datetime
 
 # Import naší PDF merger třídy a pairing logiky
 try:
-    from indesign_like_pdf_merger import InDesignLikePDFMerger
+    from indesign_like_pdf_merger import (InDesignLikePDFMerger, SAVE_PROFILES, DEFAULT_SAVE_PROFILE,
+                                      MERGE_BACKENDS, DEFAULT_MERGE_BACKEND, reproducible_timestamp)
     from pairing_logic import (
         get_pairing_key, 
         validate_pair, 
         auto_pair_files, 
         ensure_odd_on_right,
+        get_pair_for_page,
         PAIRING_KEYS
     )
+    from mutation_planner import parse_manifest, plan_spreads, plan_sheets
+    from retention import RetentionJanitor
+    from disk_quota import DiskQuota
+    from page_cache import PageCache
+    from page_sources import PageMap, DocumentPool, parse_sections, split_page_ref, pdf_page_count
+    from preflight import preflight_files, summarize as summarize_preflight
+    from staging import ScratchJob, COPY_BUFFER_SIZE, default_scratch_root
+    from ghostscript_pool import GhostscriptPool, GS_TIMEOUT
+    from merge_workers import (MergeWorkerPool, SharedSources, UNIT_TIMEOUT, DEFAULT_WORKERS, WORKERS_SUPPORTED,
+                               process_usage, process_rss, trim_store)
 except ImportError as e:
     print(f"Chyba: Nelze importovat moduly: {e}")
     sys.exit(1)
@@ -48,9 +68,91 @@ OUTPUT_FOLDER = Path('output')
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 OUTPUT_FOLDER.mkdir(exist_ok=True)
 
+# Předání přenosu souborů reverzní proxy (worker se hned uvolní pro merge)
+# SENDFILE_MODE: '' = soubory posílá Flask, 'x-accel' = nginx, 'x-sendfile' = Apache/lighttpd
+SENDFILE_MODE = os.environ.get('SENDFILE_MODE', '').strip().lower()
+# Interní location v nginx mapovaná na OUTPUT_FOLDER (např. location /protected-output/ { internal; alias ...; })
+X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '/protected-output/')
+app.config['USE_X_SENDFILE'] = SENDFILE_MODE == 'x-sendfile'
+
+# Retence souborů - TTL v minutách (0 = nemazat)
+RETENTION_UPLOAD_TTL = float(os.environ.get('RETENTION_UPLOAD_TTL_MIN', 24 * 60)) * 60
+RETENTION_OUTPUT_TTL = float(os.environ.get('RETENTION_OUTPUT_TTL_MIN', 24 * 60)) * 60
+RETENTION_ZIP_TTL = float(os.environ.get('RETENTION_ZIP_TTL_MIN', 60)) * 60
+RETENTION_TASK_TTL = float(os.environ.get('RETENTION_TASK_TTL_MIN', 6 * 60)) * 60
+RETENTION_INTERVAL = float(os.environ.get('RETENTION_INTERVAL_SEC', 60))
+# Prodleva mazání po stažení s auto_delete=true
+AUTO_DELETE_DELAY = 2.0
+
+# Diskový rozpočet v MB (0 = bez limitu)
+DISK_BUDGET = int(float(os.environ.get('DISK_BUDGET_MB', 0)) * 1024 * 1024)
+UPLOAD_BUDGET = int(float(os.environ.get('UPLOAD_BUDGET_MB', 0)) * 1024 * 1024)
+OUTPUT_BUDGET = int(float(os.environ.get('OUTPUT_BUDGET_MB', 0)) * 1024 * 1024)
+DISK_MIN_FREE = int(float(os.environ.get('DISK_MIN_FREE_MB', 100)) * 1024 * 1024)
+
+# Cache normalizovaných stran (opravené a vyčištěné vstupy podle hashe obsahu)
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+CACHE_FOLDER = Path(os.environ.get('PAGE_CACHE_DIR', 'cache'))
+CACHE_BUDGET = int(float(os.environ.get('CACHE_BUDGET_MB', 0)) * 1024 * 1024)
+
+# Preflight PDF/X-1a výstupů na konci úlohy (počet procesů 0 = počet CPU)
+PREFLIGHT_ENABLED = os.environ.get('PREFLIGHT', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+PREFLIGHT_WORKERS = int(os.environ.get('PREFLIGHT_WORKERS', 0)) or None
+
+# Konverze výstupů na PDF/X-1a Ghostscriptem - výchozí vypnuto (gs přepisuje naše PDF/X metadata)
+# Trvalé gs workery (0 = počet CPU), časový limit konverze jednoho souboru v sekundách
+GHOSTSCRIPT_PDFX = os.environ.get('GHOSTSCRIPT_PDFX', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+GHOSTSCRIPT_WORKERS = int(os.environ.get('GHOSTSCRIPT_WORKERS', 0)) or None
+GHOSTSCRIPT_TIMEOUT = float(os.environ.get('GHOSTSCRIPT_TIMEOUT', GS_TIMEOUT))
+
+# Merge v samostatných procesech se zdroji ve sdílené paměti (výchozí na Linuxu počet CPU, jinde
+# 0 = merge ve vlákně úlohy) - poškozené PDF, na kterém se MuPDF zasekne nebo spadne, neshodí
+# webovou aplikaci. Časový limit merge dvojstrany v sekundách a limit paměti workeru v MB (0 = bez limitu)
+MERGE_WORKERS = int(os.environ.get('MERGE_WORKERS', DEFAULT_WORKERS))
+MERGE_TIMEOUT = float(os.environ.get('MERGE_TIMEOUT', UNIT_TIMEOUT))
+MERGE_WORKER_MEMORY_MB = int(os.environ.get('MERGE_WORKER_MEMORY_MB', 4096))
+
+# Paměť merge: limit MuPDF store každého procesu (MB, 0 = výchozí MuPDF), recyklace workeru
+# po N úlohách a nad RSS v MB (0 = nikdy)
+MUPDF_STORE_MB = int(os.environ.get('MUPDF_STORE_MB', 0))
+MERGE_WORKER_MAX_JOBS = int(os.environ.get('MERGE_WORKER_MAX_JOBS', 0))
+MERGE_WORKER_MAX_RSS_MB = int(os.environ.get('MERGE_WORKER_MAX_RSS_MB', 0))
+
+quota = DiskQuota(global_budget=DISK_BUDGET, min_free=DISK_MIN_FREE)
+quota.add_workspace('uploads', UPLOAD_FOLDER, ('*.pdf',), UPLOAD_BUDGET)
+quota.add_workspace('outputs', OUTPUT_FOLDER, ('*.pdf', '*.zip'), OUTPUT_BUDGET, evictable=True)
+# Rozepsané archivy vydání (.název.zip.part) zabírají místo, ale vyklízet se nesmí
+quota.add_workspace('archives', OUTPUT_FOLDER, ('.*.part',))
+
+page_cache = None
+if PAGE_CACHE_ENABLED:
+    page_cache = PageCache(CACHE_FOLDER, quota)
+    # Kopie v cache jde kdykoliv vytvořit znovu - vyklízí se jako první podle LRU
+    quota.add_workspace('cache', CACHE_FOLDER, ('*.pdf',), CACHE_BUDGET, evictable=True)
+
 # Globální proměnné pro sledování úloh
 processing_tasks = {}
 task_counter = 0
+reexport_lock = threading.Lock()
+
+# Jeden úklidový proces pro celou aplikaci (místo vlákna na každé stažení)
+janitor = RetentionJanitor(
+    rules=[
+        (UPLOAD_FOLDER, '*.pdf', RETENTION_UPLOAD_TTL),
+        (OUTPUT_FOLDER, '*.pdf', RETENTION_OUTPUT_TTL),
+        (OUTPUT_FOLDER, '*.zip', RETENTION_ZIP_TTL),
+        # Zbytek archivu po pádu aplikace - běžící úloha do něj průběžně zapisuje (mtime)
+        (OUTPUT_FOLDER, '.*.part', RETENTION_ZIP_TTL),
+    ],
+    tasks=processing_tasks,
+    task_ttl=RETENTION_TASK_TTL,
+    interval=RETENTION_INTERVAL
+)
+janitor.start()
+
+# Klíče dvojstrany, které výstup archu uvádí pro každou jeho stranu (results['success'][...]['sides'])
+SIDE_KEYS = ('left_file', 'right_file', 'left_page', 'right_page', 'rotation', 'pair_index')
+
 
 class WebPDFMerger:
     """Webová verze PDF merger třídy"""
@@ -59,6 +161,68 @@ class WebPDFMerger:
         self.merger = InDesignLikePDFMerger()
         self.merger.files_dir = UPLOAD_FOLDER
         self.merger.output_dir = OUTPUT_FOLDER
+        self.merger.page_cache = page_cache
+        if GHOSTSCRIPT_PDFX:
+            if self.merger.ghostscript_path:
+                # Výstupy vznikají ve scratch složkách úloh - jen tam smí gs zapisovat
+                self.merger.ghostscript_pool = GhostscriptPool(
+                    self.merger.ghostscript_path, GHOSTSCRIPT_WORKERS, GHOSTSCRIPT_TIMEOUT,
+                    folders=[default_scratch_root()]
+                )
+            else:
+                logger.warning("⚠️  GHOSTSCRIPT_PDFX je zapnuté, ale Ghostscript nebyl nalezen - konverze vypnuta")
+        self.merge_pool = None
+        if MERGE_WORKERS > 0 and not WORKERS_SUPPORTED:
+            logger.warning("⚠️  MERGE_WORKERS vyžaduje POSIX systém - merge poběží ve vlákně úlohy")
+        elif MERGE_WORKERS > 0:
+            self.merge_pool = MergeWorkerPool(MERGE_WORKERS, max_jobs=MERGE_WORKER_MAX_JOBS,
+                                              max_rss=MERGE_WORKER_MAX_RSS_MB * 1024 * 1024,
+                                              store=MUPDF_STORE_MB * 1024 * 1024, timeout=MERGE_TIMEOUT,
+                                              memory=MERGE_WORKER_MEMORY_MB * 1024 * 1024)
+        # Paměť procesu aplikace po posledním merge ve vlákně (store se mimo merge nepočítá)
+        self.last_usage = process_usage()
+    
+    def _start_merge(self, sides: list, outputs: dict, options: dict, documents: DocumentPool = None,
+                     sources: SharedSources = None) -> Future:
+        """
+        Spustí merge jednotky (dvojstrany nebo archu) všech jejích mutací.
+        
+        S poolem workerů běží merge v samostatném procesu nad zdroji ze sdílené paměti,
+        jinak hned ve vlákně úlohy nad otevřenými dokumenty z documents.
+        
+        Returns:
+            Future s (výsledky podle mutací, statistiky kroků)
+        """
+        if self.merge_pool is not None and sources is not None:
+            return self.merge_pool.submit(sides, outputs, options, sources)
+        
+        future = Future()
+        try:
+            stats = {}
+            variants = self.merger.create_sheet_variants(sides, outputs, stats=stats, documents=documents,
+                                                         **options)
+            future.set_result((variants, stats))
+        except Exception as merge_error:
+            future.set_exception(merge_error)
+        trim_store(MUPDF_STORE_MB * 1024 * 1024)
+        self.last_usage = process_usage()
+        return future
+    
+    def memory_usage(self) -> dict:
+        """Paměť merge pro stav úlohy: proces aplikace a workery (RSS a MuPDF store v MB)"""
+        usage = {'process': dict(self.last_usage, rss_mb=round(process_rss() / (1024 * 1024), 1))}
+        if self.merge_pool is not None:
+            usage['workers'] = self.merge_pool.usage()
+            usage['recycled_workers'] = self.merge_pool.recycled
+            usage['killed_workers'] = self.merge_pool.killed
+        return usage
+    
+    def _shared_sources(self):
+        """Zdroje úlohy ve sdílené paměti pro pool workerů (bez poolu prázdný kontext -> None)"""
+        if self.merge_pool is None:
+            return nullcontext()
+        # Workery čtou normalizovanou kopii z cache stran, je-li zapnutá
+        return SharedSources(resolve=page_cache.normalized if page_cache is not None else None)
     
     def parse_page_number(self, filename: str) -> int:
         """
@@ -108,9 +272,27 @@ class WebPDFMerger:
         pdf_files.sort()
         return pdf_files
     
-    def merge_files(self, file_pairs: list, day: str = "01", mutations: list = None, edition: str = "1") -> dict:
+    def estimate_output_size(self, file_pairs: list, mutations: list) -> int:
+        """Odhad velikosti výstupu úlohy v bajtech - dvojstrana je zhruba součet obou stran"""
+        # Vícestránkový zdroj se rozpočítá rovným dílem na strany, které z něj úloha bere
+        uses = {}
+        for pair in file_pairs:
+            for key in ('left_file', 'right_file'):
+                filename, _ = split_page_ref(pair[key])
+                uses[filename] = uses.get(filename, 0) + 1
+        total = 0
+        for filename, count in uses.items():
+            file_path = UPLOAD_FOLDER / filename
+            if file_path.exists():
+                total += file_path.stat().st_size * count // max(pdf_page_count(file_path), count, 1)
+        return total * max(len(mutations), 1)
+    
+    def merge_files(self, file_pairs: list, day: str = "01", mutations: list = None, edition: str = "1",
+                    archive_name: str = None, merge_options: dict = None, manifest: dict = None,
+                    sections: dict = None) -> dict:
         """
         Spojí páry PDF souborů s jmennou konvencí pro tiskárnu.
+        Je-li zadán archive_name, průběžně skládá i ZIP celého vydání.
         
         Jmenná konvence: 28PXE011.x.pdf
         - 28 = den vydání
@@ -125,114 +307,577 @@ class WebPDFMerger:
         results = {
             'success': [],
             'errors': [],
-            'total_files': len(file_pairs) * len(mutations)  # Počítáme s mutacemi
+            'total_files': count_outputs(file_pairs, mutations, merge_options)  # Počítáme s mutacemi
         }
         
-        for i, pair in enumerate(file_pairs, start=1):  # start=1 pro 1-based pořadí
+        for kind, payload in self.iter_merge(file_pairs, day, mutations, edition,
+                                             archive_name=archive_name, merge_options=merge_options,
+                                             manifest=manifest, sections=sections):
+            if kind == 'success':
+                results['success'].append(payload)
+                # Souhrn za celé vydání - kolik operátorů RIP ušetří, kolik barev se převedlo do CMYK
+                for step in ('normalize', 'cmyk'):
+                    if step in payload:
+                        summary = results.setdefault(step, {})
+                        for key, value in payload[step].items():
+                            summary[key] = summary.get(key, 0) + value
+            elif kind == 'archive':
+                results['archive'] = payload
+            else:
+                results['errors'].append(payload)
+        
+        # Kontrola PDF/X-1a celého vydání - chybné soubory se ukážou hned, ne až v tiskárně
+        if PREFLIGHT_ENABLED and results['success']:
+            results['preflight'] = summarize_preflight(preflight_files(
+                [OUTPUT_FOLDER / output['filename'] for output in results['success']], PREFLIGHT_WORKERS))
+        
+        return results
+    
+    def iter_merge(self, file_pairs: list, day: str = "01", mutations: list = None, edition: str = "1",
+                   source_dir: Path = None, output_dir: Path = None, archive_name: str = None,
+                   merge_options: dict = None, manifest: dict = None, sections: dict = None):
+        """
+        Generátor nad merge_files - vrací výsledky průběžně, jak vznikají.
+        
+        merge_options jsou volby úlohy předávané do merge (viz parse_merge_options).
+        
+        manifest určuje regionální strany mutací ({mutace: {strana: soubor}}, viz mutation_planner);
+        dvojstrana společná více mutacím se skládá jen jednou.
+        
+        Soubory v párech mohou odkazovat i na stranu vícestránkového PDF ("soubor.pdf#page=N");
+        sections je mapa {soubor: první strana vydání} pro sekce (viz page_sources). Každý zdroj
+        se za úlohu otevře jen jednou.
+        
+        Je-li zadán archive_name, každý hotový výstup se hned přidá do ZIP archivu vydání.
+        Archiv se píše přímo na disk jako skrytý ".název.part" v output_dir a po doběhnutí
+        úlohy se jen přejmenuje - ke stažení je hned, bez dalšího průchodu soubory.
+        
+        Yields:
+            ('success', info_dict) pro vytvořený soubor, ('error', zprava) pro chybu,
+            na konci ('archive', nazev_zip) pokud se archiv skládal
+        """
+        if mutations is None:
+            mutations = ["PXB"]
+        source_dir = source_dir or UPLOAD_FOLDER
+        output_dir = output_dir or OUTPUT_FOLDER
+        merge_options = merge_options or {}
+        
+        # Výstupy se rozepisují ve scratch složce úlohy a do output_dir se publikují až hotové
+        with ScratchJob() as scratch, DocumentPool() as documents, self._shared_sources() as sources:
+            # PDF jsou už komprimovaná (deflate) - ZIP je jen ukládá, bez další komprese
+            archive = None
+            if archive_name:
+                archive_path = output_dir / archive_name
+                partial = archive_path.with_name(f".{archive_name}.part")
+                archive = zipfile.ZipFile(partial, 'w', zipfile.ZIP_STORED)
+            
             try:
-                # Extrakce názvů souborů z páru
-                left_file = pair['left_file']
-                right_file = pair['right_file']
-                left_page = self.parse_page_number(left_file)
-                right_page = self.parse_page_number(right_file)
-                
-                # ZAJIŠTĚNÍ: Liché strany vždy vpravo!
-                # Pokud je levá stránka lichá, prohodíme
-                if left_page % 2 == 1:  # Levá je lichá
-                    left_file, right_file = right_file, left_file
-                    left_page, right_page = right_page, left_page
-                    logger.info(f"Pár přehozen: Liché ({right_page}) je nyní vpravo")
-                
-                # Číslo páru = nižší číslo strany ze dvojice
-                pair_number = min(left_page, right_page)
-                
-                # Spojení souborů s rotací
-                left_file_path = UPLOAD_FOLDER / left_file
-                right_file_path = UPLOAD_FOLDER / right_file
-                
-                # OBOUSTRANNÝ TISK DVOJSTRAN:
-                # - 1. pár = PŘEDNÍ strana papíru → -90°
-                # - 2. pár = ZADNÍ strana papíru  → +90°
-                # - 3. pár = PŘEDNÍ strana papíru → -90°
-                # - 4. pár = ZADNÍ strana papíru  → +90°
-                # Rotace závisí na POŘADÍ PÁRU (liché = přední, sudé = zadní)
-                if i % 2 == 1:  # Liché pořadí (1, 3, 5...) = Přední strana
-                    rotation = -90
-                    side = "Přední"
-                else:  # Sudé pořadí (2, 4, 6...) = Zadní strana
-                    rotation = 90
-                    side = "Zadní"
-                
-                logger.info(f"{i}. pár ({left_page}-{right_page}): {side} strana → Rotace {rotation}°")
-                
-                # Kontrola existence souborů
-                if not left_file_path.exists():
-                    error_msg = f"Levý soubor neexistuje: {left_file}"
+                yield from self._iter_merge_pairs(file_pairs, day, mutations, edition, source_dir,
+                                                  output_dir, scratch, archive, merge_options, manifest,
+                                                  PageMap(self.parse_page_number, sections), documents, sources)
+            except BaseException:
+                # Nedokončený archiv (chyba, přerušený stream) nesmí zůstat ležet
+                if archive is not None:
+                    archive.close()
+                    partial.unlink(missing_ok=True)
+                raise
+            
+            if archive is not None:
+                archive.close()
+                os.replace(partial, archive_path)
+                logger.info(f"📦 Archiv vydání připraven: {archive_name}")
+                yield 'archive', archive_name
+    
+    def _iter_merge_pairs(self, file_pairs: list, day: str, mutations: list, edition: str,
+                          source_dir: Path, output_dir: Path, scratch: ScratchJob,
+                          archive: zipfile.ZipFile = None, merge_options: dict = None,
+                          manifest: dict = None, page_map: PageMap = None, documents: DocumentPool = None,
+                          sources: SharedSources = None):
+        """Vlastní smyčka přes naplánované dvojstrany (nebo archy) a jejich mutace (viz iter_merge)"""
+        page_map = page_map or PageMap(self.parse_page_number)
+        options = dict(merge_options or {})
+        sheets = options.pop('sheets', False)
+        
+        spreads, plan_errors = plan_spreads(file_pairs, mutations, day, edition,
+                                            page_map.page_number, manifest)
+        for error_msg in plan_errors:
+            yield 'error', error_msg
+        
+        # Oboustranný arch = přední + zadní dvojstrana v jednom PDF, jinak každá dvojstrana zvlášť
+        if sheets:
+            units = plan_sheets(spreads)
+        else:
+            units = [{'sides': [spread], 'targets': spread['targets']} for spread in spreads]
+        
+        def start_conversions(item):
+            """Konverze Ghostscriptem pro úspěšné výstupy jednotky, jejíž merge doběhl"""
+            if self.merger.ghostscript_pool is None or item['merge'].exception() is not None:
+                return {}
+            variants, _ = item['merge'].result()
+            return {mutation: self.merger.ghostscript_pool.submit(scratch.stage(name))
+                    for mutation, name in item['unit']['targets'].items() if variants.get(mutation)}
+        
+        def publish(item):
+            """Výstupy jedné jednotky do archivu a output_dir (po merge a konverzi Ghostscriptem)"""
+            unit = item['unit']
+            sides = unit['sides']
+            front = sides[0]
+            i = front['pair_index']
+            sources_label = item['sources_label']
+            source_files = item['source_files']
+            conversions = item['conversions']
+            try:
+                try:
+                    variants, merge_stats = item['merge'].result()
+                except Exception as merge_error:
+                    error_msg = f"Exception při merge {sources_label}: {str(merge_error)}"
                     logger.error(error_msg)
-                    results['errors'].append(error_msg)
+                    yield 'error', error_msg
+                    return
+                
+                for mutation, output_name in unit['targets'].items():
+                    output_path = output_dir / output_name
+                    staged_path = scratch.stage(output_name)
+                    
+                    if not variants.get(mutation):
+                        error_msg = f"Merge selhal (returned False): {sources_label} ({mutation})"
+                        logger.error(error_msg)
+                        yield 'error', error_msg
+                        continue
+                    
+                    if not staged_path.exists():
+                        error_msg = f"Merge vrátil success, ale soubor neexistuje: {output_name}"
+                        logger.error(error_msg)
+                        yield 'error', error_msg
+                        continue
+                    
+                    # Neúspěšná konverze nechává výstup merge beze změny - jen ji ohlásíme
+                    conversion = conversions[mutation].result() if mutation in conversions else None
+                    
+                    # Do archivu přidáme ještě ze scratch (rychlé čtení), pak publikujeme
+                    if archive is not None:
+                        archive_write(archive, staged_path, output_name,
+                                      archive_date_time(merge_options, source_files))
+                    scratch.publish(output_name, output_path)
+                    file_size = output_path.stat().st_size / (1024 * 1024)  # MB
+                    logger.info(f"✅ {'Arch' if len(sides) > 1 else 'Pár'} {i} ({mutation}) "
+                                f"úspěšně sloučen: {output_name}")
+                    info = {
+                        'filename': output_name,
+                        'size_mb': round(file_size, 1),
+                        'left_file': Path(front['left_file']).name,
+                        'right_file': Path(front['right_file']).name,
+                        'left_page': front['left_page'],
+                        'right_page': front['right_page'],
+                        'rotation': front['rotation'],
+                        'pair_index': i,
+                        'mutation': mutation,
+                        'day': day,
+                        'edition': edition
+                    }
+                    # Arch: všechny dvojstrany v pořadí tisku (horní klíče popisují přední stranu)
+                    if len(sides) > 1:
+                        info['sides'] = [{key: side[key] for key in SIDE_KEYS} for side in sides]
+                    # Statistiky normalizace a převodu barev patří základu dvojstrany - uvedeme je jen jednou
+                    for step in ('normalize', 'cmyk'):
+                        if step in merge_stats:
+                            info[step] = merge_stats.pop(step)
+                    if conversion is not None:
+                        info['ghostscript'] = {key: conversion[key] for key in ('success', 'seconds', 'error')}
+                    yield 'success', info
+                    
+            except Exception as e:
+                error_msg = f"Chyba při zpracování páru {i}: {str(e)}"
+                logger.error(error_msg)
+                yield 'error', error_msg
+        
+        # Merge (v poolu procesů) i konverze Ghostscriptem běží souběžně s dalšími jednotkami -
+        # jednotky se publikují v pořadí, jakmile jsou hotové (bez poolů hned)
+        pending = deque()
+        
+        def drain(block: bool):
+            while pending:
+                for item in pending:
+                    if item['conversions'] is None and item['merge'].done():
+                        item['conversions'] = start_conversions(item)
+                head = pending[0]
+                if head['conversions'] is None:
+                    waiting = [head['merge']]
+                else:
+                    waiting = [future for future in head['conversions'].values() if not future.done()]
+                if not waiting:
+                    yield from publish(pending.popleft())
                     continue
+                if not block:
+                    return
+                # Čekáme na hlavu fronty, ale konverze dalších jednotek spouštíme, jak jejich merge doběhne
+                waiting += [item['merge'] for item in pending if item['conversions'] is None]
+                wait_futures(waiting, return_when=FIRST_COMPLETED)
+        
+        for unit in units:
+            sides = unit['sides']
+            targets = unit['targets']
+            front = sides[0]
+            i = front['pair_index']
+            
+            try:
+                sheet_sides = []
+                for side in sides:
+                    left_file = side['left_file']
+                    right_file = side['right_file']
+                    rotation = side['rotation']
+                    label = "Přední" if rotation == -90 else "Zadní"
+                    logger.info(f"{side['pair_index']}. pár ({side['left_page']}-{side['right_page']}): "
+                                f"{label} strana → Rotace {rotation}°, mutace {', '.join(targets)}")
+                    
+                    # Spojení souborů s rotací (strana může ležet ve vícestránkovém zdroji)
+                    left_name, left_index = split_page_ref(left_file)
+                    right_name, right_index = split_page_ref(right_file)
+                    left_file_path = source_dir / left_name
+                    right_file_path = source_dir / right_name
+                    
+                    # Kontrola existence souborů
+                    if not left_file_path.exists():
+                        error_msg = f"Levý soubor neexistuje: {left_name}"
+                        break
+                    if not right_file_path.exists():
+                        error_msg = f"Pravý soubor neexistuje: {right_name}"
+                        break
                     
-                if not right_file_path.exists():
-                    error_msg = f"Pravý soubor neexistuje: {right_file}"
+                    sheet_sides.append({'left_pdf': left_file_path, 'right_pdf': right_file_path,
+                                        'left_index': left_index, 'right_index': right_index,
+                                        'rotation': rotation})
+                else:
+                    error_msg = None
+                
+                if error_msg:
                     logger.error(error_msg)
-                    results['errors'].append(error_msg)
+                    yield 'error', error_msg
                     continue
                 
-                # Pro každou mutaci vytvoříme kopii souboru
-                for mutation in mutations:
-                    # Jmenná konvence: 28PXE011.x.pdf
-                    # {den}{mutace}{cislo_paru:02d}{cislo_vydani}.x.pdf
-                    output_name = f"{day}{mutation}{pair_number:02d}{edition}.x.pdf"
-                    output_path = OUTPUT_FOLDER / output_name
-                    
-                    logger.info(f"Vytvářím soubor: {output_name} (mutace {mutation})")
-                    
-                    # Pokus o merge s detailním logováním
-                    try:
-                        success = self.merger.create_side_by_side_pdf_with_rotation(
-                            left_file_path, right_file_path, output_path, rotation
-                        )
-                        
-                        if success:
-                            if output_path.exists():
-                                file_size = output_path.stat().st_size / (1024 * 1024)  # MB
-                                results['success'].append({
-                                    'filename': output_name,
-                                    'size_mb': round(file_size, 1),
-                                    'left_file': Path(left_file).name,
-                                    'right_file': Path(right_file).name,
-                                    'left_page': left_page,
-                                    'right_page': right_page,
-                                    'rotation': rotation,
-                                    'pair_index': i,
-                                    'mutation': mutation,
-                                    'day': day,
-                                    'edition': edition
-                                })
-                                logger.info(f"✅ Pár {i} ({mutation}) úspěšně sloučen: {output_name}")
-                            else:
-                                error_msg = f"Merge vrátil success, ale soubor neexistuje: {output_name}"
-                                logger.error(error_msg)
-                                results['errors'].append(error_msg)
-                        else:
-                            error_msg = f"Merge selhal (returned False): {left_file} + {right_file} ({mutation})"
-                            logger.error(error_msg)
-                            results['errors'].append(error_msg)
-                    except Exception as merge_error:
-                        error_msg = f"Exception při merge {left_file} + {right_file} ({mutation}): {str(merge_error)}"
-                        logger.error(error_msg)
-                        results['errors'].append(error_msg)
+                # Dvojstrana se složí jednou, mutace, které ji sdílejí, jsou jen její varianty
+                logger.info(f"Vytvářím soubory: {', '.join(targets.values())}")
+                source_files = [path for side in sheet_sides for path in (side['left_pdf'], side['right_pdf'])]
+                sources_label = ' | '.join(f"{side['left_file']} + {side['right_file']}" for side in sides)
+                
+                # Pokus o merge s detailním logováním (chyby merge ohlásí až publikace)
+                merge = self._start_merge(
+                    sheet_sides, {mutation: scratch.stage(name) for mutation, name in targets.items()},
+                    options, documents, sources
+                )
+                pending.append({'unit': unit, 'merge': merge, 'conversions': None,
+                                'sources_label': sources_label, 'source_files': source_files})
                     
             except Exception as e:
                 error_msg = f"Chyba při zpracování páru {i}: {str(e)}"
-                results['errors'].append(error_msg)
                 logger.error(error_msg)
+                yield 'error', error_msg
+            
+            yield from drain(block=False)
         
-        return results
+        yield from drain(block=True)
+
+
+    @staticmethod
+    def page_to_file(outputs: list, mutation: str) -> dict:
+        """Strany exportované mutace a soubory, ze kterých vznikly ({strana: soubor})"""
+        pages = {}
+        for output in outputs:
+            if output['mutation'] == mutation:
+                for side in output_sides(output):
+                    pages[side['left_page']] = side['left_file']
+                    pages[side['right_page']] = side['right_file']
+        return pages
+    
+    def reexport_page(self, outputs: list, replacement: str, page_count: int, mutations: list = None,
+                      archive_name: str = None, merge_options: dict = None, manifest: dict = None) -> dict:
+        """
+        Pozdní výměna strany: přeexportuje jen dvojstrany (u exportu po arších celé archy),
+        na kterých strana leží.
+        
+        Dvojstranu najde podle klíče párování (get_pair_for_page) ve všech mutacích,
+        nový soubor dosadí místo dosavadní strany, sloučí jen dotčené dvojstrany
+        (sdílené mutacemi jen jednou) a atomicky přepíše je i archiv vydání.
+        
+        Stranu vymění jen v mutacích, které ji mají z nahrazovaného souboru: nová verze
+        regionální strany (stejný název) jen tam, kde ji manifest dosadil, nová verze
+        strany základního vydání jen v mutacích bez vlastní strany z manifestu.
+        
+        Args:
+            outputs: Výstupy původního exportu (results['success']) - aktualizují se na místě
+            replacement: Nahraný soubor s novou verzí strany (v UPLOAD_FOLDER)
+            page_count: Rozsah vydání (klíč párování)
+            mutations: Jen tyto mutace (None = všechny)
+            archive_name: Archiv vydání v OUTPUT_FOLDER, který se má aktualizovat
+            merge_options: Volby merge původního exportu
+            manifest: Manifest mutací původního exportu ({mutace: {strana: soubor}})
+        
+        Returns:
+            Zpráva {'page', 'pair', 'files': [...], 'errors': [...], 'archive'}
+        
+        Raises:
+            ValueError: Strana není v klíči nebo její dvojstrana nebyla exportována
+        """
+        page = self.parse_page_number(replacement)
+        pair = get_pair_for_page(page, page_count)
+        if pair is None:
+            raise ValueError(f"Strana {page} není v klíči párování pro {page_count} stran")
+        
+        on_pair = [output for output in outputs
+                   if any({side['left_page'], side['right_page']} == set(pair) for side in output_sides(output))
+                   and (not mutations or output['mutation'] in mutations)]
+        if not on_pair:
+            raise ValueError(f"Dvojstrana {pair[0]}-{pair[1]} nebyla v tomto exportu")
+        
+        # Který soubor nová verze nahrazuje: stejnojmenný (znovu nahraný), jinak stranu základního
+        # vydání - regionální strany z manifestu zůstávají
+        current = {output['mutation']: self.page_to_file(outputs, output['mutation']).get(page)
+                   for output in on_pair}
+        if replacement in current.values():
+            replaced_files = {replacement}
+        else:
+            overridden = {mutation for mutation, pages in (manifest or {}).items() if page in pages}
+            replaced_files = {name for mutation, name in current.items() if mutation not in overridden}
+        affected = [output for output in on_pair if current[output['mutation']] in replaced_files]
+        if not affected:
+            raise ValueError(f"Strana {page} má ve všech vybraných mutacích vlastní soubor z manifestu")
+        
+        # Mutace, které po výměně skládají stejnou dvojstranu (arch), sloučíme jednou
+        spreads = {}
+        for output in affected:
+            old_files = self.page_to_file(outputs, output['mutation'])
+            sides = []
+            for side in output_sides(output):
+                left_file = replacement if side['left_page'] == page else old_files[side['left_page']]
+                right_file = replacement if side['right_page'] == page else old_files[side['right_page']]
+                sides.append((left_file, right_file, side['rotation']))
+            spreads.setdefault(tuple(sides), []).append(output)
+        
+        options = dict(merge_options or {})
+        options.pop('sheets', None)
+        
+        report = {'page': page, 'pair': list(pair), 'files': [], 'errors': [], 'archive': None}
+        with ScratchJob(prefix='reexport_') as scratch, self._shared_sources() as sources:
+            for sides, spread_outputs in spreads.items():
+                sheet_sides = []
+                for left_file, right_file, rotation in sides:
+                    left_name, left_index = split_page_ref(left_file)
+                    right_name, right_index = split_page_ref(right_file)
+                    sheet_sides.append({'left_pdf': UPLOAD_FOLDER / left_name, 'right_pdf': UPLOAD_FOLDER / right_name,
+                                        'left_index': left_index, 'right_index': right_index,
+                                        'rotation': rotation})
+                missing = [path.name for side in sheet_sides for path in (side['left_pdf'], side['right_pdf'])
+                           if not path.exists()]
+                if missing:
+                    report['errors'].append(f"Soubor neexistuje: {', '.join(missing)}")
+                    continue
+                
+                sources_label = ' | '.join(f"{left_file} + {right_file}" for left_file, right_file, _ in sides)
+                try:
+                    variants, _ = self._start_merge(
+                        sheet_sides,
+                        {output['mutation']: scratch.stage(output['filename']) for output in spread_outputs},
+                        options, sources=sources
+                    ).result()
+                except Exception as merge_error:
+                    # Zaseknutý nebo spadlý worker - selže jen tato dvojstrana
+                    error_msg = f"Exception při merge {sources_label}: {str(merge_error)}"
+                    logger.error(error_msg)
+                    report['errors'].append(error_msg)
+                    continue
+                if self.merger.ghostscript_pool is not None:
+                    self.merger.ghostscript_pool.convert_many(
+                        [scratch.stage(output['filename']) for output in spread_outputs
+                         if variants.get(output['mutation'])])
+                
+                for output in spread_outputs:
+                    if not variants.get(output['mutation']):
+                        report['errors'].append(f"Merge selhal: {sources_label} ({output['mutation']})")
+                        continue
+                    
+                    output_path = scratch.publish(output['filename'], OUTPUT_FOLDER / output['filename'])
+                    old_files = self.page_to_file([output], output['mutation'])
+                    replaced = old_files.get(page)
+                    for side, (left_file, right_file, _) in zip(output_sides(output), sides):
+                        side.update({'left_file': left_file, 'right_file': right_file})
+                    if 'sides' in output:
+                        # Horní klíče archu popisují přední stranu
+                        output.update({key: output['sides'][0][key] for key in ('left_file', 'right_file')})
+                    output['size_mb'] = round(output_path.stat().st_size / (1024 * 1024), 1)
+                    report['files'].append({
+                        'filename': output['filename'],
+                        'mutation': output['mutation'],
+                        'replaced_file': replaced,
+                        'new_file': replacement,
+                        'size_mb': output['size_mb']
+                    })
+                    logger.info(f"🔁 Přeexportováno: {output['filename']} ({replaced} → {replacement})")
+            
+            if archive_name and report['files']:
+                archive_path = OUTPUT_FOLDER / archive_name
+                if archive_path.exists():
+                    self._rewrite_archive(archive_path, [f['filename'] for f in report['files']], scratch,
+                                          archive_date_time(merge_options, [UPLOAD_FOLDER / replacement]))
+                    report['archive'] = archive_name
+                else:
+                    logger.info(f"Archiv {archive_name} už neexistuje - neaktualizuji")
+        
+        if PREFLIGHT_ENABLED and report['files']:
+            report['preflight'] = summarize_preflight(preflight_files(
+                [OUTPUT_FOLDER / f['filename'] for f in report['files']], PREFLIGHT_WORKERS))
+        
+        return report
+    
+    def _rewrite_archive(self, archive_path: Path, filenames: list, scratch: ScratchJob,
+                         date_time: tuple = None):
+        """
+        Přepíše archiv vydání s novými verzemi souborů - ostatní položky se jen zkopírují.
+        
+        date_time: Pevné datum nových položek (reprodukovatelný export), jinak čas souborů
+        """
+        replaced = set(filenames)
+        staged = scratch.stage(archive_path.name)
+        with zipfile.ZipFile(archive_path) as old_archive, \
+                zipfile.ZipFile(staged, 'w', zipfile.ZIP_STORED) as new_archive:
+            existing = set()
+            for info in old_archive.infolist():
+                existing.add(info.filename)
+                if info.filename in replaced:
+                    archive_write(new_archive, OUTPUT_FOLDER / info.filename, info.filename, date_time)
+                    continue
+                with old_archive.open(info) as src, new_archive.open(info, 'w') as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            for filename in filenames:
+                if filename not in existing:
+                    archive_write(new_archive, OUTPUT_FOLDER / filename, filename, date_time)
+        scratch.publish(archive_path.name, archive_path)
+        logger.info(f"📦 Archiv vydání aktualizován: {archive_path.name}")
+
+
+def count_outputs(file_pairs: list, mutations: list, merge_options: dict = None) -> int:
+    """Počet výstupních souborů úlohy - arch spojuje přední a zadní pár do jednoho PDF"""
+    units = len(file_pairs)
+    if (merge_options or {}).get('sheets'):
+        units = (units + 1) // 2
+    return units * len(mutations)
+
+
+def output_sides(output: dict) -> list:
+    """Dvojstrany výstupu v pořadí tisku - arch má seznam 'sides', dvojstrana je sama sebou"""
+    return output.get('sides') or [output]
+
+
+def archive_date_time(merge_options: dict, source_files: list) -> tuple:
+    """Pevné datum položek ZIP pro reprodukovatelný export (None = běžně čas souboru)"""
+    if not (merge_options or {}).get('deterministic'):
+        return None
+    return reproducible_timestamp(source_files).timetuple()[:6]
+
+
+def archive_write(archive: zipfile.ZipFile, file_path: Path, name: str, date_time: tuple = None):
+    """Přidá soubor do ZIP - s pevným datem a právy, je-li zadáno date_time"""
+    if date_time is None:
+        archive.write(file_path, name)
+        return
+    info = zipfile.ZipInfo(name, date_time=date_time)
+    info.compress_type = archive.compression
+    info.external_attr = 0o644 << 16
+    with open(file_path, 'rb') as src, archive.open(info, 'w') as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+class ZipStream(io.RawIOBase):
+    """Zapisovatelný proud bez seek() - zipfile do něj píše a my průběžně odesíláme hotové bajty"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def pop(self) -> bytes:
+        """Vrátí a zahodí vše, co bylo zapsáno od posledního volání"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
 
 # Globální instance
 web_merger = WebPDFMerger()
 
+
+def _parse_bool(value) -> bool:
+    """Boolean z JSON hodnoty i z řetězce formuláře ('true', '1', 'on')"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'on', 'yes')
+    return bool(value)
+
+
+def parse_merge_options(data) -> dict:
+    """
+    Načte volby merge z JSON payloadu nebo formuláře.
+    
+    Raises:
+        ValueError: Neplatná hodnota volby
+    """
+    save_profile = data.get('save_profile') or DEFAULT_SAVE_PROFILE
+    if save_profile not in SAVE_PROFILES:
+        raise ValueError(f"Neznámý profil ukládání: {save_profile}. Podporované: {list(SAVE_PROFILES.keys())}")
+    
+    image_dpi = data.get('image_dpi') or None
+    if image_dpi is not None:
+        image_dpi = int(image_dpi)
+        if image_dpi < 72:
+            raise ValueError(f"Cílové rozlišení obrázků musí být alespoň 72 DPI (zadáno {image_dpi})")
+    
+    backend = data.get('backend') or DEFAULT_MERGE_BACKEND
+    if backend not in MERGE_BACKENDS:
+        raise ValueError(f"Neznámý backend: {backend}. Podporované: {list(MERGE_BACKENDS)}")
+    
+    return {
+        'save_profile': save_profile,
+        'image_dpi': image_dpi,
+        'optimize': _parse_bool(data.get('optimize', False)),
+        'linearize': _parse_bool(data.get('linearize', False)),
+        'backend': backend,
+        'normalize': _parse_bool(data.get('normalize', False)),
+        # Převod RGB barev a obrázků do CMYK podle výstupního profilu (bez Ghostscriptu)
+        'cmyk': _parse_bool(data.get('cmyk', False)),
+        'mutation_overlay': _parse_bool(data.get('mutation_overlay', False)),
+        'deterministic': _parse_bool(data.get('deterministic', False)),
+        # Oboustranný arch (přední + zadní dvojstrana) v jednom PDF
+        'sheets': _parse_bool(data.get('sheets', False))
+    }
+
+
+def send_output_file(file_path: Path, download_name: str = None, mimetype: str = None,
+                     as_attachment: bool = True):
+    """
+    Odešle soubor z OUTPUT_FOLDER jako přílohu (nebo inline pro náhled v prohlížeči).
+    
+    V režimu SENDFILE_MODE posílá jen hlavičku pro proxy (X-Accel-Redirect / X-Sendfile),
+    takže samotný přenos k pomalému klientovi neblokuje Python worker.
+    """
+    download_name = download_name or file_path.name
+    mimetype = mimetype or mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    
+    if SENDFILE_MODE == 'x-accel':
+        relative_path = file_path.resolve().relative_to(OUTPUT_FOLDER.resolve())
+        disposition = 'attachment' if as_attachment else 'inline'
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = X_ACCEL_PREFIX.rstrip('/') + '/' + quote(relative_path.as_posix())
+        response.headers['Content-Disposition'] = f'{disposition}; filename="{download_name}"'
+        return response
+    
+    # Pro 'x-sendfile' vloží Flask hlavičku X-Sendfile sám (USE_X_SENDFILE).
+    # send_file podporuje Range requesty - u linearizovaného PDF stačí prohlížeči začátek souboru.
+    return send_file(file_path.resolve(), mimetype=mimetype, as_attachment=as_attachment,
+                     download_name=download_name)
+
 @app.route('/')
 def index():
     """Hlavní stránka"""
@@ -252,6 +897,7 @@ def get_files():
                 'name': file_path.name,
                 'size_mb': round(file_size, 1),
                 'page_number': page_num,
+                'page_count': pdf_page_count(file_path),
                 'upload_time': datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%H:%M:%S')
             })
         
@@ -276,20 +922,33 @@ def upload_files():
         files = request.files.getlist('files')
         uploaded_files = []
         
-        for file in files:
-            if file and file.filename.lower().endswith('.pdf'):
-                filename = secure_filename(file.filename)
-                file_path = UPLOAD_FOLDER / filename
-                file.save(file_path)
-                
-                page_num = web_merger.parse_page_number(filename)
-                file_size = file_path.stat().st_size / (1024 * 1024)  # MB
-                
-                uploaded_files.append({
-                    'name': filename,
-                    'size_mb': round(file_size, 1),
-                    'page_number': page_num
-                })
+        # Místo pro upload si ověříme předem (případně vyklidíme staré výstupy)
+        upload_size = request.content_length or 0
+        admitted, message = quota.admit(upload_size, 'uploads')
+        if not admitted:
+            return jsonify({'success': False, 'error': message})
+        
+        try:
+            saved_files = []
+            for file in files:
+                if file and file.filename.lower().endswith('.pdf'):
+                    filename = secure_filename(file.filename)
+                    file.save(UPLOAD_FOLDER / filename)
+                    saved_files.append(filename)
+        finally:
+            quota.release(upload_size, 'uploads')
+        
+        for filename in saved_files:
+            file_path = UPLOAD_FOLDER / filename
+            page_num = web_merger.parse_page_number(filename)
+            file_size = file_path.stat().st_size / (1024 * 1024)  # MB
+            
+            uploaded_files.append({
+                'name': filename,
+                'size_mb': round(file_size, 1),
+                'page_number': page_num,
+                'page_count': pdf_page_count(file_path)
+            })
         
         return jsonify({
             'success': True,
@@ -356,10 +1015,16 @@ def validate_pair_endpoint():
 
 @app.route('/api/auto-pair', methods=['POST'])
 def auto_pair():
-    """API endpoint pro automatické párování souborů podle klíče"""
+    """
+    API endpoint pro automatické párování souborů podle klíče.
+    
+    Volitelně sections = {soubor: první strana} pro vícestránková PDF sekcí;
+    vícestránkový soubor mimo mapu je celé vydání od strany 1.
+    """
     try:
         data = request.get_json()
         page_count = int(data.get('page_count', 40))  # Výchozí 40 stran
+        sections = parse_sections(data.get('sections'))
         
         if page_count not in PAIRING_KEYS:
             return jsonify({
@@ -369,12 +1034,11 @@ def auto_pair():
         
         files = web_merger.get_uploaded_files()
         
-        # Vytvoříme slovník page_number -> filename
-        page_to_file = {}
+        # Vytvoříme slovník page_number -> soubor (u vícestránkových PDF odkaz soubor#page=N)
+        page_map = PageMap(web_merger.parse_page_number, sections)
         for file_path in files:
-            page_num = web_merger.parse_page_number(file_path.name)
-            if page_num > 0:
-                page_to_file[page_num] = file_path.name
+            page_map.add_source(file_path.name, pdf_page_count(file_path))
+        page_to_file = page_map.pages
         
         # Získáme klíč párování pro daný rozsah
         pairing_key = get_pairing_key(page_count)
@@ -419,6 +1083,9 @@ def merge_files():
         day = data.get('day', '01')
         mutations = data.get('mutations', ['PXB'])
         edition = data.get('edition', '1')
+        merge_options = parse_merge_options(data)
+        manifest = parse_manifest(data.get('manifest'), mutations)
+        sections = parse_sections(data.get('sections'))
         
         if not file_pairs:
             return jsonify({
@@ -426,14 +1093,26 @@ def merge_files():
                 'error': 'Žádné páry souborů nebyly vybrány'
             })
         
-        logger.info(f"Export: den={day}, mutace={mutations}, vydání={edition}, párů={len(file_pairs)}")
+        logger.info(f"Export: den={day}, mutace={mutations}, vydání={edition}, párů={len(file_pairs)}, "
+                    f"volby={merge_options}")
+        
+        # Úlohu pustíme jen pokud se výstup vejde na disk (export nesmí spadnout v půlce);
+        # archiv vydání v output/ obsahuje tytéž soubory ještě jednou
+        estimated_size = web_merger.estimate_output_size(file_pairs, mutations) * 2
+        admitted, message = quota.admit(estimated_size, 'outputs')
+        if not admitted:
+            return jsonify({
+                'success': False,
+                'error': message
+            })
         
         # Vytvoření úlohy
         task_counter += 1
         task_id = f"task_{task_counter}"
+        archive_name = f"vydani_{day}{edition}_{task_id}.zip"
         
-        # Počet výstupních souborů = páry × mutace
-        total_files = len(file_pairs) * len(mutations)
+        # Počet výstupních souborů = páry (u archů dvojice párů) × mutace
+        total_files = count_outputs(file_pairs, mutations, merge_options)
         
         processing_tasks[task_id] = {
             'status': 'processing',
@@ -441,19 +1120,26 @@ def merge_files():
             'total': total_files,
             'completed': 0,
             'results': None,
+            'merge_options': merge_options,
+            'manifest': manifest,
             'start_time': time.time()
         }
         
         # Spuštění zpracování v samostatném vlákně
         def process_task():
             try:
-                results = web_merger.merge_files(file_pairs, day, mutations, edition)
+                results = web_merger.merge_files(file_pairs, day, mutations, edition, archive_name,
+                                                 merge_options, manifest, sections)
                 processing_tasks[task_id]['status'] = 'completed'
                 processing_tasks[task_id]['results'] = results
                 processing_tasks[task_id]['progress'] = 100
+                processing_tasks[task_id]['memory'] = web_merger.memory_usage()
             except Exception as e:
                 processing_tasks[task_id]['status'] = 'error'
                 processing_tasks[task_id]['error'] = str(e)
+            finally:
+                processing_tasks[task_id]['end_time'] = time.time()
+                quota.release(estimated_size, 'outputs')
         
         thread = threading.Thread(target=process_task)
         thread.start()
@@ -470,6 +1156,171 @@ def merge_files():
             'error': str(e)
         })
 
+@app.route('/api/export', methods=['POST'])
+def export_edition():
+    """
+    Bezstavový export celého vydání jedním requestem (serverless nasazení, např. Vercel).
+    
+    Přijme stránky (multipart 'files') + day, mutations, edition, page_count
+    a volitelně manifest mutací (JSON {mutace: {strana: soubor}}) a mapu sekcí
+    (JSON {soubor: první strana}) pro vícestránková PDF,
+    spáruje je podle PAIRING_KEYS, sloučí a průběžně streamuje ZIP s výstupy.
+    Na serveru nezůstává žádný stav - vše běží v dočasné složce requestu.
+    """
+    try:
+        files = request.files.getlist('files')
+        day = request.form.get('day', '01')
+        edition = request.form.get('edition', '1')
+        page_count = int(request.form.get('page_count', 40))
+        merge_options = parse_merge_options(request.form)
+        
+        # Mutace: opakovaný parametr nebo čárkami oddělený seznam
+        mutations = []
+        for value in request.form.getlist('mutations'):
+            mutations.extend(m.strip() for m in value.split(',') if m.strip())
+        mutations = mutations or ['PXB']
+        manifest = parse_manifest(json.loads(request.form['manifest']) if request.form.get('manifest') else None,
+                                  mutations)
+        sections = {secure_filename(name): first_page for name, first_page in parse_sections(
+            json.loads(request.form['sections']) if request.form.get('sections') else None).items()}
+        
+        if page_count not in PAIRING_KEYS:
+            return jsonify({
+                'success': False,
+                'error': f'Nepodporovaný rozsah vydání: {page_count}. Podporované: {list(PAIRING_KEYS.keys())}'
+            }), 400
+        
+        pdf_files = [f for f in files if f and f.filename.lower().endswith('.pdf')]
+        if not pdf_files:
+            return jsonify({'success': False, 'error': 'Žádné soubory nebyly vybrány'}), 400
+        
+        work_dir = Path(tempfile.mkdtemp(prefix='export_'))
+        source_dir = work_dir / 'uploads'
+        output_dir = work_dir / 'output'
+        source_dir.mkdir()
+        output_dir.mkdir()
+        
+        # Regionální strany z manifestu se nepárují - nahrazují strany základního vydání
+        substitutes = {secure_filename(name) for pages in manifest.values() for name in pages.values()}
+        manifest = {mutation: {page: secure_filename(name) for page, name in pages.items()}
+                    for mutation, pages in manifest.items()}
+        
+        page_map = PageMap(web_merger.parse_page_number, sections)
+        for file in pdf_files:
+            filename = secure_filename(file.filename)
+            file.save(source_dir / filename)
+            if filename in substitutes:
+                continue
+            page_map.add_source(filename, pdf_page_count(source_dir / filename))
+        
+        pairs = auto_pair_files(page_map.page_files(), page_count)
+        if not pairs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return jsonify({'success': False, 'error': f'Žádný kompletní pár pro {page_count} stran'}), 400
+        
+        logger.info(f"Bezstavový export: den={day}, mutace={mutations}, vydání={edition}, párů={len(pairs)}")
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+    
+    def generate():
+        stream = ZipStream()
+        errors = []
+        try:
+            with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for kind, payload in web_merger.iter_merge(pairs, day, mutations, edition, source_dir, output_dir,
+                                                           merge_options=merge_options, manifest=manifest,
+                                                           sections=sections):
+                    if kind == 'success':
+                        output_path = output_dir / payload['filename']
+                        archive_write(zf, output_path, payload['filename'], archive_date_time(
+                            merge_options, [source_dir / payload['left_file'], source_dir / payload['right_file']]))
+                        output_path.unlink()
+                    else:
+                        errors.append(payload)
+                    # Hotový soubor odešleme hned, klient stahuje už během exportu
+                    yield stream.pop()
+                
+                if errors:
+                    zf.writestr('errors.txt', '\n'.join(errors))
+            yield stream.pop()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    zip_filename = f"vydani_{day}_{edition}.zip"
+    return Response(
+        generate(),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
+    )
+
+@app.route('/api/reexport', methods=['POST'])
+def reexport_page():
+    """
+    Pozdní výměna strany v hotovém exportu.
+    
+    Přijme task_id dokončeného exportu, novou verzi strany (multipart 'file', nebo
+    'filename' už nahraného souboru), page_count a volitelně mutations. Přeexportuje
+    jen dvojstrany s touto stranou a aktualizuje archiv vydání.
+    """
+    try:
+        data = request.form if (request.form or request.files) else (request.get_json(silent=True) or {})
+        task = processing_tasks.get(data.get('task_id'))
+        if not task or task['status'] != 'completed' or not task.get('results'):
+            return jsonify({'success': False, 'error': 'Export nenalezen nebo ještě neskončil'})
+        
+        page_count = int(data.get('page_count', 40))
+        mutations = data.get('mutations') or []
+        if isinstance(mutations, str):
+            mutations = [m.strip() for m in mutations.split(',') if m.strip()]
+        
+        file = request.files.get('file')
+        if file and file.filename.lower().endswith('.pdf'):
+            filename = secure_filename(file.filename)
+            upload_size = request.content_length or 0
+            admitted, message = quota.admit(upload_size, 'uploads')
+            if not admitted:
+                return jsonify({'success': False, 'error': message})
+            try:
+                file.save(UPLOAD_FOLDER / filename)
+            finally:
+                quota.release(upload_size, 'uploads')
+        else:
+            filename = secure_filename(data.get('filename', ''))
+            if not filename or not (UPLOAD_FOLDER / filename).exists():
+                return jsonify({'success': False, 'error': 'Nová verze strany nebyla nahrána'})
+        
+        # Odhad: nová strana v každé dotčené mutaci (dvojstrana ~ 2× strana)
+        mutation_count = len(mutations) or len({output['mutation'] for output in task['results']['success']})
+        estimated_size = (UPLOAD_FOLDER / filename).stat().st_size * 2 * max(mutation_count, 1)
+        admitted, message = quota.admit(estimated_size, 'outputs')
+        if not admitted:
+            return jsonify({'success': False, 'error': message})
+        
+        start_time = time.time()
+        try:
+            # Dva re-exporty téhož vydání by si přepisovaly archiv - pouštíme je po jednom
+            with reexport_lock:
+                report = web_merger.reexport_page(task['results']['success'], filename, page_count, mutations,
+                                                  task['results'].get('archive'), task.get('merge_options'),
+                                                  task.get('manifest'))
+        finally:
+            quota.release(estimated_size, 'outputs')
+        report['elapsed_s'] = round(time.time() - start_time, 2)
+        
+        logger.info(f"🔁 Re-export strany {report['page']}: {len(report['files'])} souborů "
+                    f"za {report['elapsed_s']} s")
+        return jsonify({'success': not report['errors'], 'report': report})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    except Exception as e:
+        logger.error(f"Chyba při re-exportu: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/task/<task_id>', methods=['GET'])
 def get_task_status(task_id):
     """API endpoint pro získání stavu úlohy"""
@@ -486,6 +1337,7 @@ def get_task_status(task_id):
         elapsed = time.time() - task['start_time']
         estimated_total = elapsed * task['total'] / max(task['completed'], 1)
         task['progress'] = min(int((task['completed'] / task['total']) * 100), 95)
+        task['memory'] = web_merger.memory_usage()
     
     return jsonify({
         'success': True,
@@ -498,25 +1350,17 @@ def download_file(filename):
     try:
         file_path = OUTPUT_FOLDER / secure_filename(filename)
         if file_path.exists():
-            # Odeslání souboru
-            response = send_file(file_path, as_attachment=True)
+            # Odeslání souboru (případně přes reverzní proxy); ?inline=true = náhled v prohlížeči
+            inline = request.args.get('inline', 'false').lower() == 'true'
+            quota.touch(file_path)
+            response = send_output_file(file_path, as_attachment=not inline)
             
             # Po odeslání smažeme soubor (pokud je query param auto_delete=true)
             auto_delete = request.args.get('auto_delete', 'false').lower() == 'true'
             if auto_delete:
-                # Spuštíme smazání v samostatném vlákně po 2 sekundách
-                def delete_after_download():
-                    time.sleep(2)  # Počkáme než se soubor stáhne
-                    try:
-                        if file_path.exists():
-                            file_path.unlink()
-                            logger.info(f"Soubor {filename} byl automaticky smazán po stažení")
-                    except Exception as e:
-                        logger.error(f"Chyba při automatickém mazání souboru {filename}: {e}")
-                
-                thread = threading.Thread(target=delete_after_download)
-                thread.daemon = True
-                thread.start()
+                # Smazání obstará janitor - soubor se mezitím stihne odeslat
+                janitor.schedule_delete(file_path, AUTO_DELETE_DELAY)
+                logger.info(f"Soubor {filename} naplánován ke smazání po stažení")
             
             return response
         else:
@@ -565,6 +1409,14 @@ def download_all_files():
     try:
         data = request.get_json()
         filenames = data.get('filenames', [])
+        archive = data.get('archive')
+        
+        # Archiv vydání složený už během exportu - stačí ho rovnou odeslat
+        if archive:
+            archive_path = OUTPUT_FOLDER / secure_filename(archive)
+            if archive_path.exists():
+                quota.touch(archive_path)
+                return send_output_file(archive_path, archive_path.name, 'application/zip')
         
         if not filenames:
             return jsonify({
@@ -572,24 +1424,34 @@ def download_all_files():
                 'error': 'Žádné soubory ke stažení'
             })
         
-        # Vytvoření ZIP archivu v paměti
-        memory_file = io.BytesIO()
-        
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for filename in filenames:
-                file_path = OUTPUT_FOLDER / secure_filename(filename)
-                if file_path.exists():
-                    zf.write(file_path, filename)
-                    logger.info(f"Přidán do ZIP: {filename}")
-        
-        memory_file.seek(0)
-        
         # Generování názvu ZIP souboru
         today = datetime.now().strftime('%Y-%m-%d')
         zip_filename = f"pary_{today}.zip"
         
+        def write_zip(zip_target):
+            with zipfile.ZipFile(zip_target, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for filename in filenames:
+                    file_path = OUTPUT_FOLDER / secure_filename(filename)
+                    if file_path.exists():
+                        zf.write(file_path, filename)
+                        logger.info(f"Přidán do ZIP: {filename}")
+        
+        # Pro předání proxy musí ZIP ležet na disku (publikovaný atomicky), jinak stačí paměť.
+        # Každý požadavek má vlastní název na disku - souběžné stažení ho nepřepíše a nikdo jiný
+        # ho nesmaže přes auto_delete; uklidí ho až janitor podle RETENTION_ZIP_TTL.
+        if SENDFILE_MODE:
+            staged_name = f"pary_{today}_{uuid.uuid4().hex[:12]}.zip"
+            with ScratchJob(prefix='zip_') as scratch:
+                write_zip(scratch.stage(staged_name))
+                zip_path = scratch.publish(staged_name, OUTPUT_FOLDER / staged_name)
+            return send_output_file(zip_path, zip_filename, 'application/zip')
+        
+        zip_target = io.BytesIO()
+        write_zip(zip_target)
+        zip_target.seek(0)
+        
         return send_file(
-            memory_file,
+            zip_target,
             mimetype='application/zip',
             as_attachment=True,
             download_name=zip_filename